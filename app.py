@@ -5,15 +5,64 @@ import os
 # This is the definitive fix for the 'ModuleNotFoundError'
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from flask import Flask, request, render_template
-import numpy as np
-import pandas as pd
+import time
 
-from src.pipeline.predict_pipeline import CustomData, PredictPipeline
+# Start of the import phase in this worker's startup report
+_import_started = time.perf_counter()
+
+import json
+
+from flask import Flask, Response, g, jsonify, request, render_template, stream_with_context
+
+from src.feature_schema import FEATURE_SCHEMA
+from src.logger import logging, logging_stats
+from src.metrics import METRICS
+from src.pipeline.comps import CompsError, CompsFinder, CompsUnavailableError
+from src.pipeline.explain import ExplanationError, ExplanationUnavailableError, Explainer
+from src.pipeline.memory_report import process_memory
+from src.pipeline.model_registry import get_registry
+from src.pipeline.micro_batcher import BatcherOverloadedError, get_batcher
+from src.pipeline.predict_pipeline import BATCH_CHUNK_SIZE, MAX_BATCH_CHUNK_SIZE, CustomData, PredictPipeline
+from src.pipeline.prediction_cache import get_prediction_cache
+from src.pipeline.warmup import prewarm, record_startup_phase
+from src.pipeline.whatif import WhatIfError, WhatIfSweep
 
 application = Flask(__name__)
 app = application
 
+record_startup_phase("import", time.perf_counter() - _import_started)
+if os.environ.get("PREWARM") == "1":
+    # For servers without a post-fork hook (e.g. uvicorn); gunicorn.conf.py prewarms each worker itself
+    prewarm()
+
+# Cache and batcher counters are read when /metrics is scraped
+METRICS.register_collector("ames_prediction_cache", lambda: get_prediction_cache().stats())
+METRICS.register_collector("ames_micro_batcher", lambda: get_batcher().stats())
+METRICS.register_collector("ames_model_registry", lambda: {"resident_models": len(get_registry().resident())})
+METRICS.register_collector("ames_process", process_memory)
+METRICS.register_collector("ames_logging", logging_stats)
+
+@app.before_request
+def start_request_timer():
+    if METRICS.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    start = g.get('request_start')
+    if start is not None:
+        METRICS.observe(
+            "ames_http_request_duration_seconds",
+            time.perf_counter() - start,
+            (("endpoint", request.endpoint or "unknown"), ("method", request.method), ("status", str(response.status_code))),
+        )
+    return response
+
+## Prometheus scrape endpoint
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
 ## Route for the landing page
 @app.route('/')
 def index():
@@ -28,82 +77,178 @@ def predict_datapoint():
         return render_template('home.html')
     else:
         # This block executes when the user submits the prediction form
-        data = CustomData(
-            MS_Zoning=request.form.get('MS_Zoning'),
-            Lot_Frontage=float(request.form.get('Lot_Frontage') or 0),
-            Lot_Area=int(request.form.get('Lot_Area') or 0),
-            Street=request.form.get('Street'),
-            Alley=request.form.get('Alley'),
-            Lot_Shape=request.form.get('Lot_Shape'),
-            Land_Contour=request.form.get('Land_Contour'),
-            Lot_Config=request.form.get('Lot_Config'),
-            Land_Slope=request.form.get('Land_Slope'),
-            Neighborhood=request.form.get('Neighborhood'),
-            MS_SubClass=int(request.form.get('MS_SubClass') or 0),
-            Overall_Qual=int(request.form.get('Overall_Qual') or 0),
-            Overall_Cond=int(request.form.get('Overall_Cond') or 0),
-            Year_Built=int(request.form.get('Year_Built') or 0),
-            Year_RemodAdd=int(request.form.get('Year_RemodAdd') or 0),
-            Bldg_Type=request.form.get('Bldg_Type'),
-            House_Style=request.form.get('House_Style'),
-            Foundation=request.form.get('Foundation'),
-            Mas_Vnr_Type=request.form.get('Mas_Vnr_Type'),
-            Mas_Vnr_Area=float(request.form.get('Mas_Vnr_Area') or 0),
-            Bsmt_Qual=request.form.get('Bsmt_Qual'),
-            Bsmt_Cond=request.form.get('Bsmt_Cond'),
-            Bsmt_Exposure=request.form.get('Bsmt_Exposure'),
-            BsmtFin_Type_1=request.form.get('BsmtFin_Type_1'),
-            BsmtFin_SF_1=float(request.form.get('BsmtFin_SF_1') or 0),
-            BsmtFin_Type_2=request.form.get('BsmtFin_Type_2'),
-            BsmtFin_SF_2=float(request.form.get('BsmtFin_SF_2') or 0),
-            Bsmt_Unf_SF=float(request.form.get('Bsmt_Unf_SF') or 0),
-            Total_Bsmt_SF=float(request.form.get('Total_Bsmt_SF') or 0),
-            First_Flr_SF=int(request.form.get('First_Flr_SF') or 0),
-            Second_Flr_SF=int(request.form.get('Second_Flr_SF') or 0),
-            Gr_Liv_Area=int(request.form.get('Gr_Liv_Area') or 0),
-            Bsmt_Full_Bath=int(request.form.get('Bsmt_Full_Bath') or 0),
-            Bsmt_Half_Bath=int(request.form.get('Bsmt_Half_Bath') or 0),
-            Full_Bath=int(request.form.get('Full_Bath') or 0),
-            Half_Bath=int(request.form.get('Half_Bath') or 0),
-            Bedroom_AbvGr=int(request.form.get('Bedroom_AbvGr') or 0),
-            Kitchen_AbvGr=int(request.form.get('Kitchen_AbvGr') or 0),
-            Kitchen_Qual=request.form.get('Kitchen_Qual'),
-            TotRms_AbvGrd=int(request.form.get('TotRms_AbvGrd') or 0),
-            Fireplaces=int(request.form.get('Fireplaces') or 0),
-            Fireplace_Qu=request.form.get('Fireplace_Qu'),
-            Garage_Type=request.form.get('Garage_Type'),
-            Garage_Yr_Blt=float(request.form.get('Garage_Yr_Blt') or 0),
-            Garage_Finish=request.form.get('Garage_Finish'),
-            Garage_Cars=int(request.form.get('Garage_Cars') or 0),
-            Garage_Area=float(request.form.get('Garage_Area') or 0),
-            Garage_Qual=request.form.get('Garage_Qual'),
-            Garage_Cond=request.form.get('Garage_Cond'),
-            Paved_Drive=request.form.get('Paved_Drive'),
-            Wood_Deck_SF=int(request.form.get('Wood_Deck_SF') or 0),
-            Open_Porch_SF=int(request.form.get('Open_Porch_SF') or 0),
-            Enclosed_Porch=int(request.form.get('Enclosed_Porch') or 0),
-            ThreeSsn_Porch=int(request.form.get('ThreeSsn_Porch') or 0),
-            Screen_Porch=int(request.form.get('Screen_Porch') or 0),
-            Pool_Area=int(request.form.get('Pool_Area') or 0),
-            Pool_QC=request.form.get('Pool_QC'),
-            Fence=request.form.get('Fence'),
-            Misc_Feature=request.form.get('Misc_Feature'),
-            Misc_Val=int(request.form.get('Misc_Val') or 0),
-            Heating_QC=request.form.get('Heating_QC'),
-            Central_Air=request.form.get('Central_Air'),
-            Electrical=request.form.get('Electrical'),
-            Mo_Sold=int(request.form.get('Mo_Sold') or 0),
-            Yr_Sold=int(request.form.get('Yr_Sold') or 0),
-            Sale_Type=request.form.get('Sale_Type'),
-            Sale_Condition=request.form.get('Sale_Condition')
-        )
+        # Field names and numeric coercion come from the shared feature schema
+        data = CustomData.from_form(request.form)
         
-        pred_df = data.get_data_as_data_frame()
+        pred_rows = data.get_data_as_record()
         
-        predict_pipeline = PredictPipeline()
-        results = predict_pipeline.predict(pred_df)
+        batcher = get_batcher()
+        if batcher.batcher_config.enabled:
+            # Concurrent requests are scored together in one vectorized call
+            try:
+                results = batcher.predict(pred_rows)
+            except BatcherOverloadedError:
+                return "The prediction service is busy, please retry shortly.", 503
+        else:
+            predict_pipeline = PredictPipeline()
+            results = predict_pipeline.predict(pred_rows)
         
         return render_template('home.html', results=results[0])
 
+## Route for bulk scoring
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores many houses in one request. Accepts either a JSON array of rows
+    (or {"rows": [...]}) keyed by the Ames column names, or an uploaded
+    CSV/Parquet file in the `file` form field. Prices are streamed back as
+    a JSON object {"predictions": [...]}, one price per input row. If scoring
+    fails mid-stream the object is still closed, with an "error" field and
+    the predictions made so far.
+    """
+    # Parsed by hand: type=int would silently fall back to the default on "abc"
+    try:
+        chunk_size = int(request.args.get('chunk_size', BATCH_CHUNK_SIZE))
+    except ValueError:
+        chunk_size = None
+    if chunk_size is None or not 1 <= chunk_size <= MAX_BATCH_CHUNK_SIZE:
+        return jsonify(error=f"chunk_size must be an integer between 1 and {MAX_BATCH_CHUNK_SIZE}"), 400
+    upload = request.files.get('file')
+
+    try:
+        if upload is not None:
+            import pandas as pd
+
+            filename = (upload.filename or '').lower()
+            if filename.endswith(('.parquet', '.pq')):
+                features = pd.read_parquet(upload.stream)
+            else:
+                # Chunked reader: the file is parsed and scored chunk by chunk
+                features = pd.read_csv(upload.stream, chunksize=chunk_size)
+        else:
+            payload = request.get_json(silent=True)
+            if isinstance(payload, dict):
+                payload = payload.get('rows')
+            if not isinstance(payload, list):
+                return jsonify(error="Expected a JSON array of rows or a CSV/Parquet file upload"), 400
+            bad_rows = [i for i, row in enumerate(payload) if not isinstance(row, dict)]
+            if bad_rows:
+                return jsonify(error="Every row must be a JSON object", rows=bad_rows[:100]), 400
+            # Encoded in full here, so a malformed value is a 400 rather than a cut-off stream
+            features = FEATURE_SCHEMA.encode_rows(payload)
+    except Exception as e:
+        return jsonify(error=f"Could not read input: {e}"), 400
+
+    predict_pipeline = PredictPipeline()
+
+    def generate():
+        yield '{"predictions": ['
+        first = True
+        try:
+            for preds in predict_pipeline.predict_batch(features, chunk_size=chunk_size):
+                body = json.dumps(preds.tolist())[1:-1]
+                if body:
+                    yield body if first else ', ' + body
+                    first = False
+        except Exception as e:
+            # The 200 is already sent: close the document and report the failure in it
+            logging.error(f"Batch scoring failed after the response started: {e}")
+            yield '], "error": ' + json.dumps(f"Scoring stopped: {e}") + '}'
+            return
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+## JSON inference API
+@app.route('/v1/predict', methods=['POST'])
+def predict_v1():
+    """
+    JSON API for internal services. The body is {"instances": [{...}, ...]}
+    or a single {"features": {...}}, keyed by the canonical Ames column names
+    ("Gr Liv Area", "Kitchen Qual", ...). Omitted or null features are
+    imputed. Returns {"predictions": [...], "model_version": "..."}.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    records = payload.get('instances')
+    if records is None and 'features' in payload:
+        records = [payload['features']]
+
+    rows, errors = FEATURE_SCHEMA.validate_records(records)
+    if errors:
+        return jsonify(error="Invalid features", details=errors[:100]), 400
+
+    predict_pipeline = PredictPipeline()
+    # The version of the bundle that scored the rows, not a second lookup a hot reload could change
+    preds, model_version = predict_pipeline.predict(rows, return_version=True)
+    return jsonify(predictions=preds.tolist(), model_version=model_version)
+
+## What-if / sensitivity sweeps
+@app.route('/v1/whatif', methods=['POST'])
+def whatif():
+    """
+    Prices a base property under a grid of feature changes in one pass:
+    {"base": {...features...},
+     "grid": {"Gr Liv Area": {"start": 1200, "stop": 2400, "step": 100},
+              "Kitchen Qual": ["TA", "Gd", "Ex"]},
+     "mode": "grid" | "one_at_a_time"}
+    "grid" returns the full price surface; "one_at_a_time" one price curve per feature.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    try:
+        result = WhatIfSweep().initiate_sweep(payload.get('base'), payload.get('grid'),
+                                              mode=payload.get('mode', 'grid'))
+    except WhatIfError as e:
+        return jsonify(error=str(e), details=e.details[:100]), 400
+    return jsonify(result)
+
+## Prediction explanations
+@app.route('/v1/explain', methods=['POST'])
+def explain():
+    """
+    Per-feature explanation of the predicted prices: {"instances": [{...}, ...],
+    "top": 10}. Contributions are in log-price, summed over the one-hot
+    columns of each Ames feature, and add up to the prediction together
+    with the expected price.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    top = payload.get('top')
+    if top is not None and (isinstance(top, bool) or not isinstance(top, int) or top < 1):
+        return jsonify(error="top must be a positive integer"), 400
+    try:
+        result = Explainer().initiate_explanations(payload.get('instances'), top=top)
+    except ExplanationUnavailableError as e:
+        return jsonify(error=str(e)), 422
+    except ExplanationError as e:
+        return jsonify(error=str(e), details=e.details[:100]), 400
+    return jsonify(result)
+
+## Comparable sales
+@app.route('/comps', methods=['POST'])
+def comps():
+    """
+    The k most similar past sales, with their SalePrice, next to the model
+    price: {"features": {...}, "k": 5} for one property, or
+    {"instances": [{...}, ...], "k": 5} for a batch.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object"), 400
+    records = payload.get('instances')
+    if records is None and 'features' in payload:
+        records = [payload['features']]
+    try:
+        result = CompsFinder().initiate_comps(records, k=payload.get('k'))
+    except CompsUnavailableError as e:
+        return jsonify(error=str(e)), 503
+    except CompsError as e:
+        return jsonify(error=str(e), details=e.details[:100]), 400
+    return jsonify(result)
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", debug=True)
@@ -0,0 +1,16 @@
+import sys
+import os
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app
+
+# ASGI entry point. The ASGI server reads each request body asynchronously
+# and only hands the complete request to a Flask worker thread, so slow
+# clients do not tie up threads. Run with e.g.
+#   uvicorn asgi:asgi_app --workers 4
+#   gunicorn -k uvicorn.workers.UvicornWorker asgi:asgi_app
+asgi_app = WsgiToAsgi(app)
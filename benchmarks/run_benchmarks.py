@@ -0,0 +1,406 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+
+import numpy as np
+import pandas as pd
+
+# Adjusting the path to import from the project root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA, TARGET_COLUMN, attribute_name
+from src.logger import logging
+
+SECTIONS = ("ingestion", "transformation", "training", "prediction", "load")
+
+
+@dataclass
+class BenchmarkConfig:
+    """
+    Configuration class for the benchmark suite.
+    """
+    source_data_path: str = os.path.join('notebook', 'data', "AmesHousing.csv")
+    results_dir: str = os.path.join('benchmarks', "results")
+    # Synthetic copies of the dataset, as multiples of its size
+    scales: list = field(default_factory=lambda: [1, 10, 100])
+    # Timed repetitions of every throughput measurement; the best one is reported
+    repeats: int = 3
+    # Search the full ModelTrainer grids instead of fitting each model once with library defaults
+    full_search: bool = False
+    single_row_requests: int = 200
+    batch_sizes: list = field(default_factory=lambda: [10, 100, 1000, 10000])
+    load_requests: int = 500
+    load_concurrency: int = 8
+    random_state: int = 42
+
+
+def _latency_summary(seconds):
+    """
+    Latency percentiles in milliseconds of a list of timings in seconds.
+    """
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def _best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _environment():
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def scale_dataset(df, factor, random_state=42):
+    """
+    Returns `factor` stacked copies of the Ames data. Areas and prices get
+    a little multiplicative noise so the copies are not exact duplicates.
+    """
+    if factor == 1:
+        return df
+    rng = np.random.default_rng(random_state)
+    scaled = pd.concat([df] * factor, ignore_index=True)
+    jittered = [c for c in FEATURE_SCHEMA.numerical_columns if c.endswith(("SF", "Area"))] + [TARGET_COLUMN]
+    for column in jittered:
+        noise = rng.normal(1.0, 0.02, size=len(scaled))
+        scaled[column] = (scaled[column] * noise).round()
+    return scaled
+
+
+class BenchmarkSuite:
+    """
+    Reproducible timings of the training and serving paths. Every section
+    writes into one results dict that is saved as JSON, so two runs (e.g.
+    before and after a change) can be compared with --compare.
+    """
+    def __init__(self, config=None):
+        self.benchmark_config = config or BenchmarkConfig()
+        self.work_dir = tempfile.mkdtemp(prefix="ames-bench-")
+        self._datasets = {}
+
+    def dataset_path(self, factor):
+        """
+        Writes (once) and returns the CSV of the dataset scaled by `factor`.
+        """
+        if factor not in self._datasets:
+            config = self.benchmark_config
+            if factor == 1:
+                path = config.source_data_path
+            else:
+                df = pd.read_csv(config.source_data_path, dtype=FEATURE_SCHEMA.pandas_dtypes())
+                path = os.path.join(self.work_dir, f"ames_x{factor}.csv")
+                scale_dataset(df, factor, config.random_state).to_csv(path, index=False)
+            self._datasets[factor] = path
+        return self._datasets[factor]
+
+    def run_ingestion(self):
+        """
+        DataIngestion end to end (CSV parse, typed Parquet copy, split) on
+        every scale, into a scratch directory. Cache hits are avoided by
+        removing the Parquet stamp before each run.
+        """
+        from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+
+        results = {}
+        for factor in self.benchmark_config.scales:
+            out_dir = os.path.join(self.work_dir, f"ingestion_x{factor}")
+            ingestion = DataIngestion()
+            ingestion.ingestion_config = DataIngestionConfig(
+                source_data_path=self.dataset_path(factor),
+                train_data_path=os.path.join(out_dir, "train.parquet"),
+                test_data_path=os.path.join(out_dir, "test.parquet"),
+                raw_data_path=os.path.join(out_dir, "data.parquet"),
+            )
+            stamp_path = ingestion.ingestion_config.raw_data_path + ".sha256"
+
+            def ingest():
+                if os.path.exists(stamp_path):
+                    os.remove(stamp_path)
+                ingestion.initiate_data_ingestion()
+
+            seconds = _best_of(self.benchmark_config.repeats, ingest)
+            n_rows = len(pd.read_parquet(ingestion.ingestion_config.raw_data_path, columns=[TARGET_COLUMN]))
+            results[f"x{factor}"] = {"rows": n_rows, "seconds": seconds, "rows_per_second": n_rows / seconds}
+            logging.info(f"Benchmark ingestion x{factor}: {n_rows / seconds:,.0f} rows/sec")
+        return results
+
+    def run_transformation(self):
+        """
+        Fit and transform throughput of the DataTransformation preprocessor,
+        and transform throughput of its compiled NumPy export, on every scale.
+        """
+        from src.components.compiled_preprocessor import CompiledPreprocessor
+        from src.components.data_transformation import DataTransformation
+
+        results = {}
+        for factor in self.benchmark_config.scales:
+            df = pd.read_csv(self.dataset_path(factor), dtype=FEATURE_SCHEMA.pandas_dtypes())
+            features = df.reindex(columns=FEATURE_SCHEMA.columns)
+            preprocessor = DataTransformation().get_data_transformer_object()
+
+            fit_seconds = _best_of(self.benchmark_config.repeats, lambda: preprocessor.fit_transform(features))
+            transform_seconds = _best_of(self.benchmark_config.repeats, lambda: preprocessor.transform(features))
+            compiled = CompiledPreprocessor.from_column_transformer(preprocessor, source_hash=None)
+            compiled_seconds = _best_of(self.benchmark_config.repeats, lambda: compiled.transform(features))
+
+            n_rows = len(df)
+            results[f"x{factor}"] = {
+                "rows": n_rows,
+                "fit_transform_rows_per_second": n_rows / fit_seconds,
+                "transform_rows_per_second": n_rows / transform_seconds,
+                "compiled_transform_rows_per_second": n_rows / compiled_seconds,
+            }
+            logging.info(f"Benchmark transformation x{factor}: {results[f'x{factor}']}")
+        return results
+
+    def run_training(self):
+        """
+        Per-model search and fit time of the ModelTrainer candidates on the
+        real (x1) data. The fold-score cache is disabled so nothing is reused.
+        """
+        from sklearn.model_selection import train_test_split
+        from src.components.data_transformation import DataTransformation
+        from src.components.model_trainer import ModelTrainer
+        from src.utils import evaluate_models
+
+        config = self.benchmark_config
+        df = pd.read_csv(config.source_data_path, dtype=FEATURE_SCHEMA.pandas_dtypes())
+        train_df, test_df = train_test_split(df, test_size=0.2, random_state=config.random_state)
+        preprocessor = DataTransformation().get_data_transformer_object()
+        x_train = preprocessor.fit_transform(train_df.drop(columns=[TARGET_COLUMN])).tocsr()
+        x_test = preprocessor.transform(test_df.drop(columns=[TARGET_COLUMN])).tocsr()
+        y_train = np.log(train_df[TARGET_COLUMN].to_numpy(dtype=np.float64))
+        y_test = np.log(test_df[TARGET_COLUMN].to_numpy(dtype=np.float64))
+
+        trainer = ModelTrainer()
+        trainer_config = trainer.model_trainer_config
+        models = trainer.get_models()
+        params = trainer.get_model_params() if config.full_search else {name: {} for name in models}
+
+        report = evaluate_models(x_train=x_train, y_train=y_train, x_test=x_test, y_test=y_test,
+                                 models=models, param=params,
+                                 cv=trainer_config.cv,
+                                 n_jobs=trainer_config.n_jobs,
+                                 cache_dir=None,
+                                 search=trainer_config.search,
+                                 time_budget=trainer_config.time_budget,
+                                 halving_factor=trainer_config.halving_factor,
+                                 early_stopping_rounds=trainer_config.early_stopping_rounds,
+                                 validation_fraction=trainer_config.validation_fraction)
+        return {
+            "full_search": config.full_search,
+            "models": {
+                name: {key: entry[key] for key in ("r2", "fit_seconds", "search_seconds")}
+                for name, entry in report.items()
+            },
+        }
+
+    def _serving_rows(self):
+        df = pd.read_csv(self.benchmark_config.source_data_path, dtype=FEATURE_SCHEMA.pandas_dtypes())
+        return df, FEATURE_SCHEMA.from_frame(df)
+
+    def run_prediction(self):
+        """
+        Artifact load time, single-row latency and batch throughput of
+        PredictPipeline on the trained artifacts, with the prediction cache
+        disabled so every row is really scored.
+        """
+        from src.pipeline.model_registry import ModelRegistry
+        from src.pipeline.predict_pipeline import PredictPipeline
+        from src.pipeline.prediction_cache import get_prediction_cache
+
+        config = self.benchmark_config
+        get_prediction_cache().cache_config.enabled = False
+        _, rows = self._serving_rows()
+
+        start = time.perf_counter()
+        bundle = ModelRegistry().get()
+        load_seconds = time.perf_counter() - start
+
+        pipeline = PredictPipeline()
+        pipeline.predict(rows[:1])
+        single = []
+        for i in range(config.single_row_requests):
+            row = rows[i % len(rows):i % len(rows) + 1]
+            start = time.perf_counter()
+            pipeline.predict(row)
+            single.append(time.perf_counter() - start)
+
+        batches = {}
+        for size in config.batch_sizes:
+            batch = rows[np.arange(size) % len(rows)]
+            timings = []
+            for _ in range(config.repeats):
+                start = time.perf_counter()
+                pipeline.predict(batch)
+                timings.append(time.perf_counter() - start)
+            batches[str(size)] = dict(_latency_summary(timings), rows_per_second=size / min(timings))
+
+        return {
+            "model": type(bundle.model).__name__,
+            "compiled_preprocessor": bundle.compiled_preprocessor is not None,
+            "artifact_load_seconds": load_seconds,
+            "single_row": _latency_summary(single),
+            "batch": batches,
+        }
+
+    def run_load(self):
+        """
+        Concurrent form posts against the Flask /predict route through the
+        app's test client (no network), with the prediction cache disabled.
+        """
+        from app import app
+        from src.pipeline.micro_batcher import get_batcher
+        from src.pipeline.prediction_cache import get_prediction_cache
+
+        config = self.benchmark_config
+        get_prediction_cache().cache_config.enabled = False
+        df, _ = self._serving_rows()
+        forms = [
+            {attribute_name(c): ('' if pd.isna(record[c]) else str(record[c])) for c in FEATURE_SCHEMA.columns}
+            for record in df.head(200).to_dict(orient='records')
+        ]
+
+        def post(i):
+            client = app.test_client()
+            start = time.perf_counter()
+            response = client.post('/predict', data=forms[i % len(forms)])
+            return time.perf_counter() - start, response.status_code
+
+        post(0)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=config.load_concurrency) as pool:
+            results = list(pool.map(post, range(config.load_requests)))
+        wall = time.perf_counter() - start
+
+        latencies = [seconds for seconds, _ in results]
+        errors = sum(1 for _, status in results if status != 200)
+        return {
+            "requests": config.load_requests,
+            "concurrency": config.load_concurrency,
+            "micro_batching": get_batcher().batcher_config.enabled,
+            "requests_per_second": config.load_requests / wall,
+            "errors": errors,
+            "latency": _latency_summary(latencies),
+        }
+
+    def initiate_benchmarks(self, sections=SECTIONS):
+        """
+        Runs the requested sections and writes the results JSON. Returns its path.
+        """
+        try:
+            results = {"environment": _environment(), "config": asdict(self.benchmark_config)}
+            for section in sections:
+                logging.info(f"Running {section} benchmark")
+                print(f"Running {section} benchmark...", flush=True)
+                try:
+                    results[section] = getattr(self, f"run_{section}")()
+                except FileNotFoundError as e:
+                    # Serving sections need trained artifacts
+                    results[section] = {"skipped": str(e)}
+                except CustomException as e:
+                    results[section] = {"skipped": str(e)}
+
+            os.makedirs(self.benchmark_config.results_dir, exist_ok=True)
+            results_path = os.path.join(self.benchmark_config.results_dir,
+                                        f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            with open(results_path, "w") as results_file:
+                json.dump(results, results_file, indent=2)
+            return results_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare_results(baseline_path, current_path):
+    """
+    Prints every numeric metric of two result files side by side with the
+    current/baseline ratio.
+    """
+    with open(baseline_path) as baseline_file, open(current_path) as current_file:
+        baseline = _flatten(json.load(baseline_file))
+        current = _flatten(json.load(current_file))
+    for name in sorted(baseline.keys() & current.keys()):
+        if name.startswith(("config.", "environment.")):
+            continue
+        ratio = current[name] / baseline[name] if baseline[name] else float("nan")
+        print(f"{name:<70} {baseline[name]:>14.4g} {current[name]:>14.4g} {ratio:>8.2f}x")
+
+
+if __name__ == "__main__":
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description="Benchmark the training and serving paths.")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, default=list(SECTIONS),
+                        help="Sections to run (default: all).")
+    parser.add_argument("--scales", nargs="+", type=int, default=defaults.scales,
+                        help="Dataset size multiples for ingestion and transformation.")
+    parser.add_argument("--repeats", type=int, default=defaults.repeats)
+    parser.add_argument("--full-search", action="store_true",
+                        help="Time the full ModelTrainer grids instead of one default fit per model.")
+    parser.add_argument("--load-requests", type=int, default=defaults.load_requests)
+    parser.add_argument("--load-concurrency", type=int, default=defaults.load_concurrency)
+    parser.add_argument("--compare", metavar="BASELINE_JSON",
+                        help="After the run, compare its results with this earlier results file.")
+    args = parser.parse_args()
+
+    config = BenchmarkConfig(
+        scales=args.scales,
+        repeats=args.repeats,
+        full_search=args.full_search,
+        load_requests=args.load_requests,
+        load_concurrency=args.load_concurrency,
+    )
+    results_path = BenchmarkSuite(config).initiate_benchmarks(args.only)
+    print(f"Benchmark results written to {results_path}")
+    if args.compare:
+        compare_results(args.compare, results_path)
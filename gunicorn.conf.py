@@ -0,0 +1,42 @@
+import gc
+import os
+
+# gunicorn -c gunicorn.conf.py app:app
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+# Import the app and load the model once in the master; workers share those pages copy-on-write
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+
+def when_ready(server):
+    """
+    With preload_app, loads the artifacts in the master before any worker
+    is forked and moves every object into the GC's permanent generation,
+    so collections in the workers do not write to (and so copy) the shared
+    model pages.
+    """
+    if not preload_app:
+        return
+    from src.pipeline.warmup import prewarm
+
+    prewarm()
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Artifacts preloaded in the master, {gc.get_freeze_count()} objects frozen")
+
+
+def post_worker_init(worker):
+    """
+    Runs in every worker after it imported the app and before it accepts
+    connections: load the artifacts and score a dummy row, so no request
+    pays the cold start.
+    """
+    from src.pipeline.warmup import prewarm
+
+    # In preload mode the model is already resident and this only runs the dummy prediction
+    report = prewarm()
+    phases = ", ".join(f"{name}={seconds:.3f}s" for name, seconds in report["phases"].items())
+    worker.log.info(f"Worker {worker.pid} ready in {report['total_seconds']:.3f}s ({phases})")
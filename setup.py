@@ -21,5 +21,11 @@ setup(
     author='Swayam Burde',
     author_email='swayamburde2004@gmail.com',
     packages=find_packages(),
-    install_requires=get_requirements('requirements.txt')
+    install_requires=get_requirements('requirements.txt'),
+    entry_points={
+        'console_scripts': [
+            'ames-batch-score=src.pipeline.batch_score:main',
+            'ames-update-model=src.pipeline.update_pipeline:main',
+        ],
+    },
 )
\ No newline at end of file
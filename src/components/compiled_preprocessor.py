@@ -0,0 +1,259 @@
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class CompiledPreprocessorConfig:
+    """
+    Configuration class for the flattened preprocessor export.
+    """
+    compiled_preprocessor_file_path = os.path.join('artifacts', "preprocessor_compiled.pkl")
+    # Rows of the test set used to check the export against sklearn
+    verification_rows: int = 500
+    tolerance: float = 1e-9
+    # Largest difference in model output (log price) allowed end to end
+    prediction_tolerance: float = 1e-6
+
+
+def _is_missing(value):
+    return value is None or value != value
+
+
+class CompiledPreprocessor:
+    """
+    NumPy-only equivalent of the fitted ColumnTransformer built by
+    DataTransformation.get_data_transformer_object.
+
+    The fitted statistics are flattened into plain arrays and dicts:
+    imputation fill values, mean/scale vectors for the numerical columns and,
+    for each categorical column, a category -> output column index dict with
+    the scaled one-hot value. Transforming a row is then a handful of NumPy
+    operations and dict lookups, without sklearn's validation overhead.
+
+    Missing values (NaN or None) are replaced by the imputer statistics and
+    unknown categories produce an all-zero one-hot block, as with
+    OneHotEncoder(handle_unknown="ignore").
+    """
+    def __init__(self, numerical_columns, num_fill, num_mean, num_scale, num_offset,
+                 categorical_columns, cat_fill, cat_index, cat_value, n_features_out, source_hash=None):
+        self.numerical_columns = list(numerical_columns)
+        self.num_fill = np.asarray(num_fill, dtype=np.float64)
+        self.num_mean = np.asarray(num_mean, dtype=np.float64)
+        self.num_scale = np.asarray(num_scale, dtype=np.float64)
+        self.num_offset = int(num_offset)
+        self.categorical_columns = list(categorical_columns)
+        self.cat_fill = list(cat_fill)
+        self.cat_index = [dict(lookup) for lookup in cat_index]
+        self.cat_value = np.asarray(cat_value, dtype=np.float64)
+        self.n_features_out = int(n_features_out)
+        # Hash of the preprocessor.pkl this export was built from
+        self.source_hash = source_hash
+
+    @classmethod
+    def from_column_transformer(cls, preprocessor, source_hash=None):
+        """
+        Flattens a fitted ColumnTransformer made of one numerical pipeline
+        (SimpleImputer -> StandardScaler) and one categorical pipeline
+        (SimpleImputer -> OneHotEncoder -> StandardScaler(with_mean=False)).
+        """
+        try:
+            numerical = categorical = None
+            offset = 0
+            for name, pipeline, columns in preprocessor.transformers_:
+                if pipeline == "drop" or name == "remainder":
+                    continue
+                steps = list(pipeline.named_steps.values())
+                encoder = next((step for step in steps if hasattr(step, "categories_")), None)
+                if encoder is None:
+                    imputer, scaler = steps
+                    width = len(columns)
+                    numerical = (list(columns), imputer, scaler, offset)
+                else:
+                    imputer, encoder, scaler = steps
+                    if getattr(encoder, "drop_idx_", None) is not None:
+                        raise ValueError("OneHotEncoder with drop is not supported")
+                    width = sum(len(categories) for categories in encoder.categories_)
+                    categorical = (list(columns), imputer, encoder, scaler, offset)
+                offset += width
+
+            if numerical is None or categorical is None:
+                raise ValueError("Expected one numerical and one categorical pipeline")
+
+            num_columns, num_imputer, num_scaler, num_offset = numerical
+            n_num = len(num_columns)
+            num_mean = num_scaler.mean_ if num_scaler.mean_ is not None else np.zeros(n_num)
+            num_scale = num_scaler.scale_ if num_scaler.scale_ is not None else np.ones(n_num)
+
+            cat_columns, cat_imputer, encoder, cat_scaler, cat_offset = categorical
+            n_onehot = sum(len(categories) for categories in encoder.categories_)
+            cat_scale = cat_scaler.scale_ if cat_scaler.scale_ is not None else np.ones(n_onehot)
+
+            cat_index = []
+            column = cat_offset
+            for categories in encoder.categories_:
+                cat_index.append({category: column + i for i, category in enumerate(categories)})
+                column += len(categories)
+
+            # Value written into a hot column: the encoder's 1.0 divided by the scaler's scale
+            cat_value = np.zeros(offset)
+            cat_value[cat_offset:cat_offset + n_onehot] = 1.0 / cat_scale
+
+            return cls(
+                numerical_columns=num_columns,
+                num_fill=num_imputer.statistics_,
+                num_mean=num_mean,
+                num_scale=num_scale,
+                num_offset=num_offset,
+                categorical_columns=cat_columns,
+                cat_fill=list(cat_imputer.statistics_),
+                cat_index=cat_index,
+                cat_value=cat_value,
+                n_features_out=offset,
+                source_hash=source_hash,
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def transform(self, features):
+        """
+        Transforms FeatureSchema records (structured array) or a DataFrame
+        into the dense model input matrix.
+        """
+        try:
+            n_rows = len(features)
+            out = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+
+            numeric = np.empty((n_rows, len(self.numerical_columns)), dtype=np.float64)
+            for j, column in enumerate(self.numerical_columns):
+                numeric[:, j] = features[column]
+            numeric = np.where(np.isnan(numeric), self.num_fill, numeric)
+            end = self.num_offset + len(self.numerical_columns)
+            out[:, self.num_offset:end] = (numeric - self.num_mean) / self.num_scale
+
+            for j, column in enumerate(self.categorical_columns):
+                lookup = self.cat_index[j]
+                fill = self.cat_fill[j]
+                values = features[column]
+                if hasattr(values, "to_numpy"):
+                    values = values.to_numpy(dtype=object)
+                for i, value in enumerate(values):
+                    if _is_missing(value):
+                        value = fill
+                    position = lookup.get(value)
+                    if position is not None:
+                        out[i, position] = self.cat_value[position]
+
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def output_columns(self):
+        """
+        Returns, for every output feature, the input column it was derived
+        from (every one-hot column maps back to its categorical column).
+        """
+        columns = [None] * self.n_features_out
+        for j, column in enumerate(self.numerical_columns):
+            columns[self.num_offset + j] = column
+        for column, lookup in zip(self.categorical_columns, self.cat_index):
+            for position in lookup.values():
+                columns[position] = column
+        return columns
+
+    def max_abs_difference(self, preprocessor, df):
+        """
+        Largest absolute difference between this transformer and the sklearn
+        preprocessor on `df`.
+        """
+        expected = preprocessor.transform(df)
+        if hasattr(expected, "toarray"):
+            expected = expected.toarray()
+        return float(np.max(np.abs(self.transform(df) - expected), initial=0.0))
+
+
+def verify_compiled_predictions(model, preprocessor, sample_df, config=None):
+    """
+    End-to-end check of the compiled serving path: scores `sample_df` with
+    `model` once through the compiled preprocessor and once through sklearn,
+    each converted by as_model_input as in serving and training. Equal
+    transformed matrices are not enough, since an estimator may read a
+    sparse and a dense matrix differently. When the predictions differ the
+    compiled export is removed and serving falls back to sklearn. Returns
+    True when the export is kept.
+    """
+    from src.utils import as_model_input, load_object
+
+    try:
+        config = config or CompiledPreprocessorConfig()
+        output_path = config.compiled_preprocessor_file_path
+        if not os.path.exists(output_path):
+            return False
+
+        compiled = load_object(output_path)
+        sample = sample_df.head(config.verification_rows)
+        served = model.predict(as_model_input(model, compiled.transform(sample)))
+        trained = model.predict(as_model_input(model, preprocessor.transform(sample)))
+        difference = float(np.max(np.abs(np.asarray(served) - np.asarray(trained)), initial=0.0))
+        if difference > config.prediction_tolerance:
+            logging.warning(f"Predictions through the compiled preprocessor differ by {difference}, removing it")
+            os.remove(output_path)
+            return False
+        logging.info(f"Compiled preprocessor gives the same predictions (max abs difference {difference:.2e})")
+        return True
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def export_compiled_preprocessor(preprocessor, preprocessor_path, sample_df=None, config=None):
+    """
+    Flattens `preprocessor` (saved at `preprocessor_path`), checks it against
+    sklearn on `sample_df` and saves it. Returns the export path, or None when
+    the check failed; serving then keeps using the sklearn preprocessor.
+    """
+    # Imported here so that serving code can load this module without sklearn
+    from src.utils import compute_file_hash, save_object
+
+    try:
+        config = config or CompiledPreprocessorConfig()
+        output_path = config.compiled_preprocessor_file_path
+        compiled = CompiledPreprocessor.from_column_transformer(
+            preprocessor, source_hash=compute_file_hash(preprocessor_path)
+        )
+
+        if sample_df is not None:
+            difference = compiled.max_abs_difference(preprocessor, sample_df.head(config.verification_rows))
+            if difference > config.tolerance:
+                logging.warning(f"Compiled preprocessor differs from sklearn by {difference}, not exporting it")
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return None
+            logging.info(f"Compiled preprocessor matches sklearn (max abs difference {difference:.2e})")
+
+        save_object(file_path=output_path, obj=compiled)
+        return output_path
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    # Converts an existing artifacts/preprocessor.pkl without retraining
+    import pandas as pd
+    from src.utils import load_object
+
+    preprocessor_path = os.path.join('artifacts', "preprocessor.pkl")
+    test_path = os.path.join('artifacts', "test.parquet")
+    sample = pd.read_parquet(test_path) if os.path.exists(test_path) else None
+    print(export_compiled_preprocessor(load_object(preprocessor_path), preprocessor_path, sample))
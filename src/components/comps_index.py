@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import shutil
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.feature_schema import TARGET_COLUMN
+from src.logger import logging
+
+COMPS_META_FILE = "meta.json"
+
+
+@dataclass
+class CompsIndexConfig:
+    """
+    Configuration class for the comparable-sales index.
+    """
+    index_dir = os.path.join("artifacts", "comps_index")
+    # Dimensions kept by the TruncatedSVD projection; None indexes the preprocessed features as they are
+    n_components: Optional[int] = 32
+    # Indexed sales compared with the queries per block, bounding the distance matrix size
+    query_chunk_rows: int = 65536
+    # Sale identifier returned with every neighbor (the row position when the column is missing)
+    id_column: str = "PID"
+    random_state: int = 42
+
+
+class CompsIndex:
+    """
+    Nearest-neighbor index over the preprocessed feature vectors of past
+    sales. The one-hot encoded vectors are projected onto their top
+    TruncatedSVD components (which works on the sparse matrix directly);
+    in that many dimensions a KD-tree degrades to a scan anyway, so queries
+    are an exact brute-force search: one matrix product per block of sales
+    and an argpartition for the k nearest. The projected points, their
+    squared norms, sale ids and prices are plain .npy files, memory-mapped
+    when serving so every worker shares one copy in the page cache.
+    """
+    def __init__(self, meta, components, points, sq_norms, ids, prices, chunk_rows=None):
+        self.meta = meta
+        self.components = components
+        self.points = points
+        self.sq_norms = sq_norms
+        self.ids = ids
+        self.prices = prices
+        self.n_rows = int(meta["n_rows"])
+        self.chunk_rows = chunk_rows or CompsIndexConfig.query_chunk_rows
+
+    @classmethod
+    def load(cls, index_dir, mmap_mode="r", chunk_rows=None):
+        try:
+            with open(os.path.join(index_dir, COMPS_META_FILE)) as meta_file:
+                meta = json.load(meta_file)
+            components_path = os.path.join(index_dir, "components.npy")
+            components = np.load(components_path) if os.path.exists(components_path) else None
+            return cls(
+                meta,
+                components,
+                np.load(os.path.join(index_dir, "points.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(index_dir, "sq_norms.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(index_dir, "ids.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(index_dir, "prices.npy"), mmap_mode=mmap_mode),
+                chunk_rows,
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def project(self, x):
+        """
+        Maps preprocessed feature vectors (dense or CSR) into the index space.
+        """
+        if self.components is None:
+            return x.toarray() if hasattr(x, "toarray") else np.asarray(x, dtype=np.float64)
+        return np.asarray(x @ self.components.T)
+
+    def query(self, x, k):
+        """
+        Returns (distances, positions), both of shape (n_rows, k), nearest first.
+        """
+        q = np.asarray(self.project(x), dtype=np.float64)
+        k = min(k, self.n_rows)
+        q_sq_norms = np.einsum("ij,ij->i", q, q)[:, None]
+        best_d2 = np.empty((q.shape[0], 0))
+        best_positions = np.empty((q.shape[0], 0), dtype=np.int64)
+
+        for start in range(0, self.n_rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, self.n_rows)
+            # ||q - p||^2 = ||q||^2 - 2 q.p + ||p||^2, one matrix product per block
+            d2 = q_sq_norms - 2.0 * (q @ self.points[start:stop].T) + self.sq_norms[start:stop]
+            positions = np.broadcast_to(np.arange(start, stop), d2.shape)
+            d2 = np.concatenate([best_d2, d2], axis=1)
+            positions = np.concatenate([best_positions, positions], axis=1)
+            if d2.shape[1] > k:
+                keep = np.argpartition(d2, k - 1, axis=1)[:, :k]
+                d2 = np.take_along_axis(d2, keep, axis=1)
+                positions = np.take_along_axis(positions, keep, axis=1)
+            best_d2, best_positions = d2, positions
+
+        order = np.argsort(best_d2, axis=1, kind="stable")
+        distances = np.sqrt(np.maximum(np.take_along_axis(best_d2, order, axis=1), 0.0))
+        return distances, np.take_along_axis(best_positions, order, axis=1)
+
+
+def build_comps_index(x, df, preprocessor_path, config=None):
+    """
+    Builds the index over the preprocessed training matrix `x` and the
+    DataFrame `df` it was transformed from (ids and SalePrice), and saves
+    it. Returns the index directory.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from src.utils import compute_file_hash
+
+    try:
+        config = config or CompsIndexConfig()
+        index_dir = config.index_dir
+        if os.path.exists(index_dir):
+            shutil.rmtree(index_dir)
+        os.makedirs(index_dir)
+
+        meta = {"n_rows": int(x.shape[0]), "n_features": int(x.shape[1])}
+        n_components = config.n_components
+        if n_components is not None and n_components < x.shape[1]:
+            svd = TruncatedSVD(n_components=n_components, random_state=config.random_state)
+            points = svd.fit_transform(x)
+            np.save(os.path.join(index_dir, "components.npy"), svd.components_)
+            meta["explained_variance_ratio"] = float(svd.explained_variance_ratio_.sum())
+        else:
+            points = x.toarray() if hasattr(x, "toarray") else np.asarray(x, dtype=np.float64)
+        points = np.ascontiguousarray(points, dtype=np.float64)
+        meta["n_components"] = int(points.shape[1])
+
+        np.save(os.path.join(index_dir, "points.npy"), points)
+        np.save(os.path.join(index_dir, "sq_norms.npy"), np.einsum("ij,ij->i", points, points))
+        if config.id_column in df.columns:
+            ids = df[config.id_column].to_numpy(dtype=np.int64)
+        else:
+            ids = np.arange(len(df), dtype=np.int64)
+        np.save(os.path.join(index_dir, "ids.npy"), ids)
+        np.save(os.path.join(index_dir, "prices.npy"), df[TARGET_COLUMN].to_numpy(dtype=np.float64))
+
+        meta.update({
+            "id_column": config.id_column if config.id_column in df.columns else None,
+            "preprocessor_hash": compute_file_hash(preprocessor_path),
+        })
+        # meta.json is written last: its presence marks a complete index
+        with open(os.path.join(index_dir, COMPS_META_FILE), "w") as meta_file:
+            json.dump(meta, meta_file, indent=2)
+
+        logging.info(f"Built the comps index of {meta['n_rows']} sales in {meta['n_components']} dimensions")
+        return index_dir
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -2,6 +2,8 @@ import os
 import sys
 from src.exception import CustomException
 from src.logger import logging
+from src.feature_schema import FEATURE_SCHEMA
+from src.utils import compute_file_hash
 import pandas as pd
 
 from sklearn.model_selection import train_test_split
@@ -14,30 +16,63 @@ from src.components.model_trainer import ModelTrainerConfig
 from src.components.model_trainer import ModelTrainer
 @dataclass
 class DataIngestionConfig:
-    train_data_path: str=os.path.join('artifacts',"train.csv")
-    test_data_path: str=os.path.join('artifacts',"test.csv")
-    raw_data_path: str=os.path.join('artifacts',"data.csv")
+    source_data_path: str=os.path.join('notebook','data',"AmesHousing.csv")
+    train_data_path: str=os.path.join('artifacts',"train.parquet")
+    test_data_path: str=os.path.join('artifacts',"test.parquet")
+    raw_data_path: str=os.path.join('artifacts',"data.parquet")
+    # Sales appended by the incremental update pipeline, merged into every full run
+    additional_data_path: str=os.path.join('artifacts',"new_sales.parquet")
+    test_size: float=0.2
+    random_state: int=42
 
 class DataIngestion:
     def __init__(self):
         self.ingestion_config=DataIngestionConfig()
 
     def initiate_data_ingestion(self):
+        """
+        Reads the source CSV once with explicit dtypes (categorical columns as
+        pandas categories), keeps a typed Parquet copy of it and writes the
+        train/test split as Parquet. When the source file has not changed
+        since the last run, the Parquet copy is read instead of re-parsing
+        and rewriting the CSV. Sales added by incremental updates are
+        appended before the split.
+        """
         logging.info("Entered the data ingestion method or component")
         try:
-            df=pd.read_csv('notebook/data/AmesHousing.csv')
-            logging.info('Read the dataset as dataframe')
-
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path),exist_ok=True)
 
-            df.to_csv(self.ingestion_config.raw_data_path,index=False,header=True)
+            source_hash=compute_file_hash(self.ingestion_config.source_data_path)
+            stamp_path=self.ingestion_config.raw_data_path+".sha256"
+            previous_hash=None
+            if os.path.exists(stamp_path) and os.path.exists(self.ingestion_config.raw_data_path):
+                with open(stamp_path) as stamp_file:
+                    previous_hash=stamp_file.read().strip()
+
+            if previous_hash==source_hash:
+                df=pd.read_parquet(self.ingestion_config.raw_data_path,memory_map=True)
+                logging.info('Source data unchanged, read the typed raw copy')
+            else:
+                df=pd.read_csv(self.ingestion_config.source_data_path,dtype=FEATURE_SCHEMA.pandas_dtypes())
+                logging.info('Read the dataset as dataframe')
+
+                df.to_parquet(self.ingestion_config.raw_data_path,index=False)
+                with open(stamp_path,"w") as stamp_file:
+                    stamp_file.write(source_hash)
+
+            if os.path.exists(self.ingestion_config.additional_data_path):
+                additional=pd.read_parquet(self.ingestion_config.additional_data_path)
+                dtypes={c:t for c,t in FEATURE_SCHEMA.pandas_dtypes().items() if c in df.columns}
+                df=pd.concat([df,additional],ignore_index=True).astype(dtypes)
+                logging.info(f"Added {len(additional)} sales from {self.ingestion_config.additional_data_path}")
 
             logging.info("Train test split initiated")
-            train_set,test_set=train_test_split(df,test_size=0.2,random_state=42)
+            train_set,test_set=train_test_split(df,test_size=self.ingestion_config.test_size,
+                                                random_state=self.ingestion_config.random_state)
 
-            train_set.to_csv(self.ingestion_config.train_data_path,index=False,header=True)
+            train_set.to_parquet(self.ingestion_config.train_data_path,index=False)
 
-            test_set.to_csv(self.ingestion_config.test_data_path,index=False,header=True)
+            test_set.to_parquet(self.ingestion_config.test_data_path,index=False)
 
             logging.info("Ingestion of the data iss completed")
 
@@ -54,10 +89,10 @@ if __name__=="__main__":
     train_data,test_data=obj.initiate_data_ingestion()
 
     data_transformation=DataTransformation()
-    train_arr,test_arr,_=data_transformation.initiate_data_transformation(train_data,test_data)
+    x_train,y_train,x_test,y_test,_=data_transformation.initiate_data_transformation(train_data,test_data)
 
     modeltrainer=ModelTrainer()
-    print(modeltrainer.initiate_model_trainer(train_arr,test_arr))
+    print(modeltrainer.initiate_model_trainer(x_train,y_train,x_test,y_test))
 
 
 
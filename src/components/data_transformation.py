@@ -4,6 +4,7 @@ from dataclasses import dataclass
 
 import numpy as np 
 import pandas as pd
+import scipy.sparse
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
@@ -14,8 +15,12 @@ from sklearn.preprocessing import OneHotEncoder, StandardScaler
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.exception import CustomException
+from src.components.comps_index import build_comps_index
+from src.components.compiled_preprocessor import export_compiled_preprocessor
+from src.feature_schema import FEATURE_SCHEMA, TARGET_COLUMN
 from src.logger import logging
-from src.utils import save_object
+from src.pipeline.profiler import PROFILER
+from src.utils import save_object, save_matrix, load_matrix
 
 @dataclass
 class DataTransformationConfig:
@@ -24,6 +29,12 @@ class DataTransformationConfig:
     Specifies the path to save the preprocessing object.
     """
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")
+    # Keep the one-hot encoded feature matrix sparse (CSR) instead of densifying it
+    sparse_output: bool = True
+    # dtype of the feature matrix and target, e.g. "float32" to halve memory
+    feature_dtype: str = "float64"
+    # Transformed matrices as .npy files that the trainer memory-maps
+    transformed_data_dir = os.path.join('artifacts', "transformed")
 
 class DataTransformation:
     """
@@ -42,30 +53,11 @@ class DataTransformation:
         3. One-hot encode categorical features.
         """
         try:
-            # These are the columns identified from your EDA notebook for modeling
-            numerical_columns = [
-                'MS SubClass', 'Lot Frontage', 'Lot Area', 'Overall Qual', 'Overall Cond', 
-                'Year Built', 'Year Remod/Add', 'Mas Vnr Area', 'BsmtFin SF 1', 'BsmtFin SF 2', 
-                'Bsmt Unf SF', 'Total Bsmt SF', '1st Flr SF', '2nd Flr SF', 'Low Qual Fin SF', 
-                'Gr Liv Area', 'Bsmt Full Bath', 'Bsmt Half Bath', 'Full Bath', 'Half Bath', 
-                'Bedroom AbvGr', 'Kitchen AbvGr', 'TotRms AbvGrd', 'Fireplaces', 'Garage Yr Blt', 
-                'Garage Cars', 'Garage Area', 'Wood Deck SF', 'Open Porch SF', 'Enclosed Porch', 
-                '3Ssn Porch', 'Screen Porch', 'Pool Area', 'Misc Val', 'Mo Sold', 'Yr Sold'
-            ]
-            
-            categorical_columns = [
-                'MS Zoning', 'Street', 'Lot Shape', 'Land Contour', 'Utilities', 'Lot Config', 
-                'Land Slope', 'Neighborhood', 'Condition 1', 'Condition 2', 'Bldg Type', 
-                'House Style', 'Roof Style', 'Roof Matl', 'Exterior 1st', 'Exterior 2nd', 
-                'Mas Vnr Type', 'Exter Qual', 'Exter Cond', 'Foundation', 'Bsmt Qual', 'Bsmt Cond', 
-                'Bsmt Exposure', 'BsmtFin Type 1', 'BsmtFin Type 2', 'Heating', 'Heating QC', 
-                'Central Air', 'Electrical', 'Kitchen Qual', 'Functional', 'Fireplace Qu', 
-                'Garage Type', 'Garage Finish', 'Garage Qual', 'Garage Cond', 'Paved Drive', 
-                'Sale Type', 'Sale Condition'
-            ]
-
-            logging.info(f"Categorical columns: {categorical_columns}")
-            logging.info(f"Numerical columns: {numerical_columns}")
+            numerical_columns = FEATURE_SCHEMA.numerical_columns
+            categorical_columns = FEATURE_SCHEMA.categorical_columns
+
+            logging.debug(f"Categorical columns: {categorical_columns}")
+            logging.debug(f"Numerical columns: {numerical_columns}")
 
             # Pipeline for numerical features: Impute with mean, then scale.
             num_pipeline = Pipeline(
@@ -89,7 +81,8 @@ class DataTransformation:
                 [
                     ("num_pipeline", num_pipeline, numerical_columns),
                     ("cat_pipeline", cat_pipeline, categorical_columns)
-                ]
+                ],
+                sparse_threshold=1.0 if self.data_transformation_config.sparse_output else 0.0
             )
 
             return preprocessor
@@ -102,18 +95,22 @@ class DataTransformation:
         This method initiates the data transformation process.
         
         It reads train and test data, applies the preprocessing pipeline,
-        and saves the preprocessor object.
+        and saves the preprocessor object. Returns the train/test feature
+        matrices (CSR when sparse), the log-target vectors and the
+        preprocessor path.
         """
         try:
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
+            # Typed Parquet written by DataIngestion: no dtype inference, categories kept
+            with PROFILER.stage("transformation.read"):
+                train_df = pd.read_parquet(train_path, memory_map=True)
+                test_df = pd.read_parquet(test_path, memory_map=True)
 
             logging.info("Read train and test data completed")
             logging.info("Obtaining preprocessing object")
 
             preprocessing_obj = self.get_data_transformer_object()
 
-            target_column_name = "SalePrice"
+            target_column_name = TARGET_COLUMN
 
             # Separate features (X) and target (y) for training data
             input_feature_train_df = train_df.drop(columns=[target_column_name], axis=1)
@@ -126,27 +123,29 @@ class DataTransformation:
             logging.info("Applying preprocessing object on training and testing dataframes.")
 
             # Apply the transformer to the datasets
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
+            with PROFILER.stage("transformation.fit_transform"):
+                input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
+                input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
 
             # Log transform the target variable to handle skewness, as done in the notebook
             log_target_train = np.log(target_feature_train_df)
             log_target_test = np.log(target_feature_test_df)
 
-            # Combine transformed features and target variable into a single array
-            # Convert to dense array if the result is sparse, otherwise use asarray
-            import scipy.sparse
-            if scipy.sparse.issparse(input_feature_train_arr):
-                train_features = input_feature_train_arr.toarray() # type: ignore
-            else:
-                train_features = np.asarray(input_feature_train_arr)
-            if scipy.sparse.issparse(input_feature_test_arr):
-                test_features = input_feature_test_arr.toarray() # type: ignore
-            else:
-                test_features = np.asarray(input_feature_test_arr)
-
-            train_arr = np.c_[train_features, np.array(log_target_train)]
-            test_arr = np.c_[test_features, np.array(log_target_test)]
+            # Features stay CSR when the one-hot encoder made them sparse; the
+            # target is returned as its own vector instead of a stacked column
+            dtype = self.data_transformation_config.feature_dtype
+            with PROFILER.stage("transformation.convert"):
+                x_train = input_feature_train_arr.astype(dtype, copy=False)
+                x_test = input_feature_test_arr.astype(dtype, copy=False)
+                if scipy.sparse.issparse(x_train):
+                    x_train, x_test = x_train.tocsr(), x_test.tocsr()
+                    logging.info(f"Sparse feature matrix {x_train.shape}, density {x_train.nnz / np.prod(x_train.shape):.3f}")
+
+                y_train = np.asarray(log_target_train, dtype=dtype)
+                y_test = np.asarray(log_target_test, dtype=dtype)
+
+            with PROFILER.stage("transformation.save"):
+                self.save_transformed_data(x_train, y_train, x_test, y_test)
 
             logging.info("Saved preprocessing object.")
 
@@ -155,11 +154,54 @@ class DataTransformation:
                 obj=preprocessing_obj
             )
 
+            # Flat NumPy-only copy of the fitted preprocessor for fast serving
+            export_compiled_preprocessor(
+                preprocessing_obj,
+                self.data_transformation_config.preprocessor_obj_file_path,
+                sample_df=input_feature_test_df,
+            )
+
+            # Nearest-neighbor index of the training sales for the comps lookup
+            build_comps_index(x_train, train_df, self.data_transformation_config.preprocessor_obj_file_path)
+
             return (
-                train_arr,
-                test_arr,
+                x_train,
+                y_train,
+                x_test,
+                y_test,
                 self.data_transformation_config.preprocessor_obj_file_path,
             )
         except Exception as e:
             raise CustomException(e, sys)
 
+    def save_transformed_data(self, x_train, y_train, x_test, y_test):
+        """
+        Writes the transformed matrices and targets as uncompressed .npy files.
+        """
+        try:
+            data_dir = self.data_transformation_config.transformed_data_dir
+            save_matrix(os.path.join(data_dir, "x_train"), x_train)
+            save_matrix(os.path.join(data_dir, "x_test"), x_test)
+            save_matrix(os.path.join(data_dir, "y_train"), y_train)
+            save_matrix(os.path.join(data_dir, "y_test"), y_test)
+            logging.info(f"Saved transformed data to {data_dir}")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load_transformed_data(self):
+        """
+        Memory-maps the matrices written by save_transformed_data and returns
+        (x_train, y_train, x_test, y_test) without copying them into memory.
+        """
+        try:
+            data_dir = self.data_transformation_config.transformed_data_dir
+            return (
+                load_matrix(os.path.join(data_dir, "x_train")),
+                load_matrix(os.path.join(data_dir, "y_train")),
+                load_matrix(os.path.join(data_dir, "x_test")),
+                load_matrix(os.path.join(data_dir, "y_test")),
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import as_model_input, _fit_estimator
+
+ENSEMBLE_METHODS = ("average", "stacking")
+
+
+@dataclass
+class EnsembleConfig:
+    """
+    Configuration class for the top-k ensemble.
+    """
+    # "average" (non-negative weights summing to one) or "stacking" (linear meta-model)
+    method: str = "average"
+    top_k: int = 3
+    cv: int = 3
+    n_jobs: int = -1
+    report_file_path: str = os.path.join("artifacts", "ensemble_report.json")
+    # Timed repetitions of the single-row prediction in the report
+    latency_repeats: int = 50
+
+
+class EnsembleRegressor:
+    """
+    Weighted combination of fitted regressors. predict() evaluates the
+    members concurrently on a thread pool (the tree libraries release the
+    GIL while predicting) and returns intercept + sum(weight * prediction).
+    """
+    def __init__(self, members, weights, intercept=0.0):
+        self.members = list(members)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.n_features_in_ = self.members[0][1].n_features_in_
+        self._pool = None
+        self._pid = None
+
+    def __getstate__(self):
+        # The thread pool is per process and never pickled
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["_pid"] = None
+        return state
+
+    def _executor(self):
+        # Threads do not survive fork(): a forked worker creates its own pool
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=len(self.members), thread_name_prefix="ensemble")
+            self._pid = os.getpid()
+        return self._pool
+
+    def member_predictions(self, x):
+        """
+        Returns the (n_rows, n_members) matrix of member predictions.
+        """
+        futures = [
+            self._executor().submit(lambda m: m.predict(as_model_input(m, x)), estimator)
+            for _, estimator in self.members
+        ]
+        return np.column_stack([future.result() for future in futures])
+
+    def predict(self, x):
+        try:
+            return self.intercept + self.member_predictions(x) @ self.weights
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _fold_predictions(estimator, fit_options, x, y, train_idx, test_idx):
+    from sklearn.base import clone
+
+    fold_estimator = clone(estimator)
+    _fit_estimator(fold_estimator, x[train_idx], y[train_idx], **fit_options)
+    return test_idx, fold_estimator.predict(as_model_input(fold_estimator, x[test_idx]))
+
+
+def out_of_fold_predictions(estimators, x, y, cv=3, n_jobs=-1, fit_options=None):
+    """
+    Returns the (n_rows, n_estimators) matrix of out-of-fold predictions:
+    every row is predicted by a copy of each estimator (same parameters)
+    fitted on the other folds.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import KFold
+
+    fit_options = fit_options or {}
+    folds = list(KFold(n_splits=cv).split(np.arange(y.shape[0])))
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fold_predictions)(estimator, fit_options, x, y, train_idx, test_idx)
+        for estimator in estimators
+        for train_idx, test_idx in folds
+    )
+
+    oof = np.empty((y.shape[0], len(estimators)), dtype=np.float64)
+    for position, (test_idx, preds) in enumerate(results):
+        oof[test_idx, position // len(folds)] = preds
+    return oof
+
+
+def fit_ensemble_weights(oof, y, method="average"):
+    """
+    Fits the combination weights on out-of-fold predictions. Returns
+    (weights, intercept).
+    """
+    if method == "average":
+        from scipy.optimize import nnls
+
+        weights, _ = nnls(oof, y)
+        total = weights.sum()
+        # All-zero NNLS solution: fall back to a plain mean
+        weights = weights / total if total > 0 else np.full(oof.shape[1], 1.0 / oof.shape[1])
+        return weights, 0.0
+    if method == "stacking":
+        from sklearn.linear_model import LinearRegression
+
+        meta_model = LinearRegression(positive=True).fit(oof, y)
+        return meta_model.coef_, float(meta_model.intercept_)
+    raise ValueError(f"Unknown ensemble method '{method}', expected one of {ENSEMBLE_METHODS}")
+
+
+def _latency(model, x, repeats):
+    single = []
+    for i in range(repeats):
+        row = x[i % x.shape[0]:i % x.shape[0] + 1]
+        start = time.perf_counter()
+        model.predict(as_model_input(model, row))
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict(as_model_input(model, x))
+    batch = time.perf_counter() - start
+    return {
+        "single_row_p50_ms": float(np.percentile(single, 50) * 1000),
+        "single_row_p99_ms": float(np.percentile(single, 99) * 1000),
+        "batch_ms": batch * 1000,
+        "batch_rows": int(x.shape[0]),
+    }
+
+
+class EnsembleBuilder:
+    """
+    Builds an EnsembleRegressor from the top-k entries of the model report
+    and writes a latency/accuracy comparison against the single best model.
+    """
+    def __init__(self, config=None):
+        self.ensemble_config = config or EnsembleConfig()
+
+    def initiate_ensemble(self, model_report, models, x_train, y_train, x_test, y_test, fit_options=None):
+        """
+        `models` holds the fitted best estimator of every report entry.
+        Returns (ensemble, report); report["use_ensemble"] tells whether the
+        ensemble's out-of-fold R2 is at least that of the best single model.
+        The test set is only scored for the report, never for the decision.
+        """
+        from sklearn.metrics import r2_score
+
+        try:
+            config = self.ensemble_config
+            if config.top_k < 2:
+                raise ValueError(f"An ensemble needs top_k >= 2 models, got {config.top_k}")
+            ranked = sorted(model_report, key=lambda name: model_report[name]["r2"], reverse=True)
+            names = ranked[:config.top_k]
+            estimators = [models[name] for name in names]
+            logging.info(f"Building a {config.method} ensemble of {names}")
+
+            oof = out_of_fold_predictions(estimators, x_train, y_train, cv=config.cv,
+                                          n_jobs=config.n_jobs, fit_options=fit_options)
+            weights, intercept = fit_ensemble_weights(oof, y_train, config.method)
+            ensemble = EnsembleRegressor(list(zip(names, estimators)), weights, intercept)
+
+            oof_r2 = {name: float(r2_score(y_train, oof[:, i])) for i, name in enumerate(names)}
+            ensemble_oof_r2 = float(r2_score(y_train, intercept + oof @ weights))
+            best = models[ranked[0]]
+            ensemble_r2 = float(r2_score(y_test, ensemble.predict(x_test)))
+            best_r2 = float(r2_score(y_test, best.predict(as_model_input(best, x_test))))
+            report = {
+                "method": config.method,
+                "members": {name: float(weight) for name, weight in zip(names, weights)},
+                "intercept": intercept,
+                "oof_r2": oof_r2,
+                "single_best": dict(name=ranked[0], r2=best_r2, oof_r2=oof_r2[ranked[0]],
+                                    **_latency(best, x_test, config.latency_repeats)),
+                "ensemble": dict(r2=ensemble_r2, oof_r2=ensemble_oof_r2,
+                                 **_latency(ensemble, x_test, config.latency_repeats)),
+                "use_ensemble": ensemble_oof_r2 >= oof_r2[ranked[0]],
+            }
+
+            os.makedirs(os.path.dirname(config.report_file_path), exist_ok=True)
+            with open(config.report_file_path, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+            logging.info(f"Ensemble out-of-fold R2={ensemble_oof_r2:.4f} vs {ranked[0]} "
+                         f"{oof_r2[ranked[0]]:.4f} (test {ensemble_r2:.4f} vs {best_r2:.4f}), "
+                         f"report at {config.report_file_path}")
+            return ensemble, report
+
+        except Exception as e:
+            raise CustomException(e, sys)
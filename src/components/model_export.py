@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import shutil
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import compute_file_hash
+
+NATIVE_META_FILE = "meta.json"
+
+
+@dataclass
+class ModelExportConfig:
+    """
+    Configuration class for the native model export.
+    """
+    native_model_dir = os.path.join("artifacts", "model_native")
+    # Preprocessor the model was trained with; its hash is recorded so serving refuses any other
+    preprocessor_file_path = os.path.join("artifacts", "preprocessor.pkl")
+    # Largest difference (log price) allowed between the export and model.predict
+    # on the validation rows; XGBoost accumulates its trees in float32
+    prediction_tolerance: float = 1e-4
+
+
+class _TreeArrays:
+    """
+    Accumulates the nodes of several binary trees into flat arrays. Node
+    indices are global; `left`/`right` are -1 at leaves and `value` holds the
+    leaf output (and, at internal nodes, the cover-weighted mean of the
+    leaves below, which path attribution uses).
+    """
+    def __init__(self):
+        self.parts = {name: [] for name in
+                      ("feature", "threshold", "left", "right", "value", "cover", "default_left")}
+        self.roots = []
+        self.n_nodes = 0
+        self.max_depth = 0
+
+    def add(self, feature, threshold, left, right, value, cover, default_left=None, depth=None):
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        n = left.shape[0]
+        is_leaf = left < 0
+        offset = self.n_nodes
+
+        self.parts["feature"].append(np.where(is_leaf, 0, feature).astype(np.int32))
+        self.parts["threshold"].append(np.where(is_leaf, 0.0, threshold).astype(np.float64))
+        self.parts["left"].append(np.where(is_leaf, -1, left + offset).astype(np.int32))
+        self.parts["right"].append(np.where(is_leaf, -1, right + offset).astype(np.int32))
+        self.parts["value"].append(np.asarray(value, dtype=np.float64))
+        self.parts["cover"].append(np.asarray(cover, dtype=np.float64))
+        if default_left is None:
+            default_left = np.ones(n, dtype=bool)
+        self.parts["default_left"].append(np.asarray(default_left, dtype=bool))
+
+        self.roots.append(offset)
+        self.n_nodes += n
+        self.max_depth = max(self.max_depth, depth if depth is not None else _tree_depth(left, right))
+
+    def arrays(self):
+        arrays = {name: np.concatenate(parts) for name, parts in self.parts.items()}
+        arrays["roots"] = np.asarray(self.roots, dtype=np.int32)
+        return arrays
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(left.shape[0], dtype=np.int64)
+    # Children always have a larger index than their parent in every format exported here
+    for node in range(left.shape[0]):
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max(initial=0))
+
+
+def _fill_internal_values(left, right, value, cover):
+    """
+    Sets every internal node's value to the cover-weighted mean of its children.
+    """
+    value = np.array(value, dtype=np.float64)
+    cover = np.array(cover, dtype=np.float64)
+    for node in range(left.shape[0] - 1, -1, -1):
+        l, r = left[node], right[node]
+        if l < 0:
+            continue
+        total = cover[l] + cover[r]
+        cover[node] = total
+        value[node] = (cover[l] * value[l] + cover[r] * value[r]) / total if total > 0 else 0.5 * (value[l] + value[r])
+    return value, cover
+
+
+def _add_sklearn_tree(trees, estimator):
+    tree = estimator.tree_
+    trees.add(
+        feature=tree.feature,
+        threshold=tree.threshold,
+        left=tree.children_left,
+        right=tree.children_right,
+        value=tree.value[:, 0, 0],
+        cover=tree.weighted_n_node_samples,
+        depth=tree.max_depth,
+    )
+
+
+def _export_sklearn(model):
+    name = type(model).__name__
+    trees = _TreeArrays()
+    meta = {"kind": "tree_ensemble", "aggregation": "sum", "base_score": 0.0, "strict_less": False}
+
+    if name == "DecisionTreeRegressor":
+        _add_sklearn_tree(trees, model)
+        tree_weight = [1.0]
+    elif name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        for estimator in model.estimators_:
+            _add_sklearn_tree(trees, estimator)
+        tree_weight = [1.0 / len(model.estimators_)] * len(model.estimators_)
+    elif name == "GradientBoostingRegressor":
+        for estimator in model.estimators_[:, 0]:
+            _add_sklearn_tree(trees, estimator)
+        tree_weight = [model.learning_rate] * model.estimators_.shape[0]
+        if model.init_ != "zero":
+            if type(model.init_).__name__ != "DummyRegressor":
+                return None, None
+            meta["base_score"] = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+    elif name == "AdaBoostRegressor":
+        for estimator in model.estimators_:
+            _add_sklearn_tree(trees, estimator)
+        tree_weight = list(model.estimator_weights_[:len(model.estimators_)])
+        meta["aggregation"] = "weighted_median"
+    else:
+        return None, None
+
+    arrays = trees.arrays()
+    arrays["tree_weight"] = np.asarray(tree_weight, dtype=np.float64)
+    meta["max_depth"] = trees.max_depth
+    return meta, arrays
+
+
+def _export_xgboost(model, export_dir):
+    booster = model.get_booster()
+    best_iteration = getattr(model, "best_iteration", None)
+    if best_iteration is not None:
+        # Early stopping: predict() only uses the trees up to the best iteration
+        booster = booster[: best_iteration + 1]
+
+    native_path = os.path.join(export_dir, "model.json")
+    booster.save_model(native_path)
+    with open(native_path) as native_file:
+        learner = json.load(native_file)["learner"]
+
+    if learner["gradient_booster"]["name"] != "gbtree":
+        return None, None
+
+    trees = _TreeArrays()
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        right = np.asarray(tree["right_children"], dtype=np.int64)
+        leaf_value = np.asarray(tree["split_conditions"], dtype=np.float64)
+        value, cover = _fill_internal_values(left, right, leaf_value, tree["sum_hessian"])
+        trees.add(
+            feature=np.asarray(tree["split_indices"]),
+            threshold=leaf_value,
+            left=left,
+            right=right,
+            value=value,
+            cover=cover,
+            default_left=np.asarray(tree["default_left"], dtype=bool),
+        )
+
+    arrays = trees.arrays()
+    arrays["tree_weight"] = np.ones(len(trees.roots))
+    base_score = str(learner["learner_model_param"]["base_score"]).strip("[]")
+    meta = {"kind": "tree_ensemble", "aggregation": "sum", "base_score": float(base_score),
+            "strict_less": True, "max_depth": trees.max_depth, "native_file": "model.json"}
+    return meta, arrays
+
+
+def _export_catboost(model, export_dir):
+    model.save_model(os.path.join(export_dir, "model.cbm"))
+    json_path = os.path.join(export_dir, "model_catboost.json")
+    model.save_model(json_path, format="json")
+    with open(json_path) as json_file:
+        dump = json.load(json_file)
+    os.remove(json_path)
+
+    if "oblivious_trees" not in dump:
+        return None, None
+
+    # Splits reference the float-feature list, which maps to input columns
+    flat_index = [feature["flat_feature_index"] for feature in dump["features_info"]["float_features"]]
+
+    trees = _TreeArrays()
+    for tree in dump["oblivious_trees"]:
+        splits = tree["splits"]
+        depth = len(splits)
+        n_nodes = 2 ** (depth + 1) - 1
+        n_internal = 2 ** depth - 1
+
+        # Heap layout: node k has children 2k+1 / 2k+2, level l tests split depth-1-l,
+        # so the leaf reached is sum(bit_i << i) as in CatBoost's oblivious trees
+        feature = np.zeros(n_nodes, dtype=np.int64)
+        threshold = np.zeros(n_nodes)
+        left = np.full(n_nodes, -1, dtype=np.int64)
+        right = np.full(n_nodes, -1, dtype=np.int64)
+        for node in range(n_internal):
+            level = int(np.floor(np.log2(node + 1)))
+            split = splits[depth - 1 - level]
+            if split.get("split_type", "FloatFeature") != "FloatFeature":
+                return None, None
+            feature[node] = flat_index[split["float_feature_index"]]
+            threshold[node] = split["border"]
+            left[node], right[node] = 2 * node + 1, 2 * node + 2
+
+        leaf_value = np.zeros(n_nodes)
+        leaf_cover = np.zeros(n_nodes)
+        leaf_value[n_internal:] = tree["leaf_values"]
+        leaf_cover[n_internal:] = tree.get("leaf_weights", np.ones(2 ** depth))
+        value, cover = _fill_internal_values(left, right, leaf_value, leaf_cover)
+        trees.add(feature=feature, threshold=threshold, left=left, right=right,
+                  value=value, cover=cover, depth=depth)
+
+    scale, bias = dump.get("scale_and_bias", [1.0, [0.0]])
+    arrays = trees.arrays()
+    arrays["tree_weight"] = np.full(len(trees.roots), float(scale))
+    meta = {"kind": "tree_ensemble", "aggregation": "sum", "base_score": float(np.ravel(bias)[0]),
+            "strict_less": False, "max_depth": trees.max_depth, "native_file": "model.cbm"}
+    return meta, arrays
+
+
+def _export_linear(model):
+    if not hasattr(model, "coef_") or np.ndim(model.coef_) != 1:
+        return None, None
+    meta = {"kind": "linear", "base_score": float(model.intercept_)}
+    return meta, {"coef": np.asarray(model.coef_, dtype=np.float64)}
+
+
+def _expected_value(meta, arrays, background_mean):
+    """
+    The raw prediction every explanation starts from. For summed trees it is
+    the cover-weighted mean of each tree's leaves (the root value) over the
+    training data; for linear models the prediction at the mean training
+    row. None for models path attribution does not apply to.
+    """
+    if meta["kind"] == "linear":
+        if background_mean is None:
+            return None
+        arrays["background_mean"] = np.asarray(background_mean, dtype=np.float64)
+        return meta["base_score"] + float(arrays["coef"] @ arrays["background_mean"])
+    if meta.get("aggregation") != "sum":
+        return None
+    return meta["base_score"] + float(arrays["tree_weight"] @ arrays["value"][arrays["roots"]])
+
+
+def export_native_model(model, model_path, config=None, background_mean=None, validation_x=None,
+                        sparse_input=False):
+    """
+    Exports the fitted model (saved at `model_path`) for the NumPy inference
+    backend: XGBoost is also saved as native JSON and CatBoost as .cbm, and
+    every supported model is flattened into tree (or coefficient) arrays
+    stored as .npy files plus a meta.json. The expected value used by the
+    explanations is precomputed here (`background_mean` is the mean
+    transformed training row, needed for linear models). `sparse_input`
+    tells that the model was fitted on a CSR matrix, whose implicit entries
+    XGBoost treats as missing.
+
+    The export is only saved when its predictions on the held-out rows
+    `validation_x` match model.predict. Returns the export directory, or
+    None when the model type is not supported or the check failed; serving
+    then unpickles model.pkl as before.
+    """
+    from src.pipeline.tree_backend import NativeModel
+    from src.utils import as_model_input
+
+    try:
+        config = config or ModelExportConfig()
+        export_dir = config.native_model_dir
+        if os.path.exists(export_dir):
+            shutil.rmtree(export_dir)
+        os.makedirs(export_dir)
+
+        name = type(model).__name__
+        if name == "XGBRegressor":
+            meta, arrays = _export_xgboost(model, export_dir)
+        elif name == "CatBoostRegressor":
+            meta, arrays = _export_catboost(model, export_dir)
+        elif name == "LinearRegression":
+            meta, arrays = _export_linear(model)
+        else:
+            meta, arrays = _export_sklearn(model)
+
+        if meta is None:
+            logging.info(f"No native export for {name}, serving will use the pickled model")
+            shutil.rmtree(export_dir)
+            return None
+
+        expected_value = _expected_value(meta, arrays, background_mean)
+        if expected_value is not None:
+            meta["expected_value"] = expected_value
+        meta.update({
+            "source_model": name,
+            "n_features": int(model.n_features_in_),
+            "source_hash": compute_file_hash(model_path),
+            "preprocessor_hash": (compute_file_hash(config.preprocessor_file_path)
+                                  if os.path.exists(config.preprocessor_file_path) else None),
+            "arrays": sorted(arrays),
+            "sparse_missing": bool(sparse_input and name == "XGBRegressor"),
+        })
+
+        if validation_x is not None:
+            native = NativeModel(meta, arrays).predict(validation_x)
+            expected = np.asarray(model.predict(as_model_input(model, validation_x)), dtype=np.float64)
+            difference = float(np.max(np.abs(native - expected), initial=0.0))
+            if difference > config.prediction_tolerance:
+                logging.warning(f"Native export of {name} differs from model.predict by {difference}, "
+                                "serving will use the pickled model")
+                shutil.rmtree(export_dir)
+                return None
+            logging.info(f"Native export matches model.predict (max abs difference {difference:.2e})")
+
+        for array_name, array in arrays.items():
+            np.save(os.path.join(export_dir, f"{array_name}.npy"), array)
+        # meta.json is written last: its presence marks a complete export
+        with open(os.path.join(export_dir, NATIVE_META_FILE), "w") as meta_file:
+            json.dump(meta, meta_file, indent=2)
+
+        logging.info(f"Exported {name} to {export_dir}")
+        return export_dir
+
+    except Exception as e:
+        raise CustomException(e, sys)
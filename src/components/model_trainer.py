@@ -1,112 +1,187 @@
 import os
 import sys
+import importlib
 from dataclasses import dataclass
+from typing import Optional
 
-from catboost import CatBoostRegressor
-from sklearn.ensemble import (
-    AdaBoostRegressor,
-    GradientBoostingRegressor,
-    RandomForestRegressor,
-)
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
-from sklearn.neighbors import KNeighborsRegressor
-from sklearn.tree import DecisionTreeRegressor
-from xgboost import XGBRegressor
+import numpy as np
 
+from src.components.ensemble import EnsembleBuilder, EnsembleConfig
+from src.components.model_export import export_native_model
 from src.exception import CustomException
 from src.logger import logging
-
-from src.utils import save_object,evaluate_models
+from src.pipeline.profiler import PROFILER
+
+from src.utils import save_object,evaluate_models,as_model_input
+
+# Candidate estimators as (module, class, constructor arguments). Each library
+# is imported only when one of its models is actually built.
+MODEL_FACTORIES = {
+    "Random Forest": ("sklearn.ensemble", "RandomForestRegressor", {}),
+    "Decision Tree": ("sklearn.tree", "DecisionTreeRegressor", {}),
+    "Gradient Boosting": ("sklearn.ensemble", "GradientBoostingRegressor", {}),
+    "Linear Regression": ("sklearn.linear_model", "LinearRegression", {}),
+    "XGBRegressor": ("xgboost", "XGBRegressor", {}),
+    "CatBoosting Regressor": ("catboost", "CatBoostRegressor", {"verbose": False}),
+    "AdaBoost Regressor": ("sklearn.ensemble", "AdaBoostRegressor", {}),
+}
 
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path=os.path.join("artifacts","model.pkl")
+    # Number of cross-validation folds per parameter combination
+    cv: int=3
+    # Worker processes shared by all models and grid points (-1 = all cores)
+    n_jobs: int=-1
+    # On-disk cache of fold scores; set to None to disable
+    search_cache_dir: str=os.path.join("artifacts","cache","model_search")
+    # Search strategy: "exhaustive", "halving" (successive halving) or "random"
+    search: str="exhaustive"
+    # Seconds the "random" strategy may spend before it stops sampling
+    time_budget: Optional[float]=None
+    # Fraction of candidates that survive each successive-halving round is 1/halving_factor
+    halving_factor: int=3
+    # Native early stopping for XGBoost/CatBoost on a held-out validation split
+    early_stopping_rounds: Optional[int]=20
+    validation_fraction: float=0.1
+    # Restrict the search to these MODEL_FACTORIES names; None searches all of them
+    candidate_models: Optional[list]=None
+    # Combine the top-k models: None, "average" (weights fit on out-of-fold predictions) or "stacking"
+    ensemble: Optional[str]=None
+    ensemble_top_k: int=3
+    # Test rows the native export must predict exactly like the model
+    export_validation_rows: int=500
 
 class ModelTrainer:
     def __init__(self):
         self.model_trainer_config=ModelTrainerConfig()
 
-
-    def initiate_model_trainer(self,train_array,test_array):
-        try:
-            logging.info("Split training and test input data")
-            x_train,y_train,x_test,y_test=(
-                train_array[:,:-1],
-                train_array[:,-1],
-                test_array[:,:-1],
-                test_array[:,-1]
-            )
-            models = {
-                "Random Forest": RandomForestRegressor(),
-                "Decision Tree": DecisionTreeRegressor(),
-                "Gradient Boosting": GradientBoostingRegressor(),
-                "Linear Regression": LinearRegression(),
-                "XGBRegressor": XGBRegressor(),
-                "CatBoosting Regressor": CatBoostRegressor(verbose=False),
-                "AdaBoost Regressor": AdaBoostRegressor(),
+    def get_model_names(self):
+        """
+        Returns the names of the candidate models without importing any estimator library.
+        """
+        names = self.model_trainer_config.candidate_models
+        return [name for name in MODEL_FACTORIES if names is None or name in names]
+
+    def get_models(self):
+        """
+        Returns the candidate estimators, keyed by the names used in the model report.
+        """
+        models = {}
+        for name in self.get_model_names():
+            module_name, class_name, kwargs = MODEL_FACTORIES[name]
+            estimator_class = getattr(importlib.import_module(module_name), class_name)
+            models[name] = estimator_class(**kwargs)
+        return models
+
+    def get_model_params(self):
+        """
+        Returns the hyperparameter grid searched for every candidate model.
+        """
+        params={
+            "Decision Tree": {
+                'criterion':['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
+                # 'splitter':['best','random'],
+                # 'max_features':['sqrt','log2'],
+            },
+            "Random Forest":{
+                # 'criterion':['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
+             
+                # 'max_features':['sqrt','log2',None],
+                'n_estimators': [8,16,32,64,128,256]
+            },
+            "Gradient Boosting":{
+                # 'loss':['squared_error', 'huber', 'absolute_error', 'quantile'],
+                'learning_rate':[.1,.01,.05,.001],
+                'subsample':[0.6,0.7,0.75,0.8,0.85,0.9],
+                # 'criterion':['squared_error', 'friedman_mse'],
+                # 'max_features':['auto','sqrt','log2'],
+                'n_estimators': [8,16,32,64,128,256]
+            },
+            "Linear Regression":{},
+            "XGBRegressor":{
+                'learning_rate':[.1,.01,.05,.001],
+                'n_estimators': [8,16,32,64,128,256]
+            },
+            "CatBoosting Regressor":{
+                'depth': [6,8,10],
+                'learning_rate': [0.01, 0.05, 0.1],
+                'iterations': [30, 50, 100]
+            },
+            "AdaBoost Regressor":{
+                'learning_rate':[.1,.01,0.5,.001],
+                # 'loss':['linear','square','exponential'],
+                'n_estimators': [8,16,32,64,128,256]
             }
-            params={
-                "Decision Tree": {
-                    'criterion':['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
-                    # 'splitter':['best','random'],
-                    # 'max_features':['sqrt','log2'],
-                },
-                "Random Forest":{
-                    # 'criterion':['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
-                 
-                    # 'max_features':['sqrt','log2',None],
-                    'n_estimators': [8,16,32,64,128,256]
-                },
-                "Gradient Boosting":{
-                    # 'loss':['squared_error', 'huber', 'absolute_error', 'quantile'],
-                    'learning_rate':[.1,.01,.05,.001],
-                    'subsample':[0.6,0.7,0.75,0.8,0.85,0.9],
-                    # 'criterion':['squared_error', 'friedman_mse'],
-                    # 'max_features':['auto','sqrt','log2'],
-                    'n_estimators': [8,16,32,64,128,256]
-                },
-                "Linear Regression":{},
-                "XGBRegressor":{
-                    'learning_rate':[.1,.01,.05,.001],
-                    'n_estimators': [8,16,32,64,128,256]
-                },
-                "CatBoosting Regressor":{
-                    'depth': [6,8,10],
-                    'learning_rate': [0.01, 0.05, 0.1],
-                    'iterations': [30, 50, 100]
-                },
-                "AdaBoost Regressor":{
-                    'learning_rate':[.1,.01,0.5,.001],
-                    # 'loss':['linear','square','exponential'],
-                    'n_estimators': [8,16,32,64,128,256]
-                }
-                
-            }
-
-            model_report:dict=evaluate_models(x_train=x_train,y_train=y_train,x_test=x_test,y_test=y_test,
-                                             models=models,param=params)
             
-            ## To get best model score from dict
-            best_model_score = max(sorted(model_report.values()))
-
-            ## To get best model name from dict
+        }
+        return params
+
+    def initiate_model_trainer(self,x_train,y_train,x_test,y_test):
+        """
+        Searches every candidate model, saves the best one and returns its test R2.
+        `x_train`/`x_test` may be dense arrays or CSR matrices.
+        """
+        try:
+            models = self.get_models()
+            params = self.get_model_params()
 
-            best_model_name = list(model_report.keys())[
-                list(model_report.values()).index(best_model_score)
-            ]
+            model_report:dict=evaluate_models(x_train=x_train,y_train=y_train,x_test=x_test,y_test=y_test,
+                                             models=models,param=params,
+                                             cv=self.model_trainer_config.cv,
+                                             n_jobs=self.model_trainer_config.n_jobs,
+                                             cache_dir=self.model_trainer_config.search_cache_dir,
+                                             search=self.model_trainer_config.search,
+                                             time_budget=self.model_trainer_config.time_budget,
+                                             halving_factor=self.model_trainer_config.halving_factor,
+                                             early_stopping_rounds=self.model_trainer_config.early_stopping_rounds,
+                                             validation_fraction=self.model_trainer_config.validation_fraction,
+                                             profile=PROFILER.enabled)
+            PROFILER.record_candidates(model_report)
+
+            for name, entry in model_report.items():
+                logging.info(f"{name:<22} R2={entry['r2']:.4f} search={entry['search_seconds']:.1f}s fit={entry['fit_seconds']:.1f}s")
+
+            ## To get best model name and score from the report
+            best_model_name = max(model_report, key=lambda name: model_report[name]["r2"])
+            best_model_score = model_report[best_model_name]["r2"]
             best_model = models[best_model_name]
 
             if best_model_score<0.6:
                 raise CustomException("No best model found",sys)
             logging.info(f"Best found model on both training and testing dataset")
 
+            if self.model_trainer_config.ensemble:
+                builder = EnsembleBuilder(EnsembleConfig(method=self.model_trainer_config.ensemble,
+                                                         top_k=self.model_trainer_config.ensemble_top_k,
+                                                         cv=self.model_trainer_config.cv,
+                                                         n_jobs=self.model_trainer_config.n_jobs))
+                ensemble, ensemble_report = builder.initiate_ensemble(
+                    model_report, models, x_train, y_train, x_test, y_test,
+                    fit_options=dict(early_stopping_rounds=self.model_trainer_config.early_stopping_rounds,
+                                     validation_fraction=self.model_trainer_config.validation_fraction))
+                # Only replaces the single model when its out-of-fold R2 is at least as high;
+                # the test set stays untouched by the choice, so the R2 returned below is unbiased
+                if ensemble_report["use_ensemble"]:
+                    best_model = ensemble
+
             save_object(
                 file_path=self.model_trainer_config.trained_model_file_path,
                 obj=best_model
             )
 
-            predicted=best_model.predict(x_test)
+            import scipy.sparse
+
+            # Native/flattened copy for the NumPy inference backend; the mean
+            # training row is the background of the linear-model explanations
+            export_native_model(best_model, self.model_trainer_config.trained_model_file_path,
+                                background_mean=np.asarray(x_train.mean(axis=0)).ravel(),
+                                validation_x=x_test[:self.model_trainer_config.export_validation_rows],
+                                sparse_input=scipy.sparse.issparse(as_model_input(best_model, x_test[:1])))
+
+            predicted=best_model.predict(as_model_input(best_model,x_test))
+
+            from sklearn.metrics import r2_score
 
             r2_square = r2_score(y_test, predicted)
             return r2_square
@@ -0,0 +1,284 @@
+import sys
+import math
+
+import numpy as np
+
+# pandas is only needed for DataFrame conversions, so it is imported there:
+# the record-based serving path starts without it
+
+from src.exception import CustomException
+
+TARGET_COLUMN = "SalePrice"
+
+# These are the columns identified from the EDA notebook for modeling
+NUMERICAL_COLUMNS = [
+    'MS SubClass', 'Lot Frontage', 'Lot Area', 'Overall Qual', 'Overall Cond',
+    'Year Built', 'Year Remod/Add', 'Mas Vnr Area', 'BsmtFin SF 1', 'BsmtFin SF 2',
+    'Bsmt Unf SF', 'Total Bsmt SF', '1st Flr SF', '2nd Flr SF', 'Low Qual Fin SF',
+    'Gr Liv Area', 'Bsmt Full Bath', 'Bsmt Half Bath', 'Full Bath', 'Half Bath',
+    'Bedroom AbvGr', 'Kitchen AbvGr', 'TotRms AbvGrd', 'Fireplaces', 'Garage Yr Blt',
+    'Garage Cars', 'Garage Area', 'Wood Deck SF', 'Open Porch SF', 'Enclosed Porch',
+    '3Ssn Porch', 'Screen Porch', 'Pool Area', 'Misc Val', 'Mo Sold', 'Yr Sold'
+]
+
+CATEGORICAL_COLUMNS = [
+    'MS Zoning', 'Street', 'Lot Shape', 'Land Contour', 'Utilities', 'Lot Config',
+    'Land Slope', 'Neighborhood', 'Condition 1', 'Condition 2', 'Bldg Type',
+    'House Style', 'Roof Style', 'Roof Matl', 'Exterior 1st', 'Exterior 2nd',
+    'Mas Vnr Type', 'Exter Qual', 'Exter Cond', 'Foundation', 'Bsmt Qual', 'Bsmt Cond',
+    'Bsmt Exposure', 'BsmtFin Type 1', 'BsmtFin Type 2', 'Heating', 'Heating QC',
+    'Central Air', 'Electrical', 'Kitchen Qual', 'Functional', 'Fireplace Qu',
+    'Garage Type', 'Garage Finish', 'Garage Qual', 'Garage Cond', 'Paved Drive',
+    'Sale Type', 'Sale Condition'
+]
+
+# Model features in the order they appear in the Ames dataset
+FEATURE_COLUMNS = [
+    'MS SubClass', 'MS Zoning', 'Lot Frontage', 'Lot Area', 'Street', 'Lot Shape', 'Land Contour',
+    'Utilities', 'Lot Config', 'Land Slope', 'Neighborhood', 'Condition 1', 'Condition 2',
+    'Bldg Type', 'House Style', 'Overall Qual', 'Overall Cond', 'Year Built', 'Year Remod/Add',
+    'Roof Style', 'Roof Matl', 'Exterior 1st', 'Exterior 2nd', 'Mas Vnr Type', 'Mas Vnr Area',
+    'Exter Qual', 'Exter Cond', 'Foundation', 'Bsmt Qual', 'Bsmt Cond', 'Bsmt Exposure',
+    'BsmtFin Type 1', 'BsmtFin SF 1', 'BsmtFin Type 2', 'BsmtFin SF 2', 'Bsmt Unf SF',
+    'Total Bsmt SF', 'Heating', 'Heating QC', 'Central Air', 'Electrical', '1st Flr SF',
+    '2nd Flr SF', 'Low Qual Fin SF', 'Gr Liv Area', 'Bsmt Full Bath', 'Bsmt Half Bath',
+    'Full Bath', 'Half Bath', 'Bedroom AbvGr', 'Kitchen AbvGr', 'Kitchen Qual',
+    'TotRms AbvGrd', 'Functional', 'Fireplaces', 'Fireplace Qu', 'Garage Type',
+    'Garage Yr Blt', 'Garage Finish', 'Garage Cars', 'Garage Area', 'Garage Qual',
+    'Garage Cond', 'Paved Drive', 'Wood Deck SF', 'Open Porch SF', 'Enclosed Porch',
+    '3Ssn Porch', 'Screen Porch', 'Pool Area', 'Misc Val', 'Mo Sold', 'Yr Sold',
+    'Sale Type', 'Sale Condition'
+]
+
+# Field names used by the web form that cannot be derived from the column name
+FORM_ALIASES = {
+    'First_Flr_SF': '1st Flr SF',
+    'Second_Flr_SF': '2nd Flr SF',
+    'ThreeSsn_Porch': '3Ssn Porch',
+    'Year_RemodAdd': 'Year Remod/Add',
+}
+
+
+def attribute_name(column):
+    """
+    Turns an Ames column name into the identifier style used by CustomData
+    and the web form ('Year Remod/Add' -> 'Year_Remod_Add').
+    """
+    return column.replace(' ', '_').replace('/', '_')
+
+
+def _to_float(value):
+    if value is None or value == '':
+        return np.nan
+    return float(value)
+
+
+def _check_number(value):
+    if value is None:
+        return np.nan
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError("expected a number or null")
+    return float(value)
+
+
+def _check_string(value):
+    if value is None:
+        return np.nan
+    if not isinstance(value, str):
+        raise TypeError("expected a string or null")
+    return value if value else np.nan
+
+
+def _to_category(value):
+    if value is None or value == '' or (isinstance(value, float) and math.isnan(value)):
+        return np.nan
+    return str(value)
+
+
+class FeatureSchema:
+    """
+    Single description of the model input: column order, dtypes and the
+    numeric/categorical role of every feature.
+
+    Rows are encoded into a NumPy structured array (one float64 field per
+    numerical column, one object field per categorical column). A missing
+    value is NaN in both kinds of field, which is what the imputers in the
+    preprocessor were fitted to replace.
+    """
+    def __init__(self, columns=FEATURE_COLUMNS, numerical_columns=NUMERICAL_COLUMNS,
+                 categorical_columns=CATEGORICAL_COLUMNS, aliases=FORM_ALIASES):
+        numerical = set(numerical_columns)
+        self._numerical = numerical
+        self.columns = list(columns)
+        self.numerical_columns = [c for c in self.columns if c in numerical]
+        self.categorical_columns = [c for c in self.columns if c not in numerical]
+        if set(self.categorical_columns) != set(categorical_columns):
+            raise ValueError("Feature columns do not match the numerical/categorical roles")
+
+        self.record_dtype = np.dtype(
+            [(c, np.float64 if c in numerical else object) for c in self.columns]
+        )
+        self._coercers = {c: (_to_float if c in numerical else _to_category) for c in self.columns}
+        # Strict JSON validators, keyed by canonical column name only
+        self._validators = {c: (_check_number if c in numerical else _check_string) for c in self.columns}
+
+        # Canonical names, attribute-style names and form aliases all resolve to the column
+        self._lookup = {c: c for c in self.columns}
+        self._lookup.update({attribute_name(c): c for c in self.columns})
+        self._lookup.update(aliases)
+
+        self._blank = np.empty(1, dtype=self.record_dtype)
+        for column in self.columns:
+            self._blank[column] = np.nan
+
+    def pandas_dtypes(self):
+        """
+        Explicit dtypes for reading raw Ames data: float64 for numerical
+        columns, pandas 'category' for categorical ones.
+        """
+        dtypes = {c: ('float64' if c in self._numerical else 'category') for c in self.columns}
+        dtypes[TARGET_COLUMN] = 'float64'
+        return dtypes
+
+    def resolve(self, key):
+        """
+        Returns the canonical column for a column/attribute/form name, or None.
+        """
+        return self._lookup.get(key)
+
+    def empty(self, n_rows=1):
+        """
+        Returns `n_rows` records with every feature missing.
+        """
+        return np.repeat(self._blank, n_rows)
+
+    def encode_row(self, values):
+        """
+        Encodes one mapping of feature values into a single-record structured array.
+        Unknown keys are ignored.
+        """
+        try:
+            row = self._blank.copy()
+            for key, value in values.items():
+                column = self._lookup.get(key)
+                if column is not None:
+                    row[column] = self._coercers[column](value)
+            return row
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def encode_form(self, form):
+        """
+        Encodes a submitted web form. Blank numeric fields count as 0, as the
+        form handler always did; blank selects count as missing.
+        """
+        values = {}
+        for key, value in form.items():
+            column = self._lookup.get(key)
+            if column in self._numerical and value == '':
+                value = 0
+            values[key] = value
+        return self.encode_row(values)
+
+    def check_value(self, column, value):
+        """
+        Strictly validates one JSON value of a canonical column. Raises
+        KeyError for an unknown column and TypeError for a wrongly typed value.
+        """
+        return self._validators[column](value)
+
+    def is_numerical(self, column):
+        return column in self._numerical
+
+    def validate_records(self, records):
+        """
+        Strictly validates JSON records keyed by the canonical Ames column
+        names. Returns (rows, errors): the encoded structured array and a
+        list of {"row", "field", "error"} dicts, empty when every record is valid.
+        """
+        errors = []
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            return None, [{"row": None, "field": None, "error": "expected a list of JSON objects"}]
+
+        n_rows = len(records)
+        buffers = {}
+        for i, record in enumerate(records):
+            for key, value in record.items():
+                validator = self._validators.get(key)
+                if validator is None:
+                    errors.append({"row": i, "field": key, "error": "unknown feature"})
+                    continue
+                try:
+                    value = validator(value)
+                except TypeError as e:
+                    errors.append({"row": i, "field": key, "error": str(e)})
+                    continue
+                if key not in buffers:
+                    buffers[key] = [np.nan] * n_rows
+                buffers[key][i] = value
+
+        if errors:
+            return None, errors
+        rows = self.empty(n_rows)
+        for column, values in buffers.items():
+            rows[column] = values
+        return rows, errors
+
+    def encode_rows(self, records):
+        """
+        Encodes a sequence of mappings into one structured array, filling
+        whole columns at a time.
+        """
+        try:
+            records = list(records)
+            n_rows = len(records)
+            buffers = {}
+            for i, record in enumerate(records):
+                for key, value in record.items():
+                    column = self._lookup.get(key)
+                    if column is not None:
+                        if column not in buffers:
+                            buffers[column] = [np.nan] * n_rows
+                        buffers[column][i] = self._coercers[column](value)
+
+            rows = self.empty(n_rows)
+            for column, values in buffers.items():
+                rows[column] = values
+            return rows
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def from_frame(self, df):
+        """
+        Converts a DataFrame (extra columns are ignored) into the structured array.
+        """
+        import pandas as pd
+
+        try:
+            rows = self.empty(len(df))
+            for column in self.columns:
+                if column not in df.columns:
+                    continue
+                if column in self._numerical:
+                    rows[column] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+                else:
+                    values = df[column].to_numpy(dtype=object)
+                    rows[column] = np.where(pd.isna(values), np.nan, values)
+            return rows
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def to_frame(self, rows):
+        """
+        Builds the DataFrame the sklearn preprocessor expects directly from
+        the columnar fields of the structured array.
+        """
+        import pandas as pd
+
+        return pd.DataFrame({column: rows[column] for column in self.columns}, copy=False)
+
+
+FEATURE_SCHEMA = FeatureSchema()
@@ -1,18 +1,242 @@
-import logging
 import os
-from datetime import datetime
-LOG_FILE=f"{datetime.now().strftime('%Y-%m-%d')}.log"
-logs_path=os.path.join(os.getcwd(),"logs", LOG_FILE)
-os.makedirs(logs_path,exist_ok=True)
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+
+# Every module keeps using `from src.logger import logging` and the root logger;
+# importing this module installs the non-blocking handler once per process.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ames-<pid>.log and its rotated copies (ames-<pid>.log.2024-01-31)
+_LOG_FILE_PATTERN = re.compile(r"^ames-(\d+)\.log(\..+)?$")
+
+
+def _parse_mapping(value):
+    """
+    Parses "src.components=DEBUG,app=WARNING" into a dict.
+    """
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, setting = item.partition("=")
+        mapping[key.strip()] = setting.strip()
+    return mapping
+
+
+@dataclass
+class LoggerConfig:
+    """
+    Configuration class for logging.
+    """
+    log_dir: str = os.path.join(os.getcwd(), "logs")
+    level: str = os.environ.get("LOG_LEVEL", "INFO")
+    # "json" (one object per line) or "text" (the original line format)
+    format: str = os.environ.get("LOG_FORMAT", "json")
+    # Per-module levels by dotted-name prefix, e.g. "src.components=DEBUG,app=WARNING"
+    module_levels: dict = field(default_factory=lambda: _parse_mapping(os.environ.get("LOG_MODULE_LEVELS", "")))
+    # Fraction of DEBUG/INFO records kept per module prefix, e.g. "src.pipeline.predict_pipeline=0.01"
+    sample_rates: dict = field(default_factory=lambda: _parse_mapping(os.environ.get("LOG_SAMPLE", "")))
+    # Records waiting for the writer thread; further records are dropped, never waited on
+    queue_size: int = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+    # Daily rotation of the per-process file, keeping this many old files
+    backup_count: int = 14
+    # Files of exited processes (e.g. restarted gunicorn workers) are deleted once this many days old
+    retention_days: float = float(os.environ.get("LOG_RETENTION_DAYS", "14"))
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "module": getattr(record, "module_path", record.module),
+            "line": record.lineno,
+            "pid": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _ModuleFilter(logging.Filter):
+    """
+    Applies per-module levels and sampling before a record is queued. The
+    module is derived from the file that logged, since components log
+    through the root logger. Warnings and errors are never sampled out.
+    """
+    def __init__(self, default_level, module_levels, sample_rates):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = sorted(module_levels.items(), key=lambda item: -len(item[0]))
+        self.sample_rates = sorted(sample_rates.items(), key=lambda item: -len(item[0]))
+        self._modules = {}
+
+    def _module_path(self, pathname):
+        module = self._modules.get(pathname)
+        if module is None:
+            path = os.path.abspath(pathname)
+            if path.startswith(PROJECT_ROOT + os.sep):
+                module = os.path.splitext(os.path.relpath(path, PROJECT_ROOT))[0].replace(os.sep, ".")
+            else:
+                module = os.path.splitext(os.path.basename(path))[0]
+            self._modules[pathname] = module
+        return module
+
+    @staticmethod
+    def _lookup(rules, module, default):
+        for prefix, value in rules:
+            if module == prefix or module.startswith(prefix + "."):
+                return value
+        return default
+
+    def filter(self, record):
+        module = self._module_path(record.pathname)
+        record.module_path = module
+        if record.levelno < self._lookup(self.module_levels, module, self.default_level):
+            return False
+        if record.levelno < logging.WARNING:
+            rate = self._lookup(self.sample_rates, module, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread and drops them when its queue is
+    full, so a slow disk can never stall a request.
+    """
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+_listener = None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def prune_log_files(log_dir, retention_days):
+    """
+    Deletes the log files of processes that have exited once they are older
+    than `retention_days`. Live processes rotate their own files. Returns
+    the number of files deleted.
+    """
+    oldest = time.time() - retention_days * 86400
+    removed = 0
+    for name in os.listdir(log_dir):
+        match = _LOG_FILE_PATTERN.match(name)
+        if match is None or _pid_alive(int(match.group(1))):
+            continue
+        path = os.path.join(log_dir, name)
+        try:
+            if os.path.getmtime(path) < oldest:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            # Another worker starting at the same time may have deleted it first
+            continue
+    return removed
+
+
+def logging_stats():
+    """
+    Counters of the logging pipeline, exported through the metrics collector.
+    """
+    queue_depth = _listener.queue.qsize() if _listener is not None else 0
+    return {"dropped_records": _DroppingQueueHandler.dropped, "queue_depth": queue_depth}
+
+
+def _level(name):
+    return name if isinstance(name, int) else logging.getLevelName(str(name).upper())
+
+
+def setup_logging(config=None):
+    """
+    Routes the root logger through a bounded queue to a background writer
+    thread. Each process writes its own daily-rotated file, so gunicorn
+    workers never rotate a file another process has open; files left by
+    exited processes are pruned after `retention_days`.
+    """
+    global _listener
+    config = config or LoggerConfig()
+    os.makedirs(config.log_dir, exist_ok=True)
+    if _listener is not None:
+        _listener.stop()
+    removed = prune_log_files(config.log_dir, config.retention_days)
+
+    log_file_path = os.path.join(config.log_dir, f"ames-{os.getpid()}.log")
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        log_file_path, when="midnight", backupCount=config.backup_count, encoding="utf-8", delay=True
+    )
+    if config.format == "json":
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(
+            "[ %(asctime)s ] %(lineno)d %(module_path)s - %(levelname)s - %(message)s"
+        ))
+
+    default_level = _level(config.level)
+    module_levels = {module: _level(level) for module, level in config.module_levels.items()}
+    sample_rates = {module: float(rate) for module, rate in config.sample_rates.items()}
+
+    queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=config.queue_size))
+    queue_handler.addFilter(_ModuleFilter(default_level, module_levels, sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # The filter decides per module; the root level only has to let the most verbose one through
+    root.setLevel(min([default_level, *module_levels.values()]))
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, file_handler)
+    _listener.start()
+    if removed:
+        logging.info(f"Deleted {removed} log files of exited processes older than {config.retention_days} days")
+    return log_file_path
+
+
+def _stop_listener():
+    # Flushes whatever is still queued when the process exits
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_in_child():
+    # The parent's writer thread does not exist after fork(): start a new one, with its own file
+    global _listener
+    _listener = None
+    setup_logging()
 
-LOG_FILE_PATH=os.path.join(logs_path, LOG_FILE)
 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    
-)
+LOG_FILE_PATH = setup_logging()
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
 
 if __name__=="__main__":
-    logging.info("Logging has started")
\ No newline at end of file
+    logging.info("Logging has started")
+    print(f"Logging to {LOG_FILE_PATH}", file=sys.stderr)
@@ -0,0 +1,191 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+SPAN_METRIC = "ames_span_duration_seconds"
+SPAN_ERRORS_METRIC = "ames_span_errors_total"
+
+HELP = {
+    SPAN_METRIC: "Wall time of instrumented code paths.",
+    SPAN_ERRORS_METRIC: "Instrumented code paths that raised.",
+    "ames_http_request_duration_seconds": "Wall time of HTTP requests by endpoint and status.",
+    "ames_predicted_rows_total": "Rows returned by PredictPipeline.predict.",
+    "ames_startup_phase_seconds": "Time spent in each worker startup phase.",
+}
+
+# Shared by every disabled span: entering and leaving it does nothing
+_NOOP_SPAN = nullcontext()
+
+
+@dataclass
+class MetricsConfig:
+    """
+    Configuration class for the in-process metrics.
+    """
+    enabled: bool = os.environ.get("METRICS", "1") != "0"
+    # Upper bounds in seconds of the latency histogram buckets; training stages reach the last ones
+    buckets: tuple = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                      1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets):
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0] * (n_buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Span:
+    """
+    Times the enclosed block into the span histogram.
+    """
+    __slots__ = ("registry", "labels", "start")
+
+    def __init__(self, registry, labels):
+        self.registry = registry
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.observe(SPAN_METRIC, time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            self.registry.increment(SPAN_ERRORS_METRIC, 1, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Latency histograms and counters kept in process memory and rendered in
+    the Prometheus text format. Each gunicorn worker has its own registry.
+
+    When metrics are disabled, span() returns a shared no-op context manager
+    and observe()/increment() return immediately, so the instrumentation can
+    stay in the hot path.
+    """
+    def __init__(self, config=None):
+        self.metrics_config = config or MetricsConfig()
+        self.enabled = self.metrics_config.enabled
+        self._buckets = tuple(self.metrics_config.buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def span(self, name, **labels):
+        """
+        Context manager timing a block: `with METRICS.span("model_predict"): ...`
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, (("span", name),) + tuple(sorted(labels.items())))
+
+    def observe(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        bucket = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = _Histogram(len(self._buckets))
+            histogram.counts[bucket] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def increment(self, name, value=1, labels=()):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    def register_collector(self, prefix, collect):
+        """
+        Adds gauges read at render time: `collect()` returns a dict of
+        numbers, exported as `<prefix>_<key>` (e.g. cache or batcher stats).
+        """
+        with self._lock:
+            self._collectors.append((prefix, collect))
+
+    def summary(self):
+        """
+        Returns {span: {"count", "total_seconds", "mean_seconds"}} for logging.
+        """
+        with self._lock:
+            items = [(dict(labels), h.count, h.sum) for (name, labels), h in self._histograms.items()
+                     if name == SPAN_METRIC]
+        summary = {}
+        for labels, count, total in items:
+            key = ",".join(str(value) for _, value in sorted(labels.items()))
+            summary[key] = {"count": count, "total_seconds": total, "mean_seconds": total / count}
+        return summary
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            histograms = sorted(
+                ((name, labels, list(h.counts), h.sum, h.count) for (name, labels), h in self._histograms.items()),
+                key=lambda item: (item[0], item[1]),
+            )
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors)
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for name, labels, counts, total, count in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self._buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for prefix, collect in collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                describe(name, "gauge")
+                lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.logger import logging
+from src.pipeline.model_registry import DEFAULT_MODEL_NAME, get_registry
+from src.pipeline.predict_pipeline import PredictPipeline
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+@dataclass
+class BatchScoreConfig:
+    """
+    Configuration class for offline batch scoring.
+    """
+    # Rows read, transformed and predicted at a time
+    chunk_size: int = 50000
+    # Worker processes; 1 scores in this process
+    n_workers: int = 1
+    # Chunks read but not yet written; 0 means twice the number of workers
+    max_in_flight: int = 0
+    # Seconds between two progress reports
+    report_interval: float = 5.0
+    prediction_column: str = "predicted_price"
+    model_name: str = DEFAULT_MODEL_NAME
+
+
+def _score_chunk(model_name, features):
+    """
+    Scores one chunk with the model loaded in the calling process. Runs in
+    the pool workers, which load the artifacts once through their own registry.
+    """
+    bundle = get_registry().get(model_name)
+    return PredictPipeline._predict_frame(bundle, features)
+
+
+def _read_chunks(input_path, chunk_size, passthrough_columns):
+    """
+    Yields DataFrames of at most `chunk_size` rows holding the model features
+    (and the passthrough columns) of a CSV or Parquet file.
+    """
+    wanted = set(FEATURE_SCHEMA.columns) | set(passthrough_columns)
+    if input_path.lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(input_path)
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        # Categorical columns stay strings in every chunk, whatever their values look like
+        dtypes = {c: ('float64' if c in FEATURE_SCHEMA.numerical_columns else 'object')
+                  for c in FEATURE_SCHEMA.columns}
+        yield from pd.read_csv(input_path, chunksize=chunk_size, usecols=lambda c: c in wanted, dtype=dtypes)
+
+
+class _ChunkWriter:
+    """
+    Appends scored chunks to a CSV or Parquet file as they arrive.
+    """
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.parquet = output_path.lower().endswith(PARQUET_EXTENSIONS)
+        self._writer = None
+        self._file = None
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            header = self._file is None
+            if header:
+                self._file = open(self.output_path, "w", newline="")
+            frame.to_csv(self._file, header=header, index=False)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class BatchScorer:
+    """
+    Re-prices files too large for memory: the input is streamed in chunks,
+    every chunk goes through the saved preprocessor and model, and its prices
+    are written out before more of the file is read. At most `max_in_flight`
+    chunks are held at once, whether scoring runs here or in a process pool.
+    """
+    def __init__(self, config=None):
+        self.batch_score_config = config or BatchScoreConfig()
+
+    def initiate_batch_scoring(self, input_path, output_path, passthrough_columns=()):
+        """
+        Scores `input_path` into `output_path`. The output holds the
+        passthrough columns (e.g. an id) followed by the predicted price, in
+        input order. Returns the number of rows and the throughput.
+        """
+        config = self.batch_score_config
+        passthrough_columns = list(passthrough_columns)
+        # Written under a temporary name so a failed run never leaves a truncated file behind
+        partial_path = output_path + ".partial"
+        writer = _ChunkWriter(partial_path)
+        pool = None
+
+        try:
+            logging.info(f"Batch scoring {input_path} -> {output_path} in chunks of {config.chunk_size} rows")
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            start = time.perf_counter()
+            last_report = start
+            n_rows = 0
+
+            def write(chunk, preds):
+                nonlocal n_rows, last_report
+                out = chunk[passthrough_columns].reset_index(drop=True)
+                out[config.prediction_column] = preds
+                writer.write(out)
+                n_rows += len(out)
+
+                now = time.perf_counter()
+                if now - last_report >= config.report_interval:
+                    last_report = now
+                    self._report(n_rows, now - start)
+
+            chunks = _read_chunks(input_path, config.chunk_size, passthrough_columns)
+            if config.n_workers <= 1:
+                for chunk in chunks:
+                    if len(chunk):
+                        write(chunk, _score_chunk(config.model_name, chunk))
+            else:
+                max_in_flight = config.max_in_flight or 2 * config.n_workers
+                pool = ProcessPoolExecutor(max_workers=config.n_workers)
+                in_flight = deque()
+                for chunk in chunks:
+                    if not len(chunk):
+                        continue
+                    features = chunk.drop(columns=[c for c in passthrough_columns
+                                                   if c not in FEATURE_SCHEMA.columns])
+                    in_flight.append((chunk, pool.submit(_score_chunk, config.model_name, features)))
+                    # Chunks are written in input order; reading waits while the pool is full
+                    while len(in_flight) >= max_in_flight:
+                        done, future = in_flight.popleft()
+                        write(done, future.result())
+                while in_flight:
+                    done, future = in_flight.popleft()
+                    write(done, future.result())
+
+            writer.close()
+            os.replace(partial_path, output_path)
+
+            seconds = time.perf_counter() - start
+            self._report(n_rows, seconds)
+            return {
+                "rows": n_rows,
+                "seconds": seconds,
+                "rows_per_second": n_rows / seconds if seconds > 0 else 0.0,
+            }
+
+        except Exception as e:
+            writer.close()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise CustomException(e, sys)
+
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _report(n_rows, seconds):
+        rate = n_rows / seconds if seconds > 0 else 0.0
+        message = f"Scored {n_rows} rows in {seconds:.1f}s ({rate:,.0f} rows/sec)"
+        logging.info(message)
+        print(message, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    """
+    Command line entry point, installed as `ames-batch-score`.
+    """
+    defaults = BatchScoreConfig()
+    parser = argparse.ArgumentParser(
+        description="Stream a CSV/Parquet listing file through the trained model and write predicted prices."
+    )
+    parser.add_argument("input", help="CSV or Parquet file with the Ames feature columns.")
+    parser.add_argument("output", help="Output file; .parquet/.pq writes Parquet, anything else CSV.")
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size,
+                        help="Rows per chunk; memory use is bounded by a few chunks.")
+    parser.add_argument("--workers", type=int, default=defaults.n_workers,
+                        help="Score chunks in this many processes.")
+    parser.add_argument("--max-in-flight", type=int, default=defaults.max_in_flight,
+                        help="Chunks held in memory at once (default: twice the workers).")
+    parser.add_argument("--id-columns", nargs="+", default=[],
+                        help="Input columns copied to the output next to the prediction, e.g. PID.")
+    args = parser.parse_args(argv)
+
+    config = BatchScoreConfig(
+        chunk_size=args.chunk_size,
+        n_workers=args.workers,
+        max_in_flight=args.max_in_flight,
+    )
+    result = BatchScorer(config).initiate_batch_scoring(args.input, args.output, args.id_columns)
+    print(f"Wrote {result['rows']} predictions to {args.output} "
+          f"({result['rows_per_second']:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
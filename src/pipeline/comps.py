@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.components.comps_index import COMPS_META_FILE, CompsIndex, CompsIndexConfig
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.logger import logging
+from src.metrics import METRICS
+from src.pipeline.model_registry import DEFAULT_MODEL_NAME, get_registry
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.utils import as_model_input, compute_file_hash
+
+
+@dataclass
+class CompsConfig:
+    """
+    Configuration class for the comparable-sales lookup.
+    """
+    index_dir: str = CompsIndexConfig.index_dir
+    default_k: int = 5
+    max_k: int = int(os.environ.get("COMPS_MAX_K", "50"))
+    # Rows one request may look up
+    max_rows: int = int(os.environ.get("COMPS_MAX_ROWS", "1000"))
+
+
+class CompsError(ValueError):
+    """
+    Raised for an invalid comps request; `details` lists the offending fields.
+    """
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or []
+
+
+class CompsUnavailableError(CompsError):
+    """
+    Raised when there is no comps index matching the served preprocessor.
+    """
+
+
+_index = None
+_index_key = None
+_index_lock = threading.Lock()
+
+
+def get_comps_index(index_dir, preprocessor_path):
+    """
+    Returns the comps index of this process, memory-mapped once and
+    reloaded when a retrain rewrites it. The index must have been built
+    with the preprocessor the model is served with.
+    """
+    global _index, _index_key
+    meta_path = os.path.join(index_dir, COMPS_META_FILE)
+    if not os.path.exists(meta_path):
+        raise CompsUnavailableError(f"No comps index at {index_dir}; run the training pipeline")
+    stat = os.stat(meta_path)
+    key = (stat.st_mtime_ns, stat.st_size, preprocessor_path)
+    if key != _index_key:
+        with _index_lock:
+            if key != _index_key:
+                index = CompsIndex.load(index_dir, mmap_mode="r")
+                if index.meta["preprocessor_hash"] != compute_file_hash(preprocessor_path):
+                    raise CompsUnavailableError(
+                        f"The comps index at {index_dir} was built with another preprocessor; retrain to rebuild it")
+                logging.info(f"Loaded the comps index of {index.n_rows} sales from {index_dir}")
+                _index, _index_key = index, key
+    return _index
+
+
+class CompsFinder:
+    """
+    Returns the k most similar past sales of each property, with the model
+    price. The query is transformed by the served preprocessor, projected
+    into the index space and searched in one batched brute-force pass.
+    """
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, config=None):
+        self.model_name = model_name
+        self.comps_config = config or CompsConfig()
+
+    def initiate_comps(self, records, k=None):
+        """
+        `records` is a list of feature dicts. Returns {"model_version",
+        "results": [{"predicted_price", "comps": [{"id", "sale_price",
+        "distance"}]}]}, nearest comps first.
+        """
+        config = self.comps_config
+        k = config.default_k if k is None else k
+        if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= config.max_k:
+            raise CompsError(f"k must be an integer between 1 and {config.max_k}")
+        if isinstance(records, list) and len(records) > config.max_rows:
+            raise CompsError(f"At most {config.max_rows} instances can be looked up at once")
+        rows, errors = FEATURE_SCHEMA.validate_records(records)
+        if errors:
+            raise CompsError("Invalid features", errors)
+
+        bundle = get_registry().get(self.model_name)
+        index = get_comps_index(config.index_dir, bundle.paths[1])
+
+        try:
+            x = PredictPipeline._transform(bundle, rows)
+            with METRICS.span("comps_query"):
+                distances, positions = index.query(x, k)
+            with METRICS.span("model_predict"):
+                prices = np.exp(bundle.model.predict(as_model_input(bundle.model, x)))
+
+            ids, sale_prices = index.ids[positions], index.prices[positions]
+            results = []
+            for i in range(len(rows)):
+                results.append({
+                    "predicted_price": float(prices[i]),
+                    "comps": [
+                        {"id": int(ids[i, j]), "sale_price": float(sale_prices[i, j]),
+                         "distance": float(distances[i, j])}
+                        for j in range(positions.shape[1])
+                    ],
+                })
+            return {"model_version": bundle.version, "id_column": index.meta["id_column"], "results": results}
+
+        except Exception as e:
+            raise CustomException(e, sys)
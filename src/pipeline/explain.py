@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.components.compiled_preprocessor import CompiledPreprocessor
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.metrics import METRICS
+from src.pipeline.model_registry import DEFAULT_MODEL_NAME, get_registry
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.pipeline.prediction_cache import (
+    PredictionCache, PredictionCacheConfig, canonical_keys, get_prediction_cache,
+)
+
+
+@dataclass
+class ExplainConfig:
+    """
+    Configuration class for the prediction explanations.
+    """
+    # Rows one request may explain
+    max_rows: int = int(os.environ.get("EXPLAIN_MAX_ROWS", "1000"))
+    # Explanations kept in the per-process LRU (one vector of column contributions each)
+    cache_max_entries: int = int(os.environ.get("EXPLANATION_CACHE_MAX_ENTRIES", "20000"))
+
+
+class ExplanationError(ValueError):
+    """
+    Raised for an invalid explanation request; `details` lists the offending fields.
+    """
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or []
+
+
+class ExplanationUnavailableError(ExplanationError):
+    """
+    Raised when the served model has no tree-path explanation.
+    """
+
+
+class _ColumnMap:
+    """
+    Sums model-input contributions onto the Ames columns they were derived
+    from: every one-hot column of a categorical feature adds up to that
+    feature. Built once per model version.
+    """
+    def __init__(self, bundle):
+        compiled = bundle.compiled_preprocessor
+        if compiled is None:
+            compiled = CompiledPreprocessor.from_column_transformer(bundle.preprocessor)
+        output_columns = compiled.output_columns()
+        self.columns = list(dict.fromkeys(column for column in output_columns if column is not None))
+        position = {column: i for i, column in enumerate(self.columns)}
+        self.matrix = np.zeros((len(output_columns), len(self.columns)))
+        for i, column in enumerate(output_columns):
+            if column is not None:
+                self.matrix[i, position[column]] = 1.0
+
+    def aggregate(self, contributions):
+        return contributions @ self.matrix
+
+
+_column_maps = {}
+_explanation_cache = None
+_lock = threading.Lock()
+
+
+def get_explanation_cache():
+    """
+    Returns the per-process cache of explanations. It uses the prediction
+    cache's LRU/TTL and versioning but stays local: entries are vectors.
+    """
+    global _explanation_cache
+    if _explanation_cache is None:
+        with _lock:
+            if _explanation_cache is None:
+                _explanation_cache = PredictionCache(PredictionCacheConfig(
+                    max_entries=ExplainConfig.cache_max_entries, shared_path=""))
+    return _explanation_cache
+
+
+class Explainer:
+    """
+    Explains predictions with tree-path attribution on the native model:
+    each split on a row's path credits its feature with the change in the
+    expected output, so the contributions plus the expected value
+    (precomputed at export time) add up to the log-price prediction.
+    Uncached rows are explained together in one vectorized pass, and their
+    prices are also stored in the prediction cache.
+    """
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, config=None):
+        self.model_name = model_name
+        self.explain_config = config or ExplainConfig()
+
+    @staticmethod
+    def _column_map(bundle):
+        column_map = _column_maps.get(bundle.version)
+        if column_map is None:
+            column_map = _ColumnMap(bundle)
+            with _lock:
+                _column_maps.clear()
+                _column_maps[bundle.version] = column_map
+        return column_map
+
+    def _compute(self, bundle, rows):
+        x = PredictPipeline._transform(bundle, rows)
+        with METRICS.span("model_explain"):
+            contributions = bundle.model.contributions(x)
+        return self._column_map(bundle).aggregate(contributions)
+
+    def initiate_explanations(self, records, top=None):
+        """
+        Validates `records` (a list of feature dicts) and returns, for each,
+        {"price", "expected_price", "contributions"}; contributions are
+        [{"feature", "log_contribution"}] sorted by absolute size (the `top`
+        largest when given). exp(log(expected_price) + sum of contributions)
+        is the price.
+        """
+        if isinstance(records, list) and len(records) > self.explain_config.max_rows:
+            raise ExplanationError(f"At most {self.explain_config.max_rows} instances can be explained at once")
+        rows, errors = FEATURE_SCHEMA.validate_records(records)
+        if errors:
+            raise ExplanationError("Invalid features", errors)
+
+        bundle = get_registry().get(self.model_name)
+        model = bundle.model
+        if not getattr(model, "supports_contributions", False):
+            raise ExplanationUnavailableError(
+                f"Model version {bundle.version} ({type(model).__name__}) has no exported "
+                "tree-path explanation; retrain with a native-exportable additive model")
+        if len(rows) == 0:
+            return {"model_version": bundle.version, "explanations": []}
+
+        try:
+            cache = get_explanation_cache()
+            keys = canonical_keys(rows, bundle.version)
+            found = cache.get_many(keys, bundle.version)
+            missing = [i for i, key in enumerate(keys) if key not in found]
+            if missing:
+                computed = self._compute(bundle, rows[missing])
+                cache.put_many(zip((keys[i] for i in missing), computed), bundle.version)
+                found.update(zip((keys[i] for i in missing), computed))
+
+            expected = float(model.meta["expected_value"])
+            contributions = np.vstack([found[key] for key in keys])
+            prices = np.exp(expected + contributions.sum(axis=1))
+            prediction_cache = get_prediction_cache()
+            if missing and prediction_cache.cache_config.enabled:
+                prediction_cache.put_many(((keys[i], float(prices[i])) for i in missing), bundle.version)
+
+            columns = self._column_map(bundle).columns
+            explanations = []
+            for price, row in zip(prices.tolist(), contributions):
+                order = np.argsort(-np.abs(row), kind="stable")[:top]
+                explanations.append({
+                    "price": price,
+                    "expected_price": float(np.exp(expected)),
+                    "contributions": [
+                        {"feature": columns[j], "log_contribution": float(row[j])} for j in order
+                    ],
+                })
+            return {"model_version": bundle.version, "explanations": explanations}
+
+        except Exception as e:
+            raise CustomException(e, sys)
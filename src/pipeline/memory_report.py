@@ -0,0 +1,165 @@
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import resource
+import multiprocessing
+from dataclasses import dataclass, replace
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.logger import logging
+from src.pipeline.model_registry import ModelRegistry, ModelRegistryConfig
+from src.pipeline.predict_pipeline import PredictPipeline
+
+SERVING_MODES = ("default", "preload", "mmap")
+
+# Fields of /proc/<pid>/smaps_rollup reported, in bytes
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+@dataclass
+class MemoryReportConfig:
+    """
+    Configuration class for the serving memory report.
+    """
+    report_file_path: str = os.path.join("artifacts", "memory_report.json")
+    n_workers: int = 4
+    # Rows each simulated worker scores, so the model pages it needs are really touched
+    n_rows: int = 256
+
+
+def process_memory(pid="self"):
+    """
+    Memory of one process in bytes. Pss splits every shared page between
+    the processes mapping it, so summing Pss over the workers gives their
+    real combined footprint. Outside Linux only the peak RSS is available.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            memory = {}
+            for line in smaps:
+                key, _, rest = line.partition(":")
+                if key in SMAPS_FIELDS:
+                    memory[key.lower() + "_bytes"] = int(rest.split()[0]) * 1024
+            return memory
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return {"max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale}
+
+
+def _worker(mode, shared_registry, registry_config, n_rows, results, release):
+    """
+    One simulated gunicorn worker: gets a model (inherited, loaded or
+    memory-mapped depending on the mode), scores a batch, reports its memory
+    and stays alive until every worker has reported, so shared pages are
+    counted as shared.
+    """
+    try:
+        registry = shared_registry if mode == "preload" else ModelRegistry(registry_config)
+        bundle = registry.get()
+        PredictPipeline._predict_frame(bundle, FEATURE_SCHEMA.empty(n_rows))
+        results.put((os.getpid(), process_memory()))
+    except Exception as e:
+        results.put((os.getpid(), {"error": str(e)}))
+    release.wait()
+
+
+def measure_mode(mode, config=None, registry_config=None):
+    """
+    Forks `n_workers` workers serving in `mode` and returns their summed
+    memory:
+      - "default": every worker unpickles/loads its own copy of the artifacts.
+      - "preload": the artifacts are loaded once before forking and the
+        objects frozen out of the garbage collector, so workers share the
+        pages copy-on-write.
+      - "mmap": every worker memory-maps the native model arrays read-only,
+        so they share the OS page cache.
+    """
+    try:
+        config = config or MemoryReportConfig()
+        registry_config = registry_config or ModelRegistryConfig()
+        registry_config = replace(registry_config, mmap_native_model=(mode == "mmap"))
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        release = context.Event()
+
+        shared_registry = None
+        if mode == "preload":
+            shared_registry = ModelRegistry(registry_config)
+            shared_registry.get()
+            gc.collect()
+            gc.freeze()
+
+        workers = [
+            context.Process(target=_worker,
+                            args=(mode, shared_registry, registry_config, config.n_rows, results, release))
+            for _ in range(config.n_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        reports = dict(results.get(timeout=300) for _ in workers)
+        # The preloading master keeps its share of the pages it handed to the workers
+        master = process_memory() if mode == "preload" else None
+        release.set()
+        for worker in workers:
+            worker.join()
+        if mode == "preload":
+            gc.unfreeze()
+
+        errors = [report["error"] for report in reports.values() if "error" in report]
+        if errors:
+            raise RuntimeError(errors[0])
+        totals = {}
+        for report in list(reports.values()) + ([master] if master else []):
+            for key, value in report.items():
+                totals[key] = totals.get(key, 0) + value
+        return {"workers": list(reports.values()), "master": master, "total": totals}
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def initiate_memory_report(modes=SERVING_MODES, config=None):
+    """
+    Measures every serving mode and writes the JSON report. Returns its path.
+    """
+    try:
+        config = config or MemoryReportConfig()
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "n_workers": config.n_workers,
+            "modes": {},
+        }
+        for mode in modes:
+            report["modes"][mode] = measure_mode(mode, config)
+            logging.info(f"Serving memory in {mode} mode: {report['modes'][mode]['total']}")
+
+        os.makedirs(os.path.dirname(config.report_file_path), exist_ok=True)
+        with open(config.report_file_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        return config.report_file_path
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare worker memory across model serving modes.")
+    parser.add_argument("--modes", nargs="+", choices=SERVING_MODES, default=list(SERVING_MODES))
+    parser.add_argument("--workers", type=int, default=MemoryReportConfig.n_workers)
+    args = parser.parse_args()
+
+    report_path = initiate_memory_report(args.modes, MemoryReportConfig(n_workers=args.workers))
+    with open(report_path) as report_file:
+        for mode, result in json.load(report_file)["modes"].items():
+            total = result["total"]
+            used = total.get("pss_bytes", total.get("max_rss_bytes", 0))
+            print(f"{mode:<8} {used / 2**20:10.1f} MiB across {args.workers} workers")
+    print(f"Report written to {report_path}")
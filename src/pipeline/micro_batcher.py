@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.logger import logging
+from src.pipeline.predict_pipeline import PredictPipeline
+
+
+@dataclass
+class MicroBatcherConfig:
+    """
+    Configuration class for the online micro-batching layer.
+    """
+    enabled: bool = os.environ.get("MICRO_BATCHING", "0") == "1"
+    # How long the first request of a batch may wait for others to join
+    max_wait_ms: float = float(os.environ.get("MICRO_BATCH_WAIT_MS", "5"))
+    # Rows that trigger an immediate flush
+    max_batch_rows: int = int(os.environ.get("MICRO_BATCH_MAX_ROWS", "256"))
+    # Backpressure: rows allowed to wait in the queue before callers are rejected
+    max_queue_rows: int = int(os.environ.get("MICRO_BATCH_MAX_QUEUE_ROWS", "4096"))
+    # Seconds a caller waits for its result
+    result_timeout: float = 5.0
+
+
+class BatcherOverloadedError(Exception):
+    """
+    Raised instead of queueing when the batcher already holds max_queue_rows
+    rows, and when a queued request gets no result within result_timeout.
+    """
+
+
+class MicroBatcher:
+    """
+    Collects concurrent prediction requests for up to `max_wait_ms` or
+    `max_batch_rows` rows, scores them with a single vectorized call of
+    `predict_fn` and hands every caller its own slice of the result.
+
+    Requests are FeatureSchema records; `predict_fn` takes the concatenated
+    records and returns one price per row.
+    """
+    def __init__(self, predict_fn, config=None):
+        self.batcher_config = config or MicroBatcherConfig()
+        self.predict_fn = predict_fn
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_rows = 0
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.largest_batch = 0
+
+    def _ensure_worker(self):
+        # Started lazily, and again in a forked child where the thread does not exist
+        if self._thread is None or self._pid != os.getpid():
+            self._queue = queue.Queue()
+            self._pending_rows = 0
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """
+        Queues `rows` and returns a Future resolving to their prices.
+        """
+        with self._lock:
+            self._ensure_worker()
+            if self._pending_rows + len(rows) > self.batcher_config.max_queue_rows:
+                self.rejected += 1
+                raise BatcherOverloadedError(
+                    f"{self._pending_rows} rows already queued (limit {self.batcher_config.max_queue_rows})"
+                )
+            self._pending_rows += len(rows)
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def predict(self, rows):
+        timeout = self.batcher_config.result_timeout
+        try:
+            return self.submit(rows).result(timeout=timeout)
+        except FutureTimeoutError:
+            # The future is left alone: the worker still resolves it, nobody reads the result
+            with self._lock:
+                self.timed_out += 1
+            raise BatcherOverloadedError(f"No result within {timeout}s")
+
+    def _collect(self):
+        """
+        Blocks for the first request, then gathers more until the batch is
+        full or the wait window closes.
+        """
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.monotonic() + self.batcher_config.max_wait_ms / 1000.0
+        while n_rows < self.batcher_config.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch, n_rows
+
+    def _run(self):
+        while True:
+            batch, n_rows = self._collect()
+            with self._lock:
+                self._pending_rows -= n_rows
+
+            try:
+                preds = self.predict_fn(np.concatenate([rows for rows, _ in batch]))
+            except Exception as e:
+                logging.error(f"Micro-batch of {n_rows} rows failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for rows, future in batch:
+                future.set_result(preds[start:start + len(rows)])
+                start += len(rows)
+
+            with self._lock:
+                self.batches += 1
+                self.rows += n_rows
+                self.largest_batch = max(self.largest_batch, n_rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth_rows": self._pending_rows,
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+                "largest_batch_rows": self.largest_batch,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """
+    Returns the process-wide batcher in front of PredictPipeline.predict.
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(PredictPipeline().predict)
+    return _batcher
@@ -0,0 +1,415 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import METRICS
+from src.components.compiled_preprocessor import CompiledPreprocessorConfig
+from src.pipeline.tree_backend import NATIVE_META_FILE, NativeModel
+from src.utils import load_object, compute_file_hash
+
+DEFAULT_MODEL_NAME = "default"
+
+
+@dataclass
+class ModelRegistryConfig:
+    """
+    Configuration class for the model registry.
+    """
+    model_file_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    compiled_preprocessor_file_path: str = CompiledPreprocessorConfig.compiled_preprocessor_file_path
+    # Serve with the flattened NumPy preprocessor when a matching export exists
+    use_compiled_preprocessor: bool = True
+    # Also unpickle preprocessor.pkl when the compiled copy is used
+    load_sklearn_preprocessor: bool = False
+    native_model_dir: str = os.path.join("artifacts", "model_native")
+    # Written last by training: names the artifact files that belong together, with their hashes
+    manifest_file_path: str = os.path.join("artifacts", "model_manifest.json")
+    # Serve with the NumPy tree backend instead of unpickling model.pkl when possible
+    use_native_model: bool = True
+    # Memory-map the native arrays read-only: all workers share one copy in the page cache
+    mmap_native_model: bool = os.environ.get("MODEL_MMAP", "0") == "1"
+    # How many named model versions may stay loaded at the same time
+    max_resident_models: int = 3
+    # Minimum number of seconds between two stat() checks of the same artifacts
+    check_interval: float = 2.0
+
+
+@dataclass
+class ModelBundle:
+    """
+    A loaded model together with the preprocessor it was trained with.
+    Request handlers only borrow this object, they never modify it.
+    """
+    name: str
+    model: object
+    # Fitted ColumnTransformer; None when compiled_preprocessor is served instead
+    preprocessor: object
+    # CompiledPreprocessor built from `preprocessor`, or None
+    compiled_preprocessor: object
+    version: str
+    paths: tuple
+    signature: tuple
+    loaded_at: float = field(default_factory=time.time)
+    checked_at: float = field(default_factory=time.monotonic)
+
+
+def _file_signature(paths):
+    """
+    Cheap change detector for a set of files: (mtime_ns, size) of each one,
+    None for optional files that do not exist.
+    """
+    signature = []
+    for path in paths:
+        if path is None or not os.path.exists(path):
+            signature.append(None)
+            continue
+        stat = os.stat(path)
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _content_version(paths, file_hash=compute_file_hash):
+    """
+    Short content hash identifying one set of model artifacts.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if path is not None and os.path.exists(path):
+            digest.update(file_hash(path).encode())
+    return digest.hexdigest()[:12]
+
+
+def _read_manifest(manifest_path):
+    if manifest_path is None or not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def _artifact_signature(paths):
+    """
+    Change detector of a bundle: the manifest alone when there is one, so a
+    retrain that has rewritten only some of the files is not picked up.
+    """
+    manifest_path = paths[4]
+    if manifest_path is not None and os.path.exists(manifest_path):
+        return _file_signature((manifest_path,))
+    return _file_signature(paths[:4])
+
+
+def _artifact_version(paths):
+    manifest = _read_manifest(paths[4])
+    return manifest["version"] if manifest is not None else _content_version(paths[:4])
+
+
+def publish_artifact_manifest(config=None):
+    """
+    Writes the manifest of the artifacts in `config` (the default model):
+    the content hashes of model.pkl and preprocessor.pkl, and of the
+    compiled preprocessor and native export when they were built from
+    exactly those two files. Training calls it once every artifact is in
+    place; serving processes reload only when it changes and refuse files
+    that do not match it. Returns the artifact version.
+    """
+    try:
+        config = config or ModelRegistryConfig()
+        model_hash = compute_file_hash(config.model_file_path)
+        preprocessor_hash = compute_file_hash(config.preprocessor_file_path)
+
+        compiled_hash = None
+        if os.path.exists(config.compiled_preprocessor_file_path):
+            if load_object(config.compiled_preprocessor_file_path).source_hash == preprocessor_hash:
+                compiled_hash = compute_file_hash(config.compiled_preprocessor_file_path)
+            else:
+                logging.warning(f"{config.compiled_preprocessor_file_path} was exported from another "
+                                "preprocessor, leaving it out of the manifest")
+
+        native_hash = None
+        native_meta_path = os.path.join(config.native_model_dir, NATIVE_META_FILE)
+        if os.path.exists(native_meta_path):
+            with open(native_meta_path) as meta_file:
+                meta = json.load(meta_file)
+            if meta.get("source_hash") == model_hash and meta.get("preprocessor_hash") == preprocessor_hash:
+                native_hash = compute_file_hash(native_meta_path)
+            else:
+                logging.warning(f"{native_meta_path} was exported from another model or preprocessor, "
+                                "leaving it out of the manifest")
+
+        digest = hashlib.sha256()
+        for file_hash in (model_hash, preprocessor_hash, compiled_hash, native_hash):
+            if file_hash is not None:
+                digest.update(file_hash.encode())
+        manifest = {
+            "version": digest.hexdigest()[:12],
+            "model_hash": model_hash,
+            "preprocessor_hash": preprocessor_hash,
+            "compiled_hash": compiled_hash,
+            "native_hash": native_hash,
+            "published_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+        # Renamed into place: a reader sees the previous manifest or this one, never a partial file
+        tmp_path = f"{config.manifest_file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(tmp_path, config.manifest_file_path)
+        logging.info(f"Published model artifacts version {manifest['version']}")
+        return manifest["version"]
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models.
+
+    Artifacts are unpickled once per process, reloaded when their manifest
+    (or, without one, any of their files) changes and the content hash
+    confirms a new version, and several named versions can stay resident
+    with least-recently-used eviction. Loading happens outside the registry
+    lock, so a slow reload never blocks requests served by loaded bundles.
+    """
+    def __init__(self, config=None):
+        self.registry_config = config or ModelRegistryConfig()
+        self._specs = {
+            DEFAULT_MODEL_NAME: (
+                self.registry_config.model_file_path,
+                self.registry_config.preprocessor_file_path,
+                self.registry_config.compiled_preprocessor_file_path,
+                os.path.join(self.registry_config.native_model_dir, NATIVE_META_FILE),
+                self.registry_config.manifest_file_path,
+            )
+        }
+        self._bundles = OrderedDict()
+        self._lock = threading.RLock()
+        # One per model name: serializes its loads without holding self._lock
+        self._load_locks = {}
+
+    def register(self, name, model_path, preprocessor_path, compiled_preprocessor_path=None,
+                 native_model_dir=None, manifest_path=None):
+        """
+        Makes a named model version available. It is loaded on first use.
+        """
+        native_meta_path = os.path.join(native_model_dir, NATIVE_META_FILE) if native_model_dir else None
+        with self._lock:
+            self._specs[name] = (model_path, preprocessor_path, compiled_preprocessor_path, native_meta_path,
+                                 manifest_path)
+            self._bundles.pop(name, None)
+
+    def names(self):
+        with self._lock:
+            return list(self._specs)
+
+    def resident(self):
+        """
+        Returns the names of the currently loaded versions, least recently used first.
+        """
+        with self._lock:
+            return list(self._bundles)
+
+    def evict(self, name):
+        with self._lock:
+            self._bundles.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._bundles.clear()
+
+    def get(self, name=DEFAULT_MODEL_NAME):
+        """
+        Returns the loaded bundle for `name`, loading or hot-reloading it if needed.
+        """
+        try:
+            with self._lock:
+                if name not in self._specs:
+                    raise ValueError(f"Unknown model '{name}'")
+                paths = self._specs[name]
+                bundle = self._bundles.get(name)
+                if bundle is not None:
+                    self._bundles.move_to_end(name)
+                    if time.monotonic() - bundle.checked_at < self.registry_config.check_interval:
+                        return bundle
+                    # This thread checks for changes, the others keep serving the bundle meanwhile
+                    bundle.checked_at = time.monotonic()
+                load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+            if bundle is None:
+                with load_lock:
+                    # Another thread may have loaded it while this one waited
+                    with self._lock:
+                        bundle = self._bundles.get(name)
+                    if bundle is None:
+                        bundle = self._load(name, paths)
+                        self._install(bundle)
+                return bundle
+
+            if not load_lock.acquire(blocking=False):
+                return bundle
+            try:
+                refreshed = self._refresh(bundle)
+            finally:
+                load_lock.release()
+            if refreshed is not bundle:
+                self._install(refreshed)
+            return refreshed
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _install(self, bundle):
+        with self._lock:
+            # register() may have pointed the name at other files during the load
+            if self._specs.get(bundle.name) != bundle.paths:
+                return
+            self._bundles[bundle.name] = bundle
+            self._bundles.move_to_end(bundle.name)
+            self._evict_over_capacity()
+
+    def _load(self, name, paths):
+        """
+        Loads one bundle. With a manifest, every file must have the hash it
+        lists and exports it leaves out are not served; a mismatch (e.g. a
+        retrain has rewritten the preprocessor but not yet the model) raises.
+        """
+        hashes = {}
+
+        def file_hash(path):
+            if path not in hashes:
+                hashes[path] = compute_file_hash(path)
+            return hashes[path]
+
+        model_path, preprocessor_path, compiled_path, native_meta_path, manifest_path = paths
+        signature = _artifact_signature(paths)
+        manifest = _read_manifest(manifest_path)
+        if manifest is None:
+            version = _content_version(paths[:4], file_hash)
+        else:
+            version = manifest["version"]
+            if manifest.get("compiled_hash") is None:
+                compiled_path = None
+            if manifest.get("native_hash") is None:
+                native_meta_path = None
+            for path, key in ((model_path, "model_hash"), (preprocessor_path, "preprocessor_hash"),
+                              (compiled_path, "compiled_hash"), (native_meta_path, "native_hash")):
+                if path is not None and file_hash(path) != manifest[key]:
+                    raise ValueError(f"{path} does not match the artifact manifest {manifest_path} "
+                                     f"(version {version}); it is being rewritten or was replaced")
+
+        logging.info(f"Loading model '{name}' version {version} from {paths}")
+        with METRICS.span("artifact_load"):
+            preprocessor_hash = file_hash(preprocessor_path)
+            model = self._load_native(native_meta_path, file_hash(model_path), preprocessor_hash)
+            if model is None:
+                model = load_object(file_path=model_path)
+            compiled_preprocessor = self._load_compiled(compiled_path, preprocessor_hash)
+            # The sklearn preprocessor (and the sklearn import it implies) is only
+            # unpickled when there is no compiled copy to serve with
+            preprocessor = None
+            if compiled_preprocessor is None or self.registry_config.load_sklearn_preprocessor:
+                preprocessor = load_object(file_path=preprocessor_path)
+
+        return ModelBundle(
+            name=name,
+            model=model,
+            preprocessor=preprocessor,
+            compiled_preprocessor=compiled_preprocessor,
+            version=version,
+            paths=paths,
+            signature=signature,
+        )
+
+    def _load_compiled(self, compiled_path, preprocessor_hash):
+        """
+        Loads the flattened preprocessor if it exists and was exported from
+        exactly this preprocessor.pkl.
+        """
+        if not self.registry_config.use_compiled_preprocessor:
+            return None
+        if compiled_path is None or not os.path.exists(compiled_path):
+            return None
+
+        compiled = load_object(file_path=compiled_path)
+        if compiled.source_hash != preprocessor_hash:
+            logging.warning(f"{compiled_path} was exported from another preprocessor, ignoring it")
+            return None
+        return compiled
+
+    def _load_native(self, native_meta_path, model_hash, preprocessor_hash):
+        """
+        Loads the NumPy-only export of model.pkl if it exists and matches it.
+        An export trained with another preprocessor is refused outright.
+        """
+        if not self.registry_config.use_native_model:
+            return None
+        if native_meta_path is None or not os.path.exists(native_meta_path):
+            return None
+
+        mmap_mode = "r" if self.registry_config.mmap_native_model else None
+        model = NativeModel.load(os.path.dirname(native_meta_path), mmap_mode=mmap_mode)
+        if model.source_hash != model_hash:
+            logging.warning(f"{native_meta_path} was exported from another model, ignoring it")
+            return None
+        trained_with = model.meta.get("preprocessor_hash")
+        if trained_with is not None and trained_with != preprocessor_hash:
+            raise ValueError(f"{native_meta_path} was trained with another preprocessor than the one on disk")
+        logging.info(f"Serving {model.source_model} through the native tree backend")
+        return model
+
+    def _refresh(self, bundle):
+        """
+        Reloads the bundle only if its files really changed on disk. When the
+        new artifacts cannot be loaded (e.g. a retrain is still writing them),
+        the current bundle keeps serving and the reload is retried on the
+        next check.
+        """
+        bundle.checked_at = time.monotonic()
+        try:
+            signature = _artifact_signature(bundle.paths)
+            if signature == bundle.signature:
+                return bundle
+
+            # mtime/size moved: confirm with the content hash before unpickling again
+            version = _artifact_version(bundle.paths)
+            if version == bundle.version:
+                bundle.signature = signature
+                return bundle
+
+            logging.info(f"Artifacts of model '{bundle.name}' changed, reloading")
+            return self._load(bundle.name, bundle.paths)
+
+        except Exception as e:
+            logging.error(f"Reloading model '{bundle.name}' failed, still serving version {bundle.version}: {e}")
+            return bundle
+
+    def _evict_over_capacity(self):
+        while len(self._bundles) > max(1, self.registry_config.max_resident_models):
+            evicted, _ = self._bundles.popitem(last=False)
+            logging.info(f"Evicted model '{evicted}' from the registry")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Returns the registry shared by every PredictPipeline in this process.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
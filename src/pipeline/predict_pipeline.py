@@ -1,159 +1,175 @@
 import sys
 import os
-import pandas as pd
 import numpy as np
 
 # Adjusting the path to import from the src directory
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.exception import CustomException
-from src.utils import load_object
+from src.feature_schema import FEATURE_SCHEMA
+from src.metrics import METRICS
+from src.utils import as_model_input
+from src.pipeline.model_registry import DEFAULT_MODEL_NAME, get_registry
+from src.pipeline.prediction_cache import canonical_keys, get_prediction_cache
+
+# Number of rows scored per preprocessor/model call in batch mode
+BATCH_CHUNK_SIZE = 5000
+# Largest chunk a /predict/batch request may ask for: one chunk is held in memory at a time
+MAX_BATCH_CHUNK_SIZE = 50000
 
 
 class PredictPipeline:
     """
     This class is responsible for making predictions using the trained model.
+    The model and preprocessor are borrowed from the process-wide registry,
+    so they are unpickled once per worker instead of once per request.
     """
-    def __init__(self):
-        pass
+    def __init__(self, model_name=DEFAULT_MODEL_NAME):
+        self.model_name = model_name
 
-    def predict(self, features):
+    def predict(self, features, return_version=False):
         """
-        Loads the model and preprocessor to make a prediction on the input features.
-        The prediction is inverse-transformed (np.exp) to get the actual price.
+        Uses the loaded model and preprocessor to make a prediction on the input features
+        (a DataFrame or the structured records built by CustomData/FeatureSchema).
+        Rows already scored by the same model version are served from the
+        prediction cache. The prediction is inverse-transformed (np.exp) to get the actual price.
+        With `return_version`, returns (prices, version of the model that produced them).
         """
         try:
-            model_path = os.path.join("artifacts", "model.pkl")
-            preprocessor_path = os.path.join('artifacts', 'preprocessor.pkl')
-            
-            print("Before Loading")
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
-            print("After Loading")
-            
-            data_scaled = preprocessor.transform(features)
-            log_preds = model.predict(data_scaled)
-            
-            # Inverse transform the log prediction to get the actual sale price
-            preds = np.exp(log_preds)
-            
-            return preds
+            bundle = get_registry().get(self.model_name)
+            cache = get_prediction_cache()
+            METRICS.increment("ames_predicted_rows_total", len(features))
+            if not cache.cache_config.enabled:
+                preds = self._predict_frame(bundle, features)
+                return (preds, bundle.version) if return_version else preds
+
+            rows = features if isinstance(features, np.ndarray) else FEATURE_SCHEMA.from_frame(features)
+            with METRICS.span("prediction_cache_lookup"):
+                keys = canonical_keys(rows, bundle.version)
+                found = cache.get_many(keys, bundle.version)
+
+            preds = np.empty(len(keys), dtype=np.float64)
+            missing = [i for i, key in enumerate(keys) if key not in found]
+            if missing:
+                computed = self._predict_frame(bundle, rows[missing])
+                preds[missing] = computed
+                cache.put_many(zip((keys[i] for i in missing), computed.tolist()), bundle.version)
+            for i, key in enumerate(keys):
+                if key in found:
+                    preds[i] = found[key]
+            return (preds, bundle.version) if return_version else preds
         
         except Exception as e:
             raise CustomException(e, sys)
 
+    def predict_batch(self, features, chunk_size=BATCH_CHUNK_SIZE):
+        """
+        Scores many rows at once and yields one array of prices per chunk.
+
+        `features` is either a DataFrame or FeatureSchema records, which are
+        split into chunks of `chunk_size` rows, or an iterable of DataFrames (e.g. a chunked
+        pd.read_csv reader). The preprocessor and the model run once per chunk
+        and every chunk is scored with the same model version.
+        """
+        try:
+            if chunk_size < 1:
+                raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+            bundle = get_registry().get(self.model_name)
+
+            is_frame = hasattr(features, "iloc")
+            if is_frame or isinstance(features, np.ndarray):
+                rows = features.iloc if is_frame else features
+                chunks = (
+                    rows[start:start + chunk_size]
+                    for start in range(0, len(features), chunk_size)
+                )
+            else:
+                chunks = features
+
+            for chunk in chunks:
+                if len(chunk):
+                    yield self._predict_frame(bundle, chunk)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _predict_frame(bundle, features):
+        data_scaled = PredictPipeline._transform(bundle, features)
+        with METRICS.span("model_predict"):
+            log_preds = bundle.model.predict(as_model_input(bundle.model, data_scaled))
+
+        # Inverse transform the log prediction to get the actual sale price
+        return np.exp(log_preds)
+
+    @staticmethod
+    def _transform(bundle, features):
+        """
+        Runs the bundle's preprocessor on a DataFrame or FeatureSchema records.
+        """
+        with METRICS.span("preprocessor_transform"):
+            if bundle.compiled_preprocessor is not None:
+                # Flat NumPy transform straight from records or a DataFrame
+                data_scaled = bundle.compiled_preprocessor.transform(
+                    features if isinstance(features, np.ndarray) else
+                    features.reindex(columns=FEATURE_SCHEMA.columns)
+                )
+            else:
+                if isinstance(features, np.ndarray) and features.dtype.names:
+                    # Structured records from FeatureSchema / CustomData
+                    features = FEATURE_SCHEMA.to_frame(features)
+                else:
+                    # Columns the preprocessor never saw at fit time are dropped and
+                    # missing ones are added as NaN so the imputers fill them in
+                    features = features.reindex(columns=FEATURE_SCHEMA.columns)
+                data_scaled = bundle.preprocessor.transform(features)
+        return data_scaled
+
 class CustomData:
     """
     This class is responsible for mapping input data (e.g., from a web form)
     to the feature names that the model expects.
+
+    Values may be passed under the Ames column name ('Gr Liv Area'), its
+    attribute-style name ('Gr_Liv_Area') or the web form field name. They are
+    encoded once into a preallocated FeatureSchema record.
     """
+    __slots__ = ('_row',)
+
     def __init__(self, **kwargs):
-        # Initialize all features with None or the provided value
-        features_list = [
-            'MS SubClass', 'MS Zoning', 'Lot Frontage', 'Lot Area', 'Street', 'Lot Shape', 'Land Contour', 
-            'Utilities', 'Lot Config', 'Land Slope', 'Neighborhood', 'Condition 1', 'Condition 2', 
-            'Bldg Type', 'House Style', 'Overall Qual', 'Overall Cond', 'Year Built', 'Year Remod/Add', 
-            'Roof Style', 'Roof Matl', 'Exterior 1st', 'Exterior 2nd', 'Mas Vnr Type', 'Mas Vnr Area', 
-            'Exter Qual', 'Exter Cond', 'Foundation', 'Bsmt Qual', 'Bsmt Cond', 'Bsmt Exposure', 
-            'BsmtFin Type 1', 'BsmtFin SF 1', 'BsmtFin Type 2', 'BsmtFin SF 2', 'Bsmt Unf SF', 
-            'Total Bsmt SF', 'Heating', 'Heating QC', 'Central Air', 'Electrical', '1st Flr SF', 
-            '2nd Flr SF', 'Low Qual Fin SF', 'Gr Liv Area', 'Bsmt Full Bath', 'Bsmt Half Bath', 
-            'Full Bath', 'Half Bath', 'Bedroom AbvGr', 'Kitchen AbvGr', 'Kitchen Qual', 
-            'TotRms AbvGrd', 'Functional', 'Fireplaces', 'Fireplace Qu', 'Garage Type', 
-            'Garage Yr Blt', 'Garage Finish', 'Garage Cars', 'Garage Area', 'Garage Qual', 
-            'Garage Cond', 'Paved Drive', 'Wood Deck SF', 'Open Porch SF', 'Enclosed Porch', 
-            '3Ssn Porch', 'Screen Porch', 'Pool Area', 'Misc Val', 'Mo Sold', 'Yr Sold', 
-            'Sale Type', 'Sale Condition'
-        ]
-        for feature in features_list:
-            # Replace spaces and slashes with underscores for valid attribute names
-            attr_name = feature.replace(' ', '_').replace('/', '_')
-            setattr(self, attr_name, kwargs.get(feature))
+        with METRICS.span("custom_data"):
+            self._row = FEATURE_SCHEMA.encode_row(kwargs)
+
+    def __getattr__(self, name):
+        column = FEATURE_SCHEMA.resolve(name)
+        if column is None:
+            raise AttributeError(name)
+        value = self._row[column][0]
+        return None if isinstance(value, float) and np.isnan(value) else value
+
+    @classmethod
+    def from_form(cls, form):
+        """
+        Builds the object straight from a submitted web form (any mapping of field name to string).
+        """
+        data = cls.__new__(cls)
+        with METRICS.span("custom_data"):
+            data._row = FEATURE_SCHEMA.encode_form(form)
+        return data
+
+    def get_data_as_record(self):
+        """
+        Returns the single-row structured array; PredictPipeline accepts it directly.
+        """
+        return self._row
 
     def get_data_as_data_frame(self):
         """
         Converts the custom data object into a pandas DataFrame.
         """
         try:
-            custom_data_input_dict = {
-                'MS SubClass': [getattr(self, 'MS_SubClass', None)],
-                'MS Zoning': [getattr(self, 'MS_Zoning', None)],
-                'Lot Frontage': [getattr(self, 'Lot_Frontage', None)],
-                'Lot Area': [getattr(self, 'Lot_Area', None)],
-                'Street': [getattr(self, 'Street', None)],
-                'Lot Shape': [getattr(self, 'Lot_Shape', None)],
-                'Land Contour': [getattr(self, 'Land_Contour', None)],
-                'Utilities': [getattr(self, 'Utilities', None)],
-                'Lot Config': [getattr(self, 'Lot_Config', None)],
-                'Land Slope': [getattr(self, 'Land_Slope', None)],
-                'Neighborhood': [getattr(self, 'Neighborhood', None)],
-                'Condition 1': [getattr(self, 'Condition_1', None)],
-                'Condition 2': [getattr(self, 'Condition_2', None)],
-                'Bldg Type': [getattr(self, 'Bldg_Type', None)],
-                'House Style': [getattr(self, 'House_Style', None)],
-                'Overall Qual': [getattr(self, 'Overall_Qual', None)],
-                'Overall Cond': [getattr(self, 'Overall_Cond', None)],
-                'Year Built': [getattr(self, 'Year_Built', None)],
-                'Year Remod/Add': [getattr(self, 'Year_Remod_Add', None)],
-                'Roof Style': [getattr(self, 'Roof_Style', None)],
-                'Roof Matl': [getattr(self, 'Roof_Matl', None)],
-                'Exterior 1st': [getattr(self, 'Exterior_1st', None)],
-                'Exterior 2nd': [getattr(self, 'Exterior_2nd', None)],
-                'Mas Vnr Type': [getattr(self, 'Mas_Vnr_Type', None)],
-                'Mas Vnr Area': [getattr(self, 'Mas_Vnr_Area', None)],
-                'Exter Qual': [getattr(self, 'Exter_Qual', None)],
-                'Exter Cond': [getattr(self, 'Exter_Cond', None)],
-                'Foundation': [getattr(self, 'Foundation', None)],
-                'Bsmt Qual': [getattr(self, 'Bsmt_Qual', None)],
-                'Bsmt Cond': [getattr(self, 'Bsmt_Cond', None)],
-                'Bsmt Exposure': [getattr(self, 'Bsmt_Exposure', None)],
-                'BsmtFin Type 1': [getattr(self, 'BsmtFin_Type_1', None)],
-                'BsmtFin SF 1': [getattr(self, 'BsmtFin_SF_1', None)],
-                'BsmtFin Type 2': [getattr(self, 'BsmtFin_Type_2', None)],
-                'BsmtFin SF 2': [getattr(self, 'BsmtFin_SF_2', None)],
-                'Bsmt Unf SF': [getattr(self, 'Bsmt_Unf_SF', None)],
-                'Total Bsmt SF': [getattr(self, 'Total_Bsmt_SF', None)],
-                'Heating': [getattr(self, 'Heating', None)],
-                'Heating QC': [getattr(self, 'Heating_QC', None)],
-                'Central Air': [getattr(self, 'Central_Air', None)],
-                'Electrical': [getattr(self, 'Electrical', None)],
-                '1st Flr SF': [getattr(self, '1st_Flr_SF', None)],
-                '2nd Flr SF': [getattr(self, '2nd_Flr_SF', None)],
-                'Low Qual Fin SF': [getattr(self, 'Low_Qual_Fin_SF', None)],
-                'Gr Liv Area': [getattr(self, 'Gr_Liv_Area', None)],
-                'Bsmt Full Bath': [getattr(self, 'Bsmt_Full_Bath', None)],
-                'Bsmt Half Bath': [getattr(self, 'Bsmt_Half_Bath', None)],
-                'Full Bath': [getattr(self, 'Full_Bath', None)],
-                'Half Bath': [getattr(self, 'Half_Bath', None)],
-                'Bedroom AbvGr': [getattr(self, 'Bedroom_AbvGr', None)],
-                'Kitchen AbvGr': [getattr(self, 'Kitchen_AbvGr', None)],
-                'Kitchen Qual': [getattr(self, 'Kitchen_Qual', None)],
-                'TotRms AbvGrd': [getattr(self, 'TotRms_AbvGrd', None)],
-                'Functional': [getattr(self, 'Functional', None)],
-                'Fireplaces': [getattr(self, 'Fireplaces', None)],
-                'Fireplace Qu': [getattr(self, 'Fireplace_Qu', None)],
-                'Garage Type': [getattr(self, 'Garage_Type', None)],
-                'Garage Yr Blt': [getattr(self, 'Garage_Yr_Blt', None)],
-                'Garage Finish': [getattr(self, 'Garage_Finish', None)],
-                'Garage Cars': [getattr(self, 'Garage_Cars', None)],
-                'Garage Area': [getattr(self, 'Garage_Area', None)],
-                'Garage Qual': [getattr(self, 'Garage_Qual', None)],
-                'Garage Cond': [getattr(self, 'Garage_Cond', None)],
-                'Paved Drive': [getattr(self, 'Paved_Drive', None)],
-                'Wood Deck SF': [getattr(self, 'Wood_Deck_SF', None)],
-                'Open Porch SF': [getattr(self, 'Open_Porch_SF', None)],
-                'Enclosed Porch': [getattr(self, 'Enclosed_Porch', None)],
-                '3Ssn Porch': [getattr(self, '3Ssn_Porch', None)],
-                'Screen Porch': [getattr(self, 'Screen_Porch', None)],
-                'Pool Area': [getattr(self, 'Pool_Area', None)],
-                'Misc Val': [getattr(self, 'Misc_Val', None)],
-                'Mo Sold': [getattr(self, 'Mo_Sold', None)],
-                'Yr Sold': [getattr(self, 'Yr_Sold', None)],
-                'Sale Type': [getattr(self, 'Sale_Type', None)],
-                'Sale Condition': [getattr(self, 'Sale_Condition', None)],
-            }
-
-            return pd.DataFrame(custom_data_input_dict)
+            with METRICS.span("custom_data_frame"):
+                return FEATURE_SCHEMA.to_frame(self._row)
 
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
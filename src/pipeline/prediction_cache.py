@@ -0,0 +1,259 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.logger import logging
+
+
+@dataclass
+class PredictionCacheConfig:
+    """
+    Configuration class for the prediction cache.
+    """
+    enabled: bool = os.environ.get("PREDICTION_CACHE", "1") != "0"
+    # Entries kept in the per-process LRU
+    max_entries: int = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", "100000"))
+    # Seconds an entry stays valid; 0 disables expiry
+    ttl_seconds: float = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+    # Optional SQLite file shared by all gunicorn workers on the host
+    shared_path: str = os.environ.get("PREDICTION_CACHE_SHARED_PATH", "")
+    # Rows kept in the shared file; the oldest are deleted beyond this
+    shared_max_rows: int = int(os.environ.get("PREDICTION_CACHE_SHARED_MAX_ROWS", "1000000"))
+    # Writes of one process between two deletions of expired and surplus shared rows
+    shared_prune_interval: int = 200
+
+
+def canonical_keys(rows, namespace):
+    """
+    One hash per FeatureSchema record. Numbers are hashed as float64 (so a
+    form's "0", 0 and 0.0 are the same value) and every missing value as
+    NaN, so equivalent inputs share a key. `namespace` (the model version)
+    is mixed in, so a new model never sees the old model's entries.
+    """
+    prefix = namespace.encode()
+    numeric = np.column_stack([rows[c] for c in FEATURE_SCHEMA.numerical_columns]).astype(np.float64)
+    # All NaN payloads hash the same
+    numeric[np.isnan(numeric)] = np.nan
+    keys = []
+    for i in range(len(rows)):
+        digest = hashlib.blake2b(prefix, digest_size=16)
+        digest.update(numeric[i].tobytes())
+        for column in FEATURE_SCHEMA.categorical_columns:
+            value = rows[column][i]
+            digest.update(b"\x00" if isinstance(value, float) else b"\x01" + str(value).encode() + b"\x1f")
+        keys.append(digest.hexdigest())
+    return keys
+
+
+class _SharedStore:
+    """
+    SQLite stand-in for a shared cache server: WAL mode lets every worker
+    process read and write the same file concurrently. Rows carry the model
+    version that wrote them; a worker moving to a new version deletes the
+    old version's rows, and every `prune_interval` writes expired rows and
+    those beyond `max_rows` (oldest first) are deleted too.
+    """
+    def __init__(self, path, ttl_seconds, max_rows, prune_interval):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._version = None
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(predictions)")]
+            if columns and "version" not in columns:
+                # Written before rows were versioned: nothing to keep in a cache
+                connection.execute("DROP TABLE predictions")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, price REAL, created REAL, version TEXT)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        oldest = time.time() - self.ttl_seconds if self.ttl_seconds else 0.0
+        found = {}
+        # Stay under SQLite's limit on bound parameters per statement
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self._connection().execute(
+                f"SELECT key, price FROM predictions WHERE created >= ? AND key IN ({placeholders})",
+                [oldest, *batch],
+            ).fetchall())
+        return found
+
+    def put_many(self, items, version):
+        now = time.time()
+        self._connection().executemany(
+            "INSERT OR REPLACE INTO predictions (key, price, created, version) VALUES (?, ?, ?, ?)",
+            [(key, price, now, version) for key, price in items],
+        )
+        with self._lock:
+            new_version = version != self._version
+            self._version = version
+            self._writes += 1
+            due = self._writes % self.prune_interval == 0
+        if new_version:
+            self._connection().execute("DELETE FROM predictions WHERE version != ?", [version])
+        if due:
+            self.prune(now)
+
+    def prune(self, now=None):
+        """
+        Deletes expired rows and the oldest rows beyond max_rows.
+        """
+        connection = self._connection()
+        if self.ttl_seconds:
+            connection.execute("DELETE FROM predictions WHERE created < ?",
+                               [(now or time.time()) - self.ttl_seconds])
+        connection.execute(
+            "DELETE FROM predictions WHERE created <= "
+            "(SELECT created FROM predictions ORDER BY created DESC LIMIT 1 OFFSET ?)",
+            [self.max_rows],
+        )
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of predicted prices, keyed on the canonical hash of a
+    feature vector plus the model version. Hits and misses are counted; an
+    optional SQLite file lets gunicorn workers share hits.
+    """
+    def __init__(self, config=None):
+        self.cache_config = config or PredictionCacheConfig()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._shared = None
+        if self.cache_config.shared_path:
+            try:
+                self._shared = _SharedStore(
+                    self.cache_config.shared_path, self.cache_config.ttl_seconds,
+                    self.cache_config.shared_max_rows, self.cache_config.shared_prune_interval,
+                )
+            except Exception as e:
+                logging.warning(f"Shared prediction cache unavailable, using the local cache only: {e}")
+
+    def _check_version(self, version):
+        # A replaced model.pkl means a new version: drop everything computed with the old one
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get_many(self, keys, version):
+        """
+        Returns {key: price} for the keys that are cached.
+        """
+        found = {}
+        now = time.monotonic()
+        ttl = self.cache_config.ttl_seconds
+        with self._lock:
+            self._check_version(version)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                price, created = entry
+                if ttl and now - created > ttl:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = price
+
+        missing = [key for key in keys if key not in found]
+        if self._shared is not None and missing:
+            try:
+                shared = self._shared.get_many(missing)
+            except sqlite3.Error as e:
+                logging.warning(f"Shared prediction cache read failed: {e}")
+                shared = {}
+            if shared:
+                self._store_local(shared.items(), version)
+                found.update(shared)
+                with self._lock:
+                    self.shared_hits += len(shared)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def _store_local(self, items, version):
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            for key, price in items:
+                self._entries[key] = (price, now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.cache_config.max_entries:
+                self._entries.popitem(last=False)
+
+    def put_many(self, items, version):
+        items = list(items)
+        self._store_local(items, version)
+        if self._shared is not None:
+            try:
+                self._shared.put_many(items, version)
+            except sqlite3.Error as e:
+                logging.warning(f"Shared prediction cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": self.shared_hits,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "model_version": self._version,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """
+    Returns the prediction cache shared by every PredictPipeline in this process.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = PredictionCache()
+                except Exception as e:
+                    raise CustomException(e, sys)
+    return _cache
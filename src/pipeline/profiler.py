@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.logger import logging
+
+try:
+    # Installed with memory_profiler; also sees the joblib worker processes
+    import psutil
+except ImportError:
+    psutil = None
+
+# Shared by every stage while profiling is disabled
+_NOOP_STAGE = nullcontext()
+
+
+@dataclass
+class ProfilerConfig:
+    """
+    Configuration class for the training profiler.
+    """
+    enabled: bool = os.environ.get("PROFILE", "0") == "1"
+    report_file_path: str = os.path.join("artifacts", "profile_report.json")
+    # Collapsed stacks of the slowest stage, for flamegraph.pl / speedscope
+    stacks_file_path: str = os.path.join("artifacts", "profile_slowest_stage.folded")
+    # Seconds between two stack samples and between two RSS readings
+    sample_interval: float = 0.01
+    memory_interval: float = 0.02
+
+
+def _rss(process=None):
+    """
+    Resident set size of this process in bytes, plus that of its children
+    when psutil is available (0 otherwise).
+    """
+    if process is not None:
+        own = process.memory_info().rss
+        children = 0
+        for child in process.children(recursive=True):
+            try:
+                children += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return own, children
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"), 0
+    except (OSError, ValueError):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 0
+
+
+class _Sampler(threading.Thread):
+    """
+    Background thread calling `sample()` every `interval` seconds until stopped.
+    """
+    def __init__(self, interval, sample):
+        super().__init__(daemon=True, name="profiler")
+        self.interval = interval
+        self.sample = sample
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+@contextmanager
+def measure_usage(memory_interval=0.02, stack_interval=None):
+    """
+    Measures the enclosed block: yields a dict filled on exit with
+    wall_seconds, cpu_seconds, peak_rss_bytes (this process) and
+    peak_children_rss_bytes (joblib workers, with psutil). With
+    `stack_interval`, the calling thread's stack is also sampled and the
+    collapsed stacks are stored under "stacks".
+    """
+    usage = {}
+    process = psutil.Process() if psutil is not None else None
+    peak = [0, 0]
+
+    def sample_memory():
+        own, children = _rss(process)
+        peak[0], peak[1] = max(peak[0], own), max(peak[1], children)
+
+    target = threading.get_ident()
+    stacks = Counter()
+
+    def sample_stack():
+        frame = sys._current_frames().get(target)
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if names:
+            stacks[";".join(reversed(names))] += 1
+
+    samplers = [_Sampler(memory_interval, sample_memory)]
+    if stack_interval:
+        samplers.append(_Sampler(stack_interval, sample_stack))
+    sample_memory()
+    for sampler in samplers:
+        sampler.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield usage
+    finally:
+        usage["wall_seconds"] = time.perf_counter() - wall
+        usage["cpu_seconds"] = time.process_time() - cpu
+        for sampler in samplers:
+            sampler.stop()
+        sample_memory()
+        usage["peak_rss_bytes"] = peak[0]
+        usage["peak_children_rss_bytes"] = peak[1]
+        if stack_interval:
+            usage["stacks"] = dict(stacks)
+
+
+class TrainingProfiler:
+    """
+    Opt-in profiler of the training pipeline. Stages record wall time, CPU
+    time and peak RSS; top-level stages are also stack-sampled from a
+    background thread. Model search results (one entry per model and
+    parameter combination) are attached with record_candidates().
+    When disabled, stage() returns a shared no-op context manager.
+    """
+    def __init__(self, config=None):
+        self.profiler_config = config or ProfilerConfig()
+        self.enabled = self.profiler_config.enabled
+        self._stages = []
+        self._stacks = {}
+        self._candidates = {}
+        self._depth = 0
+
+    def stage(self, name):
+        """
+        Context manager profiling a block: `with PROFILER.stage("ingestion"): ...`
+        """
+        if not self.enabled:
+            return _NOOP_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        config = self.profiler_config
+        top_level = self._depth == 0
+        self._depth += 1
+        try:
+            with measure_usage(config.memory_interval, config.sample_interval if top_level else None) as usage:
+                yield usage
+        finally:
+            self._depth -= 1
+            stacks = usage.pop("stacks", None)
+            if stacks is not None:
+                self._stacks[name] = stacks
+            self._stages.append(dict(stage=name, depth=self._depth, **usage))
+            logging.info(f"Profiled stage '{name}': {usage}")
+
+    def record_candidates(self, model_report):
+        """
+        Keeps the per-candidate usage evaluate_models(profile=True) added to
+        its report.
+        """
+        if self.enabled:
+            for name, entry in model_report.items():
+                self._candidates[name] = {"search": entry.get("candidates", []), "refit": entry.get("refit")}
+
+    def initiate_profile_report(self):
+        """
+        Writes the JSON report and the collapsed stacks of the slowest
+        top-level stage. Returns the report path, or None when disabled.
+        """
+        if not self.enabled:
+            return None
+        try:
+            config = self.profiler_config
+            top_level = [stage for stage in self._stages if stage["depth"] == 0 and stage["stage"] in self._stacks]
+            slowest = max(top_level, key=lambda stage: stage["wall_seconds"], default=None)
+
+            report = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "pid": os.getpid(),
+                "psutil": psutil is not None,
+                "stages": self._stages,
+                "candidates": self._candidates,
+                "slowest_stage": None,
+            }
+            if slowest is not None:
+                stacks = self._stacks[slowest["stage"]]
+                os.makedirs(os.path.dirname(config.stacks_file_path), exist_ok=True)
+                with open(config.stacks_file_path, "w") as stacks_file:
+                    for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+                        stacks_file.write(f"{stack} {count}\n")
+                report["slowest_stage"] = {
+                    "stage": slowest["stage"],
+                    "samples": sum(stacks.values()),
+                    "stacks_file": config.stacks_file_path,
+                }
+
+            os.makedirs(os.path.dirname(config.report_file_path), exist_ok=True)
+            with open(config.report_file_path, "w") as report_file:
+                json.dump(report, report_file, indent=2, default=str)
+            logging.info(f"Profile report written to {config.report_file_path}")
+            return config.report_file_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+PROFILER = TrainingProfiler()
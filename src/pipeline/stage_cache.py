@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+from dataclasses import dataclass
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import compute_file_hash
+
+
+@dataclass
+class StageCacheConfig:
+    """
+    Configuration class for the training stage cache.
+    """
+    cache_dir: str = os.path.join("artifacts", "cache", "stages")
+
+
+def compute_path_hash(path):
+    """
+    Content hash of a file, or of every file below a directory (names included).
+    """
+    if os.path.isfile(path):
+        return compute_file_hash(path)
+
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(compute_file_hash(file_path).encode())
+    return digest.hexdigest()
+
+
+def config_to_dict(config):
+    """
+    Public, non-callable attributes of a config object (dataclass fields and
+    plain class attributes alike), used as part of a stage fingerprint.
+    """
+    return {
+        name: getattr(config, name)
+        for name in dir(config)
+        if not name.startswith('_') and not callable(getattr(config, name))
+    }
+
+
+class StageCache:
+    """
+    Content-addressed cache of training stage outputs.
+
+    A stage's key is the hash of its input files plus its configuration.
+    Finished outputs are copied to `<cache_dir>/<stage>/<key>/`; when a later
+    run computes the same key, the outputs are restored from there and the
+    stage is skipped.
+    """
+    def __init__(self, config=None):
+        self.cache_config = config or StageCacheConfig()
+
+    def fingerprint(self, stage, input_paths, config):
+        try:
+            digest = hashlib.sha256(stage.encode())
+            for path in input_paths:
+                digest.update(compute_path_hash(path).encode())
+            digest.update(json.dumps(config, sort_keys=True, default=repr).encode())
+            return digest.hexdigest()[:16]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _entry_dir(self, stage, key):
+        return os.path.join(self.cache_config.cache_dir, stage, key)
+
+    def restore(self, stage, key, output_paths):
+        """
+        Puts the cached outputs of (stage, key) back in place and returns the
+        stored metadata, or returns None when there is no such entry.
+        """
+        try:
+            entry_dir = self._entry_dir(stage, key)
+            manifest_path = os.path.join(entry_dir, "manifest.json")
+            if not os.path.exists(manifest_path):
+                return None
+
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+
+            for index, path in enumerate(output_paths):
+                cached = os.path.join(entry_dir, str(index))
+                expected = manifest["hashes"][index]
+                if expected is None:
+                    # The stage did not produce this (optional) output
+                    _remove(path)
+                elif not (os.path.exists(path) and compute_path_hash(path) == expected):
+                    _replace(cached, path)
+
+            logging.info(f"Stage '{stage}' unchanged (key {key}), restored cached outputs")
+            return manifest["metadata"]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def store(self, stage, key, output_paths, metadata=None):
+        """
+        Copies the outputs of a finished stage into the cache under `key`.
+        """
+        try:
+            entry_dir = self._entry_dir(stage, key)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.makedirs(entry_dir)
+
+            hashes = []
+            for index, path in enumerate(output_paths):
+                if not os.path.exists(path):
+                    hashes.append(None)
+                    continue
+                _replace(path, os.path.join(entry_dir, str(index)))
+                hashes.append(compute_path_hash(path))
+
+            with open(os.path.join(entry_dir, "manifest.json"), "w") as manifest_file:
+                json.dump({"stage": stage, "key": key, "outputs": list(output_paths),
+                           "hashes": hashes, "metadata": metadata or {}}, manifest_file, indent=2)
+            logging.info(f"Cached outputs of stage '{stage}' under key {key}")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _replace(source, destination):
+    """
+    Copies `source` to a temporary sibling of `destination` and renames it
+    into place, so a serving process reading the destination (model.pkl,
+    model_native/, ...) never sees it missing or half-copied. A directory is
+    swapped with two renames and the old copy deleted afterwards.
+    """
+    parent = os.path.dirname(destination) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = os.path.join(parent, f".tmp-{os.getpid()}-{os.path.basename(destination)}")
+    _remove(tmp_path)
+    try:
+        if os.path.isdir(source):
+            shutil.copytree(source, tmp_path)
+        else:
+            shutil.copy2(source, tmp_path)
+
+        if os.path.isdir(tmp_path) and os.path.exists(destination):
+            old_path = tmp_path + ".old"
+            _remove(old_path)
+            os.replace(destination, old_path)
+            os.replace(tmp_path, destination)
+            _remove(old_path)
+        else:
+            if os.path.isdir(destination):
+                shutil.rmtree(destination)
+            os.replace(tmp_path, destination)
+    except BaseException:
+        _remove(tmp_path)
+        raise
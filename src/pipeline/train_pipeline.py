@@ -1,51 +1,153 @@
 import os
 import sys
+import argparse
+
+import pandas as pd
 
 # This line is added to ensure that the script can find the 'src' directory
 # and import modules from it, like 'exception', 'logger', and the components.
 # It assumes you run the script from the root of your project directory.
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
+from src.components.compiled_preprocessor import CompiledPreprocessorConfig, verify_compiled_predictions
+from src.components.comps_index import CompsIndexConfig
 from src.components.data_ingestion import DataIngestion
 from src.components.data_transformation import DataTransformation
+from src.components.ensemble import EnsembleConfig
+from src.components.model_export import ModelExportConfig
 from src.components.model_trainer import ModelTrainer
 from src.exception import CustomException
 from src.logger import logging
+from src.metrics import METRICS
+from src.pipeline.model_registry import publish_artifact_manifest
+from src.pipeline.profiler import PROFILER
+from src.pipeline.stage_cache import StageCache, config_to_dict
+from src.utils import load_object
+
+STAGES = ("ingestion", "transformation", "trainer")
+
+
+class TrainPipeline:
+    """
+    Runs ingestion, transformation and model training. Each stage is keyed by
+    the hash of its inputs plus its configuration; a stage whose key has not
+    changed is restored from the stage cache instead of being re-run, unless
+    it is listed in `force`.
+    """
+    def __init__(self, force=()):
+        self.force = set(STAGES) if "all" in force else set(force)
+        self.stage_cache = StageCache()
+
+    def _cached(self, stage, key, outputs):
+        if stage in self.force:
+            logging.info(f"Stage '{stage}' forced to re-run")
+            return None
+        if PROFILER.enabled:
+            # A restored stage would leave nothing to profile
+            logging.info(f"Stage '{stage}' re-run for profiling")
+            return None
+        return self.stage_cache.restore(stage, key, outputs)
+
+    def run(self):
+        try:
+            logging.info("Starting the training pipeline.")
+
+            # Step 1: Data Ingestion
+            # This will read the raw data, split it into train/test sets, and save them as Parquet files.
+            data_ingestion = DataIngestion()
+            ingestion_config = data_ingestion.ingestion_config
+            input_paths = [ingestion_config.source_data_path]
+            if os.path.exists(ingestion_config.additional_data_path):
+                input_paths.append(ingestion_config.additional_data_path)
+            key = self.stage_cache.fingerprint("ingestion", input_paths, config_to_dict(ingestion_config))
+            outputs = [ingestion_config.train_data_path, ingestion_config.test_data_path,
+                       ingestion_config.raw_data_path, ingestion_config.raw_data_path + ".sha256"]
+            with METRICS.span("train_stage", stage="ingestion"), PROFILER.stage("ingestion"):
+                if self._cached("ingestion", key, outputs) is None:
+                    logging.info("Initiating Data Ingestion.")
+                    data_ingestion.initiate_data_ingestion()
+                    self.stage_cache.store("ingestion", key, outputs)
+            train_data_path, test_data_path = ingestion_config.train_data_path, ingestion_config.test_data_path
+            logging.info(f"Data Ingestion completed. Train data at: {train_data_path}, Test data at: {test_data_path}")
+
+            # Step 2: Data Transformation
+            # This will apply preprocessing (imputing, scaling, encoding) to the train and test data.
+            data_transformation = DataTransformation()
+            transformation_config = data_transformation.data_transformation_config
+            key = self.stage_cache.fingerprint(
+                "transformation", [train_data_path, test_data_path], config_to_dict(transformation_config)
+            )
+            outputs = [transformation_config.preprocessor_obj_file_path, transformation_config.transformed_data_dir,
+                       CompiledPreprocessorConfig.compiled_preprocessor_file_path, CompsIndexConfig.index_dir]
+            with METRICS.span("train_stage", stage="transformation"), PROFILER.stage("transformation"):
+                if self._cached("transformation", key, outputs) is None:
+                    logging.info("Initiating Data Transformation.")
+                    data_transformation.initiate_data_transformation(train_data_path, test_data_path)
+                    self.stage_cache.store("transformation", key, outputs)
+            logging.info("Data Transformation completed.")
+
+            # Step 3: Model Training
+            # This will train multiple models, select the best one based on R2 score, and save it.
+            model_trainer = ModelTrainer()
+            trainer_config = dict(config_to_dict(model_trainer.model_trainer_config),
+                                  params=model_trainer.get_model_params(),
+                                  models=sorted(model_trainer.get_model_names()))
+            # The preprocessor is an input too: the native export records its hash
+            key = self.stage_cache.fingerprint(
+                "trainer", [transformation_config.transformed_data_dir,
+                            transformation_config.preprocessor_obj_file_path], trainer_config
+            )
+            outputs = [model_trainer.model_trainer_config.trained_model_file_path,
+                       ModelExportConfig.native_model_dir, EnsembleConfig.report_file_path]
+            with METRICS.span("train_stage", stage="trainer"), PROFILER.stage("trainer"):
+                metadata = self._cached("trainer", key, outputs)
+                if metadata is None:
+                    logging.info("Initiating Model Training.")
+                    x_train, y_train, x_test, y_test = data_transformation.load_transformed_data()
+                    r2_square = model_trainer.initiate_model_trainer(x_train, y_train, x_test, y_test)
+                    self.stage_cache.store("trainer", key, outputs, metadata={"r2": r2_square})
+                else:
+                    r2_square = metadata["r2"]
+            logging.info("Model Training completed.")
+
+            # The compiled preprocessor is only served if the model scores its output
+            # exactly like the sklearn output it was trained on
+            verify_compiled_predictions(
+                load_object(model_trainer.model_trainer_config.trained_model_file_path),
+                load_object(transformation_config.preprocessor_obj_file_path),
+                pd.read_parquet(test_data_path),
+            )
+            # Last: serving processes switch to the new artifacts only once all of them are in place
+            publish_artifact_manifest()
+            logging.info(f"Training stage timings: {METRICS.summary()}")
+
+            return r2_square
+
+        except Exception as e:
+            logging.error(f"An error occurred in the training pipeline: {e}")
+            raise CustomException(e, sys)
+
+        finally:
+            # Also written when a stage fails, e.g. when the box ran out of memory in it
+            PROFILER.initiate_profile_report()
 
 
 if __name__ == "__main__":
     """
     This is the main execution block that runs the entire training pipeline.
     """
-    try:
-        logging.info("Starting the training pipeline.")
-
-        # Step 1: Data Ingestion
-        # This will read the raw data, split it into train/test sets, and save them as CSV files.
-        logging.info("Initiating Data Ingestion.")
-        data_ingestion = DataIngestion()
-        train_data_path, test_data_path = data_ingestion.initiate_data_ingestion()
-        logging.info(f"Data Ingestion completed. Train data at: {train_data_path}, Test data at: {test_data_path}")
-
-        # Step 2: Data Transformation
-        # This will apply preprocessing (imputing, scaling, encoding) to the train and test data.
-        logging.info("Initiating Data Transformation.")
-        data_transformation = DataTransformation()
-        train_arr, test_arr, _ = data_transformation.initiate_data_transformation(
-            train_data_path, test_data_path
-        )
-        logging.info("Data Transformation completed.")
-
-        # Step 3: Model Training
-        # This will train multiple models, select the best one based on R2 score, and save it.
-        logging.info("Initiating Model Training.")
-        model_trainer = ModelTrainer()
-        r2_square = model_trainer.initiate_model_trainer(train_arr, test_arr)
-        logging.info("Model Training completed.")
-
-        print(f"Pipeline finished successfully. The R2 score of the best model is: {r2_square}")
-
-    except Exception as e:
-        logging.error(f"An error occurred in the training pipeline: {e}")
-        raise CustomException(e, sys)
+    parser = argparse.ArgumentParser(description="Run the training pipeline, skipping unchanged stages.")
+    parser.add_argument(
+        "--force", nargs="+", default=[], choices=STAGES + ("all",),
+        help="Re-run these stages even if their inputs and config are unchanged.",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Record wall/CPU time and peak RSS per stage and model candidate to artifacts/profile_report.json.",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        PROFILER.enabled = True
 
+    r2_square = TrainPipeline(force=args.force).run()
+    print(f"Pipeline finished successfully. The R2 score of the best model is: {r2_square}")
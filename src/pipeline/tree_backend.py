@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+
+NATIVE_META_FILE = "meta.json"
+
+# Rows traversed together; bounds the (rows x trees) node-index matrix
+TRAVERSAL_CHUNK_ROWS = 4096
+
+
+class NativeModel:
+    """
+    Thin inference backend for models exported by
+    src.components.model_export. It needs only NumPy: no sklearn, xgboost or
+    catboost import and no unpickling of a Python object graph.
+
+    Tree ensembles are evaluated by walking all trees for a block of rows at
+    once: each step gathers the split feature and threshold of every current
+    node and moves every (row, tree) pair to a child, for max_depth steps.
+    """
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.base_score = float(meta["base_score"])
+        self.n_features_in_ = int(meta["n_features"])
+        self.source_model = meta["source_model"]
+        self.source_hash = meta.get("source_hash")
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    @classmethod
+    def load(cls, export_dir, mmap_mode=None):
+        try:
+            with open(os.path.join(export_dir, NATIVE_META_FILE)) as meta_file:
+                meta = json.load(meta_file)
+            arrays = {
+                name: np.load(os.path.join(export_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+                for name in meta["arrays"]
+            }
+            return cls(meta, arrays)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _walk(self, x):
+        """
+        Yields (node, child) for each level of the trees: the (n_rows,
+        n_trees) current nodes and the children they move to (a leaf stays
+        where it is). `x` must be a dense float array.
+        """
+        # Tree libraries compare features as float32
+        x = np.asarray(x, dtype=np.float32)
+        n_rows = x.shape[0]
+        rows = np.arange(n_rows)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.roots.shape[0])).copy()
+        strict = self.meta["strict_less"]
+
+        for _ in range(self.meta["max_depth"]):
+            left = self.left[node]
+            is_leaf = left < 0
+            if is_leaf.all():
+                break
+            values = x[rows, self.feature[node]]
+            threshold = self.threshold[node]
+            go_left = values < threshold if strict else values <= threshold
+            go_left = np.where(np.isnan(values), self.default_left[node], go_left)
+            child = np.where(is_leaf, node, np.where(go_left, left, self.right[node]))
+            yield node, child
+            node = child
+
+    def leaf_indices(self, x):
+        """
+        Returns the leaf reached in every tree, shape (n_rows, n_trees).
+        `x` must be a dense float array.
+        """
+        node = np.broadcast_to(self.roots, (x.shape[0], self.roots.shape[0])).copy()
+        for _, node in self._walk(x):
+            pass
+        return node
+
+    def _dense_block(self, block):
+        """
+        Densifies one block of rows. XGBoost boosters trained on a CSR
+        matrix (meta["sparse_missing"]) saw its implicit entries as missing
+        values, so for them those entries, and the zeros of dense rows,
+        become NaN and follow the default branch.
+        """
+        if self.meta.get("sparse_missing"):
+            if hasattr(block, "tocoo"):
+                coo = block.tocoo()
+                dense = np.full(block.shape, np.nan)
+                dense[coo.row, coo.col] = coo.data
+                return dense
+            dense = np.array(block, dtype=np.float64)
+            dense[dense == 0] = np.nan
+            return dense
+        if hasattr(block, "toarray"):
+            block = block.toarray()
+        return np.asarray(block, dtype=np.float64)
+
+    @property
+    def supports_contributions(self):
+        return "expected_value" in self.meta
+
+    def _contributions_dense(self, x):
+        if self.kind == "linear":
+            background = getattr(self, "background_mean", np.zeros_like(self.coef))
+            return (x - background) * self.coef
+
+        # Saabas path attribution: every split credits its feature with the
+        # change in the node value (the cover-weighted mean of the leaves
+        # below) from parent to child, scaled by the tree's weight
+        n_rows, n_features = x.shape
+        out = np.zeros(n_rows * n_features, dtype=np.float64)
+        flat_row = (np.arange(n_rows) * n_features)[:, None]
+        for node, child in self._walk(x):
+            moved = child != node
+            delta = (self.value[child] - self.value[node]) * self.tree_weight
+            out += np.bincount((flat_row + self.feature[node])[moved], weights=delta[moved],
+                               minlength=out.shape[0])
+        return out.reshape(n_rows, n_features)
+
+    def contributions(self, x):
+        """
+        Per-feature contributions to the raw (log-price) prediction, shape
+        (n_rows, n_features). For every row, meta["expected_value"] plus the
+        sum of its contributions equals predict(). Only additive models
+        (summed trees, linear) support this.
+        """
+        try:
+            if not self.supports_contributions:
+                raise ValueError(f"{self.source_model} does not support additive explanations")
+            out = np.empty((x.shape[0], self.n_features_in_), dtype=np.float64)
+            for start in range(0, x.shape[0], TRAVERSAL_CHUNK_ROWS):
+                block = self._dense_block(x[start:start + TRAVERSAL_CHUNK_ROWS])
+                out[start:start + block.shape[0]] = self._contributions_dense(block)
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _predict_dense(self, x):
+        if self.kind == "linear":
+            return x @ self.coef + self.base_score
+
+        leaf_values = self.value[self.leaf_indices(x)]
+        if self.meta["aggregation"] == "sum":
+            return self.base_score + leaf_values @ self.tree_weight
+
+        # AdaBoostRegressor: weighted median of the tree predictions
+        order = np.argsort(leaf_values, axis=1)
+        weight_cdf = np.cumsum(self.tree_weight[order], axis=1)
+        median_or_above = weight_cdf >= 0.5 * weight_cdf[:, -1][:, None]
+        median = order[np.arange(x.shape[0]), median_or_above.argmax(axis=1)]
+        return leaf_values[np.arange(x.shape[0]), median]
+
+    def predict(self, x):
+        try:
+            out = np.empty(x.shape[0], dtype=np.float64)
+            for start in range(0, x.shape[0], TRAVERSAL_CHUNK_ROWS):
+                block = self._dense_block(x[start:start + TRAVERSAL_CHUNK_ROWS])
+                out[start:start + block.shape[0]] = self._predict_dense(block)
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,242 @@
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.components.comps_index import build_comps_index
+from src.components.data_ingestion import DataIngestionConfig
+from src.components.data_transformation import DataTransformation
+from src.components.model_export import export_native_model
+from src.components.model_trainer import ModelTrainerConfig
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA, TARGET_COLUMN
+from src.logger import logging
+from src.pipeline.model_registry import publish_artifact_manifest
+from src.utils import as_model_input, load_object, save_object
+
+# Models that can keep boosting from their current state
+WARM_START_MODELS = ("XGBRegressor", "CatBoostRegressor", "GradientBoostingRegressor")
+
+
+@dataclass
+class IncrementalUpdateConfig:
+    """
+    Configuration class for the incremental model update.
+    """
+    # Boosting rounds added to the current model
+    extra_rounds: int = 50
+    # Share of the new sales held out, together with the existing test set, to compare the models
+    holdout_fraction: float = 0.2
+    random_state: int = 42
+    # Largest holdout R2 drop that still promotes the updated model
+    tolerance: float = 0.0
+    report_file_path: str = os.path.join("artifacts", "incremental_update_report.json")
+
+
+def continue_boosting(model, x, y, extra_rounds):
+    """
+    Returns a copy of the fitted boosting model with `extra_rounds` more
+    trees fitted on (x, y), starting from the model's current predictions.
+    The model itself is left untouched.
+    """
+    name = type(model).__name__
+    if name == "XGBRegressor":
+        from sklearn.base import clone
+
+        booster = model.get_booster()
+        best_iteration = getattr(model, "best_iteration", None)
+        if best_iteration is not None:
+            # Early stopping: continue from the trees predict() actually uses. The slice may keep
+            # best_iteration/best_score, which would make predict() ignore the new rounds
+            booster = booster[: best_iteration + 1]
+            booster.set_attr(best_iteration=None, best_score=None)
+        n_kept = booster.num_boosted_rounds()
+        updated = clone(model).set_params(n_estimators=extra_rounds, early_stopping_rounds=None)
+        updated.fit(x, y, xgb_model=booster, verbose=False)
+
+        n_rounds = updated.get_booster().num_boosted_rounds()
+        if n_rounds != n_kept + extra_rounds:
+            raise ValueError(f"Expected {n_kept} + {extra_rounds} boosting rounds after the update, got {n_rounds}")
+        sample = x[:100]
+        if np.array_equal(updated.predict(sample), model.predict(sample)):
+            raise ValueError("The extra boosting rounds left every prediction unchanged")
+        return updated
+    if name == "CatBoostRegressor":
+        from sklearn.base import clone
+
+        updated = clone(model).set_params(iterations=extra_rounds)
+        return updated.fit(x, y, init_model=model)
+    if name == "GradientBoostingRegressor":
+        updated = copy.deepcopy(model)
+        updated.set_params(warm_start=True, n_estimators=model.n_estimators_ + extra_rounds)
+        updated.fit(x, y)
+        return updated.set_params(warm_start=False)
+    raise ValueError(f"{name} cannot be updated incrementally, expected one of {WARM_START_MODELS}; "
+                     "run the full training pipeline instead")
+
+
+def _stack(a, b):
+    import scipy.sparse
+
+    if scipy.sparse.issparse(a) or scipy.sparse.issparse(b):
+        return scipy.sparse.vstack([a, b], format="csr")
+    return np.concatenate([a, b])
+
+
+def _append_parquet(path, df):
+    import pandas as pd
+
+    if os.path.exists(path):
+        df = pd.concat([pd.read_parquet(path), df], ignore_index=True)
+    # Concatenating categoricals with different categories yields object columns
+    dtypes = {c: t for c, t in FEATURE_SCHEMA.pandas_dtypes().items() if c in df.columns}
+    df.astype(dtypes).to_parquet(path, index=False)
+
+
+class IncrementalUpdater:
+    """
+    Refreshes the served model with newly closed sales in seconds instead of
+    a full grid search. The fitted preprocessor stays frozen: the trees
+    split on its scaled columns, so refitting its statistics would change
+    the meaning of every existing split. The current best model keeps
+    boosting on the old plus new training rows and is promoted only if
+    its R2 on the holdout (the test set plus a share of the new sales)
+    does not drop.
+    """
+    def __init__(self, config=None):
+        self.update_config = config or IncrementalUpdateConfig()
+        self.ingestion_config = DataIngestionConfig()
+        self.model_trainer_config = ModelTrainerConfig()
+        self.data_transformation = DataTransformation()
+
+    def _read_sales(self, path):
+        import pandas as pd
+
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, dtype=FEATURE_SCHEMA.pandas_dtypes())
+        df = df[df[TARGET_COLUMN].notna()].reset_index(drop=True)
+        if df.empty:
+            raise ValueError(f"No priced sales in {path}")
+        return df
+
+    def _transform(self, preprocessor, df):
+        import scipy.sparse
+
+        dtype = self.data_transformation.data_transformation_config.feature_dtype
+        x = preprocessor.transform(df.reindex(columns=FEATURE_SCHEMA.columns)).astype(dtype, copy=False)
+        if scipy.sparse.issparse(x):
+            x = x.tocsr()
+        return x, np.log(df[TARGET_COLUMN].to_numpy()).astype(dtype)
+
+    def initiate_incremental_update(self, new_data_path):
+        """
+        Adds the sales in `new_data_path` (CSV or Parquet with SalePrice) and
+        returns the update report; report["promoted"] tells whether the
+        updated model replaced artifacts/model.pkl.
+        """
+        import pandas as pd
+        import scipy.sparse
+        from sklearn.metrics import r2_score
+        from sklearn.model_selection import train_test_split
+
+        try:
+            start = time.perf_counter()
+            config = self.update_config
+            model_path = self.model_trainer_config.trained_model_file_path
+            transformation_config = self.data_transformation.data_transformation_config
+
+            new_df = self._read_sales(new_data_path)
+            if len(new_df) * config.holdout_fraction >= 1:
+                new_train_df, new_test_df = train_test_split(
+                    new_df, test_size=config.holdout_fraction, random_state=config.random_state)
+            else:
+                new_train_df, new_test_df = new_df, new_df.iloc[:0]
+            logging.info(f"Incremental update with {len(new_train_df)} training and "
+                         f"{len(new_test_df)} holdout sales from {new_data_path}")
+
+            preprocessor = load_object(transformation_config.preprocessor_obj_file_path)
+            model = load_object(model_path)
+            x_new_train, y_new_train = self._transform(preprocessor, new_train_df)
+
+            x_train, y_train, x_test, y_test = self.data_transformation.load_transformed_data()
+            x_train, y_train = _stack(x_train, x_new_train), np.concatenate([y_train, y_new_train])
+            # Too few new sales to hold any out: compare the models on the existing test set alone
+            if not new_test_df.empty:
+                x_new_test, y_new_test = self._transform(preprocessor, new_test_df)
+                x_test, y_test = _stack(x_test, x_new_test), np.concatenate([y_test, y_new_test])
+
+            current_r2 = float(r2_score(y_test, model.predict(as_model_input(model, x_test))))
+            fit_start = time.perf_counter()
+            updated = continue_boosting(model, as_model_input(model, x_train), y_train, config.extra_rounds)
+            fit_seconds = time.perf_counter() - fit_start
+            updated_r2 = float(r2_score(y_test, updated.predict(as_model_input(updated, x_test))))
+            promoted = updated_r2 >= current_r2 - config.tolerance
+
+            if promoted:
+                # The next incremental update builds on these; the next full run re-splits everything
+                self.data_transformation.save_transformed_data(x_train, y_train, x_test, y_test)
+                _append_parquet(self.ingestion_config.train_data_path, new_train_df)
+                if not new_test_df.empty:
+                    _append_parquet(self.ingestion_config.test_data_path, new_test_df)
+                _append_parquet(self.ingestion_config.additional_data_path, new_df)
+                # The new sales become comps too; train.parquet rows line up with x_train
+                build_comps_index(x_train, pd.read_parquet(self.ingestion_config.train_data_path),
+                                  transformation_config.preprocessor_obj_file_path)
+                save_object(file_path=model_path, obj=updated)
+                export_native_model(updated, model_path,
+                                    background_mean=np.asarray(x_train.mean(axis=0)).ravel(),
+                                    validation_x=x_test[:self.model_trainer_config.export_validation_rows],
+                                    sparse_input=scipy.sparse.issparse(as_model_input(updated, x_test[:1])))
+                publish_artifact_manifest()
+
+            report = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "new_data_path": new_data_path,
+                "model": type(model).__name__,
+                "extra_rounds": config.extra_rounds,
+                "new_train_rows": len(new_train_df),
+                "new_holdout_rows": len(new_test_df),
+                "holdout_rows": int(y_test.shape[0]),
+                "current_r2": current_r2,
+                "updated_r2": updated_r2,
+                "promoted": bool(promoted),
+                "fit_seconds": fit_seconds,
+                "total_seconds": time.perf_counter() - start,
+            }
+            os.makedirs(os.path.dirname(config.report_file_path), exist_ok=True)
+            with open(config.report_file_path, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+            logging.info(f"Holdout R2 {current_r2:.4f} -> {updated_r2:.4f}, "
+                         f"{'promoted' if promoted else 'kept the current model'}")
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continue boosting the current model on newly closed sales.")
+    parser.add_argument("new_data", help="CSV or Parquet file of new sales, including SalePrice.")
+    parser.add_argument("--extra-rounds", type=int, default=IncrementalUpdateConfig.extra_rounds)
+    parser.add_argument("--tolerance", type=float, default=IncrementalUpdateConfig.tolerance,
+                        help="Largest holdout R2 drop that still promotes the updated model.")
+    args = parser.parse_args()
+
+    updater = IncrementalUpdater(IncrementalUpdateConfig(extra_rounds=args.extra_rounds, tolerance=args.tolerance))
+    report = updater.initiate_incremental_update(args.new_data)
+    print(f"Holdout R2 {report['current_r2']:.4f} -> {report['updated_r2']:.4f} in "
+          f"{report['total_seconds']:.1f}s: {'promoted' if report['promoted'] else 'not promoted'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.logger import logging
+from src.metrics import METRICS
+from src.pipeline.model_registry import DEFAULT_MODEL_NAME, get_registry
+from src.pipeline.predict_pipeline import PredictPipeline
+
+# Seconds spent in each startup phase of this process, in the order they ran
+_phases = {}
+_phases_lock = threading.Lock()
+
+
+def record_startup_phase(name, seconds):
+    with _phases_lock:
+        _phases[name] = seconds
+    METRICS.observe("ames_startup_phase_seconds", seconds, (("phase", name),))
+
+
+@contextmanager
+def startup_phase(name):
+    """
+    Times a block as one startup phase: `with startup_phase("artifact_load"): ...`
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_startup_phase(name, time.perf_counter() - start)
+
+
+def startup_report():
+    """
+    Returns {"pid", "phases": {phase: seconds}, "total_seconds"} for this process.
+    """
+    with _phases_lock:
+        phases = dict(_phases)
+    return {"pid": os.getpid(), "phases": phases, "total_seconds": sum(phases.values())}
+
+
+def prewarm(model_name=DEFAULT_MODEL_NAME):
+    """
+    Loads the artifacts of `model_name` and scores one all-missing row, so
+    the first real request of this worker pays neither the unpickling nor
+    the first-call costs of the model and preprocessor. The dummy row
+    bypasses the prediction cache.
+    """
+    try:
+        with startup_phase("artifact_load"):
+            bundle = get_registry().get(model_name)
+        with startup_phase("first_prediction"):
+            PredictPipeline._predict_frame(bundle, FEATURE_SCHEMA.empty(1))
+
+        report = startup_report()
+        logging.info(f"Worker prewarmed with model version {bundle.version}: {report}")
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
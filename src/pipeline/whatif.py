@@ -0,0 +1,202 @@
+import os
+import sys
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+# Adjusting the path to import from the src directory
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.exception import CustomException
+from src.feature_schema import FEATURE_SCHEMA
+from src.metrics import METRICS
+from src.pipeline.model_registry import DEFAULT_MODEL_NAME, get_registry
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.utils import as_model_input
+
+SWEEP_MODES = ("grid", "one_at_a_time")
+
+
+@dataclass
+class WhatIfConfig:
+    """
+    Configuration class for what-if sweeps.
+    """
+    # Largest number of variants one sweep may score
+    max_variants: int = int(os.environ.get("WHATIF_MAX_VARIANTS", "100000"))
+    # Variants assembled and predicted at a time; bounds the dense matrix in memory
+    chunk_rows: int = 8192
+    # Random variants re-transformed in full to confirm the per-column shortcut
+    verification_rows: int = 8
+    tolerance: float = 1e-9
+
+
+class WhatIfError(ValueError):
+    """
+    Raised for an invalid sweep request; `details` lists the offending fields.
+    """
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or []
+
+
+def _dense(x):
+    return x.toarray() if hasattr(x, "toarray") else np.asarray(x, dtype=np.float64)
+
+
+def expand_axis(column, spec, max_values):
+    """
+    Turns one grid entry into its list of values: either an explicit list
+    (e.g. ["Gd", "Ex"]) or, for numerical features, a range
+    {"start", "stop", "step"} (stop included) or {"start", "stop", "num"}.
+    """
+    try:
+        if isinstance(spec, dict):
+            if not FEATURE_SCHEMA.is_numerical(column):
+                raise TypeError("ranges are only allowed for numerical features")
+            start = FEATURE_SCHEMA.check_value(column, spec.get("start"))
+            stop = FEATURE_SCHEMA.check_value(column, spec.get("stop"))
+            if np.isnan(start) or np.isnan(stop) or stop < start:
+                raise TypeError("a range needs numeric start <= stop")
+            if "num" in spec:
+                num = int(spec["num"])
+                if not 1 <= num <= max_values:
+                    raise TypeError(f"num must be between 1 and {max_values}")
+                values = np.linspace(start, stop, num)
+            else:
+                step = FEATURE_SCHEMA.check_value(column, spec.get("step", 1))
+                if not step > 0 or (stop - start) / step >= max_values:
+                    raise TypeError(f"step must be positive and give at most {max_values} values")
+                values = np.arange(start, stop + step / 2, step)
+            return values.tolist()
+
+        if isinstance(spec, list) and spec:
+            return [FEATURE_SCHEMA.check_value(column, value) for value in spec]
+        raise TypeError("expected a non-empty list of values or a range object")
+
+    except (TypeError, ValueError) as e:
+        raise WhatIfError("Invalid grid", [{"field": column, "error": str(e)}])
+
+
+class WhatIfSweep:
+    """
+    Scores a base property under many feature changes in one vectorized pass.
+
+    Every preprocessor step acts on a single input column (imputer, scaler,
+    one-hot encoder), so a variant's model input is the base row's
+    transformed vector plus, for each changed feature, the difference that
+    change alone makes. The preprocessor therefore runs only on the base row
+    and on one row per grid value; variant matrices are assembled with
+    NumPy and predicted chunk by chunk. A few variants are re-transformed
+    in full to check the shortcut, falling back to full transforms if a
+    future preprocessor is not column-separable.
+    """
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, config=None):
+        self.model_name = model_name
+        self.whatif_config = config or WhatIfConfig()
+
+    def parse(self, base, grid):
+        """
+        Validates the request; returns the base record and [(column, values)].
+        """
+        if not isinstance(base, dict):
+            raise WhatIfError("Expected a base object of features")
+        rows, errors = FEATURE_SCHEMA.validate_records([base])
+        if errors:
+            raise WhatIfError("Invalid base features", errors)
+        if not isinstance(grid, dict) or not grid:
+            raise WhatIfError("Expected a non-empty grid object of feature changes")
+
+        axes = []
+        for column, spec in grid.items():
+            if FEATURE_SCHEMA.resolve(column) != column:
+                raise WhatIfError("Invalid grid", [{"field": column, "error": "unknown feature"}])
+            axes.append((column, expand_axis(column, spec, self.whatif_config.max_variants)))
+        return rows, axes
+
+    @staticmethod
+    def _predict(bundle, x):
+        with METRICS.span("model_predict"):
+            return np.exp(bundle.model.predict(as_model_input(bundle.model, x)))
+
+    @staticmethod
+    def _variant_rows(base_row, axes, indices):
+        # indices: (n_axes, n_rows) positions into each axis' values
+        rows = np.repeat(base_row, indices.shape[1])
+        for (column, values), index in zip(axes, indices):
+            rows[column] = np.asarray(values, dtype=rows.dtype[column])[index]
+        return rows
+
+    def _is_separable(self, bundle, base_x, deltas, base_row, axes, shape):
+        n_variants = math.prod(shape)
+        rng = np.random.default_rng(0)
+        sample = rng.choice(n_variants, size=min(self.whatif_config.verification_rows, n_variants), replace=False)
+        indices = np.vstack(np.unravel_index(sample, shape))
+        expected = _dense(PredictPipeline._transform(bundle, self._variant_rows(base_row, axes, indices)))
+        assembled = base_x + sum(delta[index] for delta, index in zip(deltas, indices))
+        return np.max(np.abs(assembled - expected), initial=0.0) <= self.whatif_config.tolerance
+
+    def initiate_sweep(self, base, grid, mode="grid"):
+        """
+        `mode="grid"` scores every combination of the grid values and returns
+        the price surface as a nested list (one dimension per feature, in
+        grid order). `mode="one_at_a_time"` varies each feature alone and
+        returns one price curve per feature.
+        """
+        if mode not in SWEEP_MODES:
+            raise WhatIfError(f"Unknown mode '{mode}', expected one of {SWEEP_MODES}")
+        base_row, axes = self.parse(base, grid)
+        sizes = [len(values) for _, values in axes]
+        n_variants = math.prod(sizes) if mode == "grid" else sum(sizes)
+        if n_variants > self.whatif_config.max_variants:
+            raise WhatIfError(f"{n_variants} variants requested, the limit is {self.whatif_config.max_variants}")
+
+        try:
+            bundle = get_registry().get(self.model_name)
+            base_x = _dense(PredictPipeline._transform(bundle, base_row))
+            # One transformed row per grid value, as a difference from the base row
+            deltas = []
+            for column, values in axes:
+                rows = np.repeat(base_row, len(values))
+                rows[column] = np.asarray(values, dtype=rows.dtype[column])
+                deltas.append(_dense(PredictPipeline._transform(bundle, rows)) - base_x)
+
+            result = {
+                "model_version": bundle.version,
+                "base_price": float(self._predict(bundle, base_x)[0]),
+                "n_variants": n_variants,
+            }
+
+            if mode == "one_at_a_time":
+                prices = self._predict(bundle, base_x + np.vstack(deltas))
+                curves, start = {}, 0
+                for (column, values), size in zip(axes, sizes):
+                    curves[column] = {"values": values, "prices": prices[start:start + size].tolist()}
+                    start += size
+                result["sensitivity"] = curves
+                return result
+
+            shape = tuple(sizes)
+            separable = self._is_separable(bundle, base_x, deltas, base_row, axes, shape)
+            prices = np.empty(n_variants, dtype=np.float64)
+            for start in range(0, n_variants, self.whatif_config.chunk_rows):
+                flat = np.arange(start, min(start + self.whatif_config.chunk_rows, n_variants))
+                indices = np.vstack(np.unravel_index(flat, shape))
+                if separable:
+                    x = np.repeat(base_x, flat.shape[0], axis=0)
+                    for delta, index in zip(deltas, indices):
+                        x += delta[index]
+                else:
+                    x = PredictPipeline._transform(bundle, self._variant_rows(base_row, axes, indices))
+                prices[flat] = self._predict(bundle, x)
+
+            result.update({
+                "features": [column for column, _ in axes],
+                "values": [values for _, values in axes],
+                "prices": prices.reshape(shape).tolist(),
+            })
+            return result
+
+        except Exception as e:
+            raise CustomException(e, sys)
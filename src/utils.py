@@ -1,51 +1,373 @@
 import os
 import sys
 import numpy as np 
-import pandas as pd
-import dill
 import pickle
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
+import hashlib
+import time
+from contextlib import nullcontext
+
+# scipy, joblib and sklearn are imported inside the training helpers below, so
+# that serving code importing load_object/as_model_input stays light
 
 from src.exception import CustomException
+from src.logger import logging
 
 def save_object(file_path, obj):
+    """
+    Pickles `obj` to a temporary file next to `file_path` and renames it into
+    place, so a serving process never unpickles a half-written artifact.
+    """
+    import tempfile
+
     try:
         dir_path = os.path.dirname(file_path)
 
         os.makedirs(dir_path, exist_ok=True)
 
-        with open(file_path, "wb") as file_obj:
-            pickle.dump(obj, file_obj)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=".tmp-", suffix=os.path.basename(file_path))
+        try:
+            with os.fdopen(fd, "wb") as file_obj:
+                pickle.dump(obj, file_obj)
+                file_obj.flush()
+                os.fsync(file_obj.fileno())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
 
     except Exception as e:
         raise CustomException(e, sys)
     
-def evaluate_models(x_train, y_train,x_test,y_test,models,param):
+def compute_data_hash(*arrays):
+    """
+    Returns a SHA-256 digest identifying the content of dense or sparse arrays.
+    """
+    import scipy.sparse
+
+    digest = hashlib.sha256()
+    for arr in arrays:
+        if scipy.sparse.issparse(arr):
+            arr = arr.tocsr()
+            parts = (arr.data, arr.indices, arr.indptr)
+        else:
+            parts = (np.asarray(arr),)
+        digest.update(str(arr.shape).encode())
+        for part in parts:
+            digest.update(str(part.dtype).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+    return digest.hexdigest()
+
+
+def _model_signature(model):
+    """
+    Identifies an estimator by its class and constructor parameters.
+    """
+    return type(model).__name__, repr(sorted(model.get_params().items()))
+
+
+# Estimators trained and served on dense arrays; everything else trains on CSR directly.
+# XGBoost treats the implicit zeros of a CSR matrix as missing values but dense
+# zeros as real values, so it is kept dense: every serving path (compiled
+# preprocessor, native backend, what-if, explanations) produces dense rows.
+DENSE_ONLY_MODELS = ("HistGradientBoostingRegressor", "XGBRegressor")
+
+# Estimators whose own early stopping is used when a validation split is requested
+EARLY_STOPPING_MODELS = ("XGBRegressor", "CatBoostRegressor")
+
+
+def as_model_input(estimator, x):
+    """
+    Densifies a sparse feature matrix for the estimators that must see the
+    same dense representation in training and serving.
+    """
+    if type(estimator).__name__ in DENSE_ONLY_MODELS:
+        import scipy.sparse
+
+        if scipy.sparse.issparse(x):
+            return x.toarray()
+    return x
+
+
+def _fit_estimator(estimator, x, y, early_stopping_rounds=None, validation_fraction=0.1):
+    """
+    Fits an estimator. XGBoost and CatBoost hold out the last
+    `validation_fraction` of the rows and stop adding trees once the
+    validation score has not improved for `early_stopping_rounds` rounds.
+    """
+    x = as_model_input(estimator, x)
+    name = type(estimator).__name__
+    if not early_stopping_rounds or name not in EARLY_STOPPING_MODELS:
+        return estimator.fit(x, y)
+
+    n_valid = max(1, int(y.shape[0] * validation_fraction))
+    x_fit, y_fit = x[:-n_valid], y[:-n_valid]
+    x_valid, y_valid = x[-n_valid:], y[-n_valid:]
+
+    if name == "XGBRegressor":
+        estimator.set_params(early_stopping_rounds=early_stopping_rounds)
+        return estimator.fit(x_fit, y_fit, eval_set=[(x_valid, y_valid)], verbose=False)
+    return estimator.fit(
+        x_fit, y_fit, eval_set=(x_valid, y_valid), early_stopping_rounds=early_stopping_rounds
+    )
+
+
+def _usage(profile):
+    if not profile:
+        return nullcontext()
+    from src.pipeline.profiler import measure_usage
+
+    return measure_usage()
+
+
+def _fit_and_score_fold(data_hash, model_signature, params, cv, fold, n_resource, row_seed, fit_options,
+                        model, x, y, train_idx, test_idx, profile=False):
+    """
+    Fits one parameter combination on one CV fold and returns (R2, seconds,
+    usage), where usage holds the worker's CPU time and peak RSS when
+    `profile` is set (None otherwise). Cached on disk by (data_hash,
+    model_signature, params, cv, fold, n_resource, row_seed, fit_options);
+    `row_seed` is the seed that picked the rows of a subsample (None on all
+    rows). The data, indices and `profile` are not part of the key.
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import r2_score
+
+    start = time.perf_counter()
+    with _usage(profile) as usage:
+        estimator = clone(model).set_params(**params)
+        _fit_estimator(estimator, x[train_idx], y[train_idx], **fit_options)
+        score = r2_score(y[test_idx], estimator.predict(as_model_input(estimator, x[test_idx])))
+    return score, time.perf_counter() - start, usage
+
+
+def _refit_and_score(model, params, fit_options, x_train, y_train, x_test, y_test, profile=False):
+    """
+    Refits the winning combination on the full training set and scores it on the test set.
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import r2_score
+
+    start = time.perf_counter()
+    with _usage(profile) as usage:
+        estimator = clone(model).set_params(**params)
+        _fit_estimator(estimator, x_train, y_train, **fit_options)
+    fit_seconds = time.perf_counter() - start
+    score = r2_score(y_test, estimator.predict(as_model_input(estimator, x_test)))
+    return estimator, score, fit_seconds, usage
+
+
+def _add_usage(usage_by_params, params, n_resource, usage):
+    """
+    Sums one fold fit into the usage entry of its parameter combination and
+    row count; `usage` is None for a fit restored from the cache.
+    """
+    key = (repr(sorted(params.items())), n_resource)
+    entry = usage_by_params.setdefault(key, {
+        "params": params, "n_rows": n_resource, "fold_fits": 0, "cached_fold_fits": 0,
+        "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_bytes": 0,
+    })
+    entry["fold_fits"] += 1
+    if usage is None:
+        entry["cached_fold_fits"] += 1
+        return
+    entry["wall_seconds"] += usage["wall_seconds"]
+    entry["cpu_seconds"] += usage["cpu_seconds"]
+    entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], usage["peak_rss_bytes"])
+
+
+def _halving_schedule(n_candidates, n_samples, factor, min_rows):
+    """
+    Rows used in each successive-halving round of a model with
+    `n_candidates` grid points: one round per division of the candidates
+    by `factor`, growing by `factor` from at least `min_rows`, the last
+    round always on all `n_samples` rows.
+    """
+    n_rounds = 1 + int(np.floor(np.log(n_candidates) / np.log(factor)))
+    min_resource = max(n_samples // factor ** (n_rounds - 1), min_rows)
+    return [min(n_samples, min_resource * factor ** r) for r in range(n_rounds - 1)] + [n_samples]
+
+
+def evaluate_models(x_train, y_train,x_test,y_test,models,param,cv=3,n_jobs=-1,cache_dir=None,
+                    search="exhaustive",time_budget=None,halving_factor=3,
+                    early_stopping_rounds=None,validation_fraction=0.1,random_state=42,profile=False):
+    """
+    Searches the parameter grid of every model with `cv`-fold cross
+    validation and returns a report {model name: {"r2", "fit_seconds",
+    "search_seconds", "best_params"}}, where r2 is the test-set score.
+    Each model in `models` is replaced by its refitted best estimator.
+
+    `search` selects the strategy:
+      - "exhaustive": every grid point on all training rows.
+      - "halving": successive halving; all grid points start on a small
+        sample of the rows and only the best 1/`halving_factor` of each
+        round move on to `halving_factor` times more rows. The schedule is
+        per model, so every model's final round uses all training rows.
+      - "random": grid points in random order until `time_budget` seconds
+        have been spent (every model gets at least one candidate).
+
+    All fold fits of a round run in one process pool of `n_jobs` workers.
+    When `cache_dir` is set, fold scores are cached on disk keyed by the
+    training data hash and the parameters, so a re-run only fits the
+    combinations that changed.
+
+    With `profile`, every report entry also lists its "candidates": the
+    summed wall and CPU time and the peak RSS of the fold fits of each
+    parameter combination (null for fits restored from the cache), plus
+    the same for the refit.
+    """
+    from joblib import Memory, Parallel, delayed, effective_n_jobs
+    from sklearn.model_selection import KFold, ParameterGrid
+
     try:
-        report = {}
+        memory = Memory(cache_dir, verbose=0)
+        fit_fold = memory.cache(
+            _fit_and_score_fold, ignore=["model", "x", "y", "train_idx", "test_idx", "profile"]
+        )
+        fit_options = {"early_stopping_rounds": early_stopping_rounds,
+                       "validation_fraction": validation_fraction}
+
+        data_hash = compute_data_hash(x_train, y_train)
+        n_samples = y_train.shape[0]
+        # Fixed shuffled row order; a resource of n rows uses its first n entries
+        row_order = np.random.RandomState(random_state).permutation(n_samples)
+        signatures = {name: _model_signature(model) for name, model in models.items()}
+        search_seconds = {name: 0.0 for name in models}
+        candidate_usage = {name: {} for name in models}
+
+        folds_by_resource = {}
+
+        def resource_folds(n_resource):
+            if n_resource not in folds_by_resource:
+                rows = np.sort(row_order[:n_resource]) if n_resource < n_samples else np.arange(n_samples)
+                folds_by_resource[n_resource] = [(rows[tr], rows[te]) for tr, te in KFold(n_splits=cv).split(rows)]
+            return folds_by_resource[n_resource]
+
+        def score_candidates(entries):
+            """
+            Cross-validates (name, params, n_resource) entries, each on the
+            first `n_resource` shuffled rows, and returns their mean scores,
+            in order.
+            """
+            tasks = []
+            for entry, (name, params, n_resource) in enumerate(entries):
+                for fold, (train_idx, test_idx) in enumerate(resource_folds(n_resource)):
+                    # Subsamples depend on the shuffling seed, the full row set does not
+                    row_seed = random_state if n_resource < n_samples else None
+                    key = (data_hash, signatures[name], params, cv, fold, n_resource, row_seed, fit_options)
+                    tasks.append((entry, name, key, train_idx, test_idx))
+
+            # Decided before running: a cached result also holds the usage of the run that stored it
+            cached = [False] * len(tasks)
+            if cache_dir is not None:
+                cached = [
+                    fit_fold.check_call_in_cache(*task[2], model=None, x=None, y=None, train_idx=None, test_idx=None)
+                    for task in tasks
+                ]
+            pending = len(tasks) - sum(cached)
+            resources = sorted({n_resource for *_, n_resource in entries})
+            logging.info(f"Model search: {len(entries)} candidates on {resources} rows, "
+                         f"{len(tasks)} fold fits, {len(tasks) - pending} cached, n_jobs={n_jobs}")
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=param[list(models.keys())[i]]
+            results = Parallel(n_jobs=n_jobs)(
+                delayed(fit_fold)(*key, models[name], x_train, y_train, train_idx, test_idx, profile=profile)
+                for _, name, key, train_idx, test_idx in tasks
+            )
 
-            gs = GridSearchCV(model,para,cv=3)
-            gs.fit(x_train,y_train)
+            fold_scores = [[] for _ in entries]
+            for (entry, name, *_), (score, seconds, usage), hit in zip(tasks, results, cached):
+                fold_scores[entry].append(score)
+                search_seconds[name] += seconds
+                if profile:
+                    _add_usage(candidate_usage[name], entries[entry][1], entries[entry][2],
+                               None if hit else usage)
+            return [float(np.mean(values)) for values in fold_scores]
 
-            model.set_params(**gs.best_params_)
-            model.fit(x_train,y_train)
+        candidates = {name: list(ParameterGrid(param.get(name, {}))) for name in models}
+        # A model with a single candidate has nothing to search
+        searched = [name for name in models if len(candidates[name]) > 1]
+        best_params = {name: candidates[name][0] for name in models}
 
-            #model.fit(X_train, y_train)  # Train model
+        if search == "exhaustive":
+            entries = [(name, params, n_samples) for name in searched for params in candidates[name]]
+            scores = score_candidates(entries)
+            best_score = {}
+            # The first best candidate wins, as in GridSearchCV
+            for (name, params, _), score in zip(entries, scores):
+                if name not in best_score or score > best_score[name]:
+                    best_score[name], best_params[name] = score, params
 
-            y_train_pred = model.predict(x_train)
+        elif search == "halving":
+            # Every model gets its own schedule, sized to its grid, whose last round uses all rows
+            schedules = {name: _halving_schedule(len(candidates[name]), n_samples, halving_factor, cv * 20)
+                         for name in searched}
+            remaining = {name: candidates[name] for name in searched}
+            round_ = 0
+            while remaining:
+                # The rounds of all models run together in one process pool
+                entries = [(name, params, schedules[name][round_])
+                           for name, group in remaining.items() for params in group]
+                scores = score_candidates(entries)
 
-            y_test_pred = model.predict(x_test)
+                ranked = {}
+                for (name, params, _), score in zip(entries, scores):
+                    ranked.setdefault(name, []).append((score, params))
+                survivors = {}
+                for name, group in ranked.items():
+                    group.sort(key=lambda item: item[0], reverse=True)
+                    best_params[name] = group[0][1]
+                    if round_ + 1 < len(schedules[name]):
+                        keep = max(1, int(np.ceil(len(group) / halving_factor)))
+                        survivors[name] = [params for _, params in group[:keep]]
+                remaining = survivors
+                round_ += 1
 
-            train_model_score = r2_score(y_train, y_train_pred)
+        elif search == "random":
+            if time_budget is None:
+                raise ValueError("search='random' needs a time_budget in seconds")
+            rng = np.random.RandomState(random_state)
+            queues = {name: [candidates[name][i] for i in rng.permutation(len(candidates[name]))]
+                      for name in searched}
+            best_score = {}
+            batch_size = effective_n_jobs(n_jobs)
+            deadline = time.monotonic() + time_budget
+            while any(queues.values()):
+                # Round-robin over models so every model gets candidates early
+                entries = []
+                while len(entries) < batch_size and any(queues.values()):
+                    for name, queue in queues.items():
+                        if queue and len(entries) < batch_size:
+                            entries.append((name, queue.pop(0), n_samples))
+                for (name, params, _), score in zip(entries, score_candidates(entries)):
+                    if name not in best_score or score > best_score[name]:
+                        best_score[name], best_params[name] = score, params
+                if time.monotonic() >= deadline and all(name in best_score for name in searched):
+                    logging.info("Random search time budget exhausted")
+                    break
 
-            test_model_score = r2_score(y_test, y_test_pred)
+        else:
+            raise ValueError(f"Unknown search strategy '{search}'")
 
-            report[list(models.keys())[i]] = test_model_score
+        names = list(models.keys())
+        refits = Parallel(n_jobs=n_jobs)(
+            delayed(_refit_and_score)(models[name], best_params[name], fit_options,
+                                      x_train, y_train, x_test, y_test, profile=profile)
+            for name in names
+        )
+
+        report = {}
+        for name, (estimator, test_model_score, fit_seconds, usage) in zip(names, refits):
+            models[name] = estimator
+            report[name] = {
+                "r2": test_model_score,
+                "fit_seconds": fit_seconds,
+                "search_seconds": search_seconds[name],
+                "best_params": best_params[name],
+            }
+            if profile:
+                report[name]["candidates"] = list(candidate_usage[name].values())
+                report[name]["refit"] = usage
+            logging.info(f"{name}: test R2 {test_model_score:.4f}, search {search_seconds[name]:.1f}s, "
+                         f"refit {fit_seconds:.1f}s, best params {best_params[name]}")
 
         return report
 
@@ -59,3 +381,63 @@ def load_object(file_path):
 
     except Exception as e:
         raise CustomException(e, sys)
+
+def compute_file_hash(file_path, chunk_size=1 << 20):
+    """
+    Returns the SHA-256 hex digest of a file, read in fixed-size chunks so that
+    large artifacts never have to be held in memory at once.
+    """
+    try:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def save_matrix(dir_path, matrix):
+    """
+    Saves a dense array or a CSR matrix as uncompressed .npy files in `dir_path`
+    so that it can be memory-mapped back with load_matrix.
+    """
+    try:
+        import scipy.sparse
+
+        os.makedirs(dir_path, exist_ok=True)
+        for name in os.listdir(dir_path):
+            os.remove(os.path.join(dir_path, name))
+
+        if scipy.sparse.issparse(matrix):
+            matrix = matrix.tocsr()
+            np.save(os.path.join(dir_path, "data.npy"), matrix.data)
+            np.save(os.path.join(dir_path, "indices.npy"), matrix.indices)
+            np.save(os.path.join(dir_path, "indptr.npy"), matrix.indptr)
+            np.save(os.path.join(dir_path, "shape.npy"), np.asarray(matrix.shape))
+        else:
+            np.save(os.path.join(dir_path, "array.npy"), np.asarray(matrix))
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_matrix(dir_path, mmap_mode="r"):
+    """
+    Loads a matrix written by save_matrix. With the default mmap_mode the
+    arrays are memory-mapped (read-only) instead of copied into memory.
+    """
+    try:
+        dense_path = os.path.join(dir_path, "array.npy")
+        if os.path.exists(dense_path):
+            return np.load(dense_path, mmap_mode=mmap_mode)
+
+        data = np.load(os.path.join(dir_path, "data.npy"), mmap_mode=mmap_mode)
+        indices = np.load(os.path.join(dir_path, "indices.npy"), mmap_mode=mmap_mode)
+        indptr = np.load(os.path.join(dir_path, "indptr.npy"), mmap_mode=mmap_mode)
+        shape = tuple(np.load(os.path.join(dir_path, "shape.npy")))
+        import scipy.sparse
+
+        return scipy.sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+    except Exception as e:
+        raise CustomException(e, sys)